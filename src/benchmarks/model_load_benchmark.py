@@ -0,0 +1,124 @@
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# ====================================================
+# Model Cold-Start Benchmark: Pickle vs Compact Export
+# ====================================================
+# Each measurement runs in a fresh interpreter, so it includes every import
+# the format drags in (unpickling a Pipeline imports sklearn/xgboost; the
+# compact format only needs numpy). Reports load time, first prediction time
+# and peak resident memory.
+#
+# Usage: python model_load_benchmark.py [model_dir] [--repeats N] [--output results.json]
+
+MODELS_DIR = Path(__file__).resolve().parent.parent / "models"
+
+CHILD_SCRIPT = r"""
+import json, resource, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {models_dir!r})
+fmt, path, n_features = {fmt!r}, {path!r}, {n_features}
+if fmt == "pickle":
+    import joblib
+    artifact = joblib.load(path)
+    model = artifact["model"]
+else:
+    from compact_model import load_compact
+    model = load_compact(path)
+loaded = time.perf_counter()
+
+import numpy as np
+X = np.random.default_rng(0).normal(size=(40, n_features))
+if fmt == "pickle" and getattr(model, "feature_names_in_", None) is not None:
+    import pandas as pd
+    X = pd.DataFrame(X, columns=model.feature_names_in_)
+elif fmt == "pickle" and "feature_columns" in artifact:
+    import pandas as pd
+    X = pd.DataFrame(X, columns=artifact["feature_columns"])
+model.predict(X)
+predicted = time.perf_counter()
+
+# ru_maxrss survives exec on Linux (it would report the parent's peak), so
+# prefer the per-address-space high-water mark when /proc is available
+try:
+    with open("/proc/self/status") as f:
+        peak_mb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+print(json.dumps({{
+    "load_seconds": loaded - start,
+    "first_predict_seconds": predicted - loaded,
+    "max_rss_mb": peak_mb
+}}))
+"""
+
+
+def run_child(fmt, path, n_features):
+    script = CHILD_SCRIPT.format(models_dir=str(MODELS_DIR), fmt=fmt, path=str(path), n_features=n_features)
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", script],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(model_dir, repeats=5):
+    sys.path.insert(0, str(MODELS_DIR))
+    import joblib
+    from compact_model import export_compact
+
+    results = {}
+    export_dir = Path(tempfile.mkdtemp(prefix="compact_models_"))
+    for name in ["growth_potential_model", "risk_model"]:
+        pickle_path = Path(model_dir) / f"{name}.pkl"
+        if not pickle_path.exists():
+            print(f"Skipping {name}: {pickle_path} not found")
+            continue
+
+        artifact = joblib.load(pickle_path)
+        compact_dir = export_compact(artifact["model"], export_dir / f"{name}.compact",
+                                     scalers=artifact.get("scalers"))
+        n_features = len(artifact.get("feature_columns") or artifact["model"].feature_names_in_)
+
+        results[name] = {
+            "pickle_bytes": pickle_path.stat().st_size,
+            "compact_bytes": sum(p.stat().st_size for p in compact_dir.iterdir()),
+        }
+        for fmt, path in [("pickle", pickle_path), ("compact", compact_dir)]:
+            runs = [run_child(fmt, path, n_features) for _ in range(repeats)]
+            results[name][fmt] = {
+                key: statistics.median(run[key] for run in runs) for key in runs[0]
+            }
+    shutil.rmtree(export_dir, ignore_errors=True)
+    return results
+
+
+def print_results(results):
+    print(f"\n{'Model':<24} {'Format':<8} {'Size KB':>8} {'Load ms':>9} {'Predict ms':>11} {'Peak RSS MB':>12}")
+    print("-" * 76)
+    for name, result in results.items():
+        for fmt in ["pickle", "compact"]:
+            size = result[f"{fmt}_bytes"] / 1024
+            stats = result[fmt]
+            print(f"{name:<24} {fmt:<8} {size:>8.1f} {stats['load_seconds'] * 1000:>9.1f} "
+                  f"{stats['first_predict_seconds'] * 1000:>11.1f} {stats['max_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeats = int(args[args.index('--repeats') + 1]) if '--repeats' in args else 5
+    output = args[args.index('--output') + 1] if '--output' in args else None
+    positional = [a for i, a in enumerate(args)
+                  if not a.startswith('--') and (i == 0 or args[i - 1] not in ('--repeats', '--output'))]
+    model_dir = positional[0] if positional else str(MODELS_DIR.parent / "model_data")
+
+    results = benchmark(model_dir, repeats)
+    print_results(results)
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {output}")
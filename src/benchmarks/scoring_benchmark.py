@@ -0,0 +1,354 @@
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+# ====================================================
+# Collection, Feature and Scoring Benchmarks over Replayed FMP Data
+# ====================================================
+# Runs the hot paths against fmp_replay.py (started here with --alias, so a
+# small recorded archive can stand in for 1,000 symbols) and reports wall time,
+# throughput and latency percentiles per target and universe size. Results are
+# written as JSON; --compare prints the change against an earlier run.
+#
+# Record the archive once with live FMP access:
+#   python scoring_benchmark.py --record symbols.txt
+# Then benchmark offline:
+#   python scoring_benchmark.py [--sizes 10,100,1000] [--repeats N] [--latency-ms MS]
+#       [--jitter-ms MS] [--rate-429 FRACTION] [--targets name,...] [--output results.json]
+#       [--compare baseline.json]
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+MODELS_DIR = BENCHMARKS_DIR.parent / "models"
+DATA_COLLECTION_DIR = BENCHMARKS_DIR.parent / "data_collection"
+ARCHIVE_DIR = MODELS_DIR.parent / "model_data" / "fmp_fixtures"
+
+SIZES = [10, 100, 1000]
+REPLAY_PORT = 5055
+WORKERS = 8
+
+
+def percentiles(samples):
+    """p50/p90/p99 (nearest rank), mean and max of latency samples in seconds"""
+    ordered = sorted(samples)
+
+    def rank(q):
+        return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+    return {"p50": rank(50), "p90": rank(90), "p99": rank(99),
+            "mean": statistics.fmean(ordered), "max": ordered[-1], "samples": len(ordered)}
+
+
+# ====================================================
+# Replay Server
+# ====================================================
+
+def start_replay(archive_dir, port, latency_ms=0, jitter_ms=0, rate_429=0.0, seed=0):
+    """Run fmp_replay.py in a child process and wait until it answers"""
+    command = [sys.executable, "-W", "ignore", "fmp_replay.py", "--server", "--alias",
+               "--archive", str(archive_dir), "--port", str(port),
+               "--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms),
+               "--rate-429", str(rate_429), "--seed", str(seed)]
+    process = subprocess.Popen(command, cwd=MODELS_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            with urllib.request.urlopen(f"http://localhost:{port}/replay/stats", timeout=1) as response:
+                return process, json.load(response)
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("FMP replay server did not start")
+
+
+def replay_stats(port, reset=False):
+    url = f"http://localhost:{port}/replay/{'reset' if reset else 'stats'}"
+    request = urllib.request.Request(url, method="POST" if reset else "GET")
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.load(response)
+
+
+def benchmark_symbols(archive_dir, count):
+    """Recorded symbols first, then synthetic ones the replay server aliases"""
+    from fmp_replay import FixtureReplay
+    from fmp_client import FixtureArchive
+
+    recorded = FixtureReplay(FixtureArchive(archive_dir).load()).recorded_symbols()
+    synthetic = (f"BM{i:04d}" for i in range(count))
+    return (recorded + [symbol for symbol in synthetic if symbol not in recorded])[:count]
+
+
+# ====================================================
+# Targets
+# ====================================================
+# Each target takes the symbol list and returns per-call latency samples.
+# Batch targets are one call; per-symbol targets time every symbol's call.
+
+def _per_symbol(fn, symbols):
+    def timed(symbol):
+        start = time.perf_counter()
+        fn(symbol)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        return list(executor.map(timed, symbols))
+
+
+def _batch(fn, symbols):
+    start = time.perf_counter()
+    fn(symbols)
+    return [time.perf_counter() - start]
+
+
+def _bulk_endpoint(app, path):
+    client = app.test_client()
+
+    def call(symbols):
+        response = client.post(path, json={'symbols': symbols})
+        if response.status_code >= 500:
+            raise RuntimeError(f"{path} returned HTTP {response.status_code}")
+        return response.get_data()
+
+    return call
+
+
+def _fmp_proxy(app, batch_size=100):
+    """Profiles and quotes through the growth service's FMP proxy, as the players page loads them"""
+    client = app.test_client()
+
+    def call(symbols):
+        for i in range(0, len(symbols), batch_size):
+            symbol_list = ",".join(symbols[i:i + batch_size])
+            for endpoint in ("profile", "quote"):
+                response = client.get(f"/api/fmp/{endpoint}/{symbol_list}")
+                if response.status_code != 200:
+                    raise RuntimeError(f"/api/fmp/{endpoint} returned HTTP {response.status_code}")
+
+    return call
+
+
+def build_targets(output_dir):
+    """Name -> (kind, callable); data collection targets need yfinance and are skipped without it"""
+    import growth_potential_model_gen as growth
+    import risk_model_gen as risk
+    import value_model_math as value
+
+    risk.risk_service.start()
+    while risk.risk_service.state not in ("ready", "failed"):
+        time.sleep(0.1)
+    scorer = risk.risk_service.get_scorer()
+
+    targets = {
+        "risk.get_stock_features": ("per_symbol", scorer.get_stock_features),
+        "risk.predict_risk_scores": ("batch", scorer.predict_risk_scores),
+        "growth.run_scoring_for_tickers": ("batch", growth.run_scoring_for_tickers),
+        "value.analyze_stocks": ("batch", lambda symbols: value.ValueScoreCalculator().analyze_stocks(symbols)),
+        "growth./api/growth/bulk": ("batch", _bulk_endpoint(growth.app, "/api/growth/bulk")),
+        "risk./api/risk/bulk": ("batch", _bulk_endpoint(risk.app, "/api/risk/bulk")),
+        "value./api/value/bulk": ("batch", _bulk_endpoint(value.app, "/api/value/bulk")),
+        "growth./api/fmp/profile+quote": ("batch", _fmp_proxy(growth.app)),
+    }
+
+    try:
+        sys.path.insert(0, str(DATA_COLLECTION_DIR))
+        import data_collection
+    except ImportError as e:
+        print(f"Skipping data collection targets: {e}")
+    else:
+        csv_path = str(Path(output_dir) / "stock_features.csv")
+        targets["data_collection.get_all_features"] = ("per_symbol", data_collection.get_all_features)
+        targets["data_collection.features_to_csv"] = (
+            "batch", lambda symbols: data_collection.features_to_csv(symbols, output_path=csv_path))
+    return targets
+
+
+def reset_caches():
+    """Start every run cold: no cached FMP responses or industry aggregates"""
+    from fmp_client import get_client
+    get_client().clear_cache()
+    if "data_collection" in sys.modules:
+        data_collection = sys.modules["data_collection"]
+        data_collection.industry_index = data_collection.IndustryIndex()
+
+
+def run_target(kind, fn, symbols, repeats, port=None):
+    from fmp_client import get_client
+
+    samples, walls, requests = [], [], 0
+    for _ in range(repeats):
+        reset_caches()
+        before = get_client().stats["requests"]
+        start = time.perf_counter()
+        # Services print per symbol; keep the benchmark output readable
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            if kind == "per_symbol":
+                samples += _per_symbol(fn, symbols)
+            else:
+                samples += _batch(fn, symbols)
+        walls.append(time.perf_counter() - start)
+        requests += get_client().stats["requests"] - before
+
+    wall = statistics.median(walls)
+    result = {
+        "symbols": len(symbols),
+        "repeats": repeats,
+        "wall_seconds": wall,
+        "throughput_symbols_per_second": len(symbols) / wall if wall else None,
+        "latency_seconds": percentiles(samples),
+        "fmp_requests_per_run": requests / repeats,
+    }
+    if port is not None:
+        result["replay_totals"] = replay_stats(port)
+        replay_stats(port, reset=True)
+    return result
+
+
+# ====================================================
+# Reporting
+# ====================================================
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print(f"\n{'Target':<36} {'Symbols':>7} {'Wall s':>8} {'Sym/s':>8} "
+          f"{'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    print("-" * 92)
+    for result in results:
+        latency = result["latency_seconds"]
+        print(f"{result['target']:<36} {result['symbols']:>7} {result['wall_seconds']:>8.2f} "
+              f"{result['throughput_symbols_per_second']:>8.1f} {latency['p50'] * 1000:>9.1f} "
+              f"{latency['p90'] * 1000:>9.1f} {latency['p99'] * 1000:>9.1f}")
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["target"], r["symbols"]): r for r in baseline["results"]}
+
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    print(f"{'Target':<36} {'Symbols':>7} {'Wall s':>8} {'Before':>8} {'Change':>8}")
+    print("-" * 72)
+    for result in results:
+        before = previous.get((result["target"], result["symbols"]))
+        if before is None:
+            continue
+        change = (result["wall_seconds"] / before["wall_seconds"] - 1) * 100
+        print(f"{result['target']:<36} {result['symbols']:>7} {result['wall_seconds']:>8.2f} "
+              f"{before['wall_seconds']:>8.2f} {change:>+7.1f}%")
+
+
+def run_benchmarks(sizes=SIZES, repeats=3, archive_dir=ARCHIVE_DIR, latency_ms=0, jitter_ms=0,
+                   rate_429=0.0, targets=None, port=REPLAY_PORT):
+    """
+    Benchmark every target at every size against a fresh replay server
+
+    Args:
+        sizes: Universe sizes (number of symbols)
+        repeats: Cold runs per target and size (1 run at sizes >= 1000)
+        archive_dir: Recorded FMP fixture archive
+        latency_ms, jitter_ms, rate_429: Network behaviour the replay server injects
+        targets: Names of the targets to run (all if None)
+        port: Port for the replay server
+    """
+    # The modules read the FMP base URL and rate limit when first imported
+    os.environ["FMP_BASE_URL"] = f"http://localhost:{port}/api/v3"
+    # Measure the code, not the FMP plan's rate limit (set FMP_CALLS_PER_MINUTE to override)
+    os.environ.setdefault("FMP_CALLS_PER_MINUTE", "0")
+
+    process, _ = start_replay(archive_dir, port, latency_ms, jitter_ms, rate_429)
+    output_dir = tempfile.mkdtemp(prefix="scoring_benchmark_")
+    try:
+        available = build_targets(output_dir)
+
+        # Benchmark the live scoring paths, not the score snapshot
+        from score_snapshot import score_snapshot
+        score_snapshot.path = Path(output_dir) / "no_snapshot.sqlite"
+
+        results = []
+        for size in sizes:
+            symbols = benchmark_symbols(archive_dir, size)
+            for name, (kind, fn) in available.items():
+                if targets and name not in targets:
+                    continue
+                print(f"Running {name} with {size} symbols...")
+                result = run_target(kind, fn, symbols, repeats if size < 1000 else 1, port)
+                results.append(dict(result, target=name))
+    finally:
+        process.terminate()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "replay": {"archive": str(archive_dir), "latency_ms": latency_ms,
+                   "jitter_ms": jitter_ms, "rate_429": rate_429},
+        "results": results,
+    }
+
+
+def record_archive(symbols_file, archive_dir=ARCHIVE_DIR):
+    """Run every target once against live FMP, recording what it fetches"""
+    os.environ["FMP_RECORD_DIR"] = str(archive_dir)
+    from risk_training_data import symbols_from_file
+
+    symbols = symbols_from_file(symbols_file)
+    output_dir = tempfile.mkdtemp(prefix="scoring_benchmark_")
+    for name, (kind, fn) in build_targets(output_dir).items():
+        print(f"Recording {name} for {len(symbols)} symbols...")
+        run_target(kind, fn, symbols, 1)
+    print(f"Recorded FMP responses to {archive_dir}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    # Modules resolve their model paths relative to src/models
+    os.chdir(MODELS_DIR)
+    sys.path.insert(0, str(MODELS_DIR))
+    os.environ.pop("FMP_CACHE_DIR", None)
+    archive_dir = Path(option('--archive', ARCHIVE_DIR)).resolve()
+
+    if '--record' in args:
+        record_archive(option('--record', None), archive_dir)
+        sys.exit(0)
+
+    output = option('--output', None)
+    baseline = option('--compare', None)
+    target_names = option('--targets', None)
+    report = run_benchmarks(
+        sizes=[int(size) for size in option('--sizes', ",".join(map(str, SIZES))).split(",")],
+        repeats=int(option('--repeats', 3)),
+        archive_dir=archive_dir,
+        latency_ms=float(option('--latency-ms', 0)),
+        jitter_ms=float(option('--jitter-ms', 0)),
+        rate_429=float(option('--rate-429', 0)),
+        targets=target_names.split(",") if target_names else None,
+        port=int(option('--port', REPLAY_PORT))
+    )
+
+    print_results(report["results"])
+    if baseline:
+        print_comparison(report["results"], baseline)
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {output}")
@@ -0,0 +1,78 @@
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# ====================================================
+# Service Startup Benchmark
+# ====================================================
+# Imports each scoring service module in a fresh interpreter and reports how
+# long the import took and which heavy libraries it pulled in. The services
+# should only load what inference needs (pandas, numpy, Flask); training
+# libraries (sklearn, xgboost, scipy, joblib) should stay out until used.
+#
+# Usage: python startup_benchmark.py [--repeats N] [--output results.json]
+
+MODELS_DIR = Path(__file__).resolve().parent.parent / "models"
+
+SERVICE_MODULES = [
+    "growth_potential_model_gen",
+    "risk_model_gen",
+    "value_model_math",
+    "scoring_gateway",
+]
+
+HEAVY_MODULES = ["sklearn", "xgboost", "scipy", "joblib", "pandas", "flask"]
+
+CHILD_SCRIPT = r"""
+import json, sys, time
+sys.path.insert(0, {models_dir!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "import_seconds": elapsed,
+    "heavy_modules": [name for name in {heavy!r} if name in sys.modules]
+}}))
+"""
+
+
+def run_child(module):
+    script = CHILD_SCRIPT.format(models_dir=str(MODELS_DIR), module=module, heavy=HEAVY_MODULES)
+    # Run from the models directory so relative model paths resolve as they do for the services
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", script], cwd=MODELS_DIR,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(repeats=5):
+    results = {}
+    for module in SERVICE_MODULES:
+        runs = [run_child(module) for _ in range(repeats)]
+        results[module] = {
+            "import_seconds": statistics.median(run["import_seconds"] for run in runs),
+            "heavy_modules": runs[-1]["heavy_modules"],
+        }
+    return results
+
+
+def print_results(results):
+    print(f"\n{'Service module':<28} {'Import ms':>10}  Heavy modules loaded")
+    print("-" * 76)
+    for module, result in results.items():
+        print(f"{module:<28} {result['import_seconds'] * 1000:>10.1f}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeats = int(args[args.index('--repeats') + 1]) if '--repeats' in args else 5
+    output = args[args.index('--output') + 1] if '--output' in args else None
+
+    results = benchmark(repeats)
+    print_results(results)
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {output}")
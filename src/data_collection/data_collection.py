@@ -1,129 +1,80 @@
-import requests
+import json
+import sys
+import threading
+import time
 import pandas as pd
 import yfinance as yf
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# Shared FMP client lives next to the models
+sys.path.append(str(Path(__file__).resolve().parent.parent / "models"))
+from fmp_client import fmp_get, get_client, set_client
+from statement_store import RawStatementStore, RAW_STORE_PATH
+from feature_profiler import FeatureCostProfiler, feature_cost
 
-from API_KEY import API_KEY
+##### Get raw statements (fetched in full once, sliced by each helper) #####
+def get_income_statement(symbol):
+    return fmp_get(f"income-statement/{symbol}")
 
-BASE_URL = "https://financialmodelingprep.com/api/v3"
+def get_balance_sheet(symbol):
+    return fmp_get(f"balance-sheet-statement/{symbol}")
+
+def get_ratios_ttm(symbol):
+    return fmp_get(f"ratios-ttm/{symbol}")
+
+def get_profile(symbol):
+    return fmp_get(f"profile/{symbol}")
 
 ##### Get market cap of a stock #####
 def get_market_cap(symbol):
-    url = f"{BASE_URL}/profile/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        return response.json()[0]["mktCap"]
-    return None 
-        
+    data = get_profile(symbol)
+
+    if data is not None:
+        return data[0]["mktCap"]
+    return None
+
 ##### Get PE ratio of a stock #####
 def get_pe_ratio(symbol):
-    url = f"{BASE_URL}/ratios-ttm/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
+    data = get_ratios_ttm(symbol)
 
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            return data[0].get("priceEarningsRatioTTM")
+    if data and len(data) > 0:
+        return data[0].get("priceEarningsRatioTTM")
     return None
 
 ##### Get industry PE ratio of a stock #####
 def get_industry_pe_ratio(symbol):
-    # Get company's industry
-    profile_url = f"{BASE_URL}/profile/{symbol}?apikey={API_KEY}"
-    profile_response = requests.get(profile_url)
-    
-    if profile_response.status_code == 200:
-        profile_data = profile_response.json()
-        if profile_data and len(profile_data) > 0:
-            industry = profile_data[0].get("industry")
-            if industry:
-                # Get companies in the same industry
-                industry_url = f"{BASE_URL}/stock-screener?industry={industry}&apikey={API_KEY}"
-                industry_response = requests.get(industry_url)
-                
-                if industry_response.status_code == 200:
-                    industry_companies = industry_response.json()
-                    pe_ratios = []
-                    
-                    # Get PE ratios for up to 5 companies in the industry
-                    for company in industry_companies[:5]:
-                        company_symbol = company.get("symbol")
-                        if company_symbol:
-                            ratio_url = f"{BASE_URL}/ratios-ttm/{company_symbol}?apikey={API_KEY}"
-                            ratio_response = requests.get(ratio_url)
-                            if ratio_response.status_code == 200:
-                                data = ratio_response.json()
-                                if data and len(data) > 0:
-                                    pe_ratio = data[0].get("priceEarningsRatioTTM")
-                                    if pe_ratio is not None:
-                                        pe_ratios.append(pe_ratio)
-                    
-                    if pe_ratios:
-                        return sum(pe_ratios) / len(pe_ratios)
-    return None
+    return industry_index.get_aggregate(symbol, "pe_ratio")
+
 
 def get_pe_vs_industry_pe(symbol):
     pe = get_pe_ratio(symbol)
     industry_pe = get_industry_pe_ratio(symbol)
-    
+
     if industry_pe is None or industry_pe == 0:
         industry_pe = pe
 
     return pe / industry_pe
 
-##### Get PEG ratio of a stock #####    
+##### Get PEG ratio of a stock #####
 def get_peg_ratio(symbol):
-    url = f"{BASE_URL}/ratios-ttm/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
+    data = get_ratios_ttm(symbol)
 
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            return data[0].get("pegRatioTTM")
+    if data and len(data) > 0:
+        return data[0].get("pegRatioTTM")
     return None
 
 ##### Get revenue of a stock #####
 def get_revenue(symbol):
-    url = f"{BASE_URL}/income-statement/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
+    data = get_income_statement(symbol)
 
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            return data[0].get("revenue")
+    if data and len(data) > 0:
+        return data[0].get("revenue")
     return None
 
 ##### Get industry revenue #####
 def get_industry_revenue(symbol):
-    # Get company's industry
-    profile_url = f"{BASE_URL}/profile/{symbol}?apikey={API_KEY}"
-    profile_response = requests.get(profile_url)
-    
-    if profile_response.status_code == 200:
-        profile_data = profile_response.json()
-        if profile_data and len(profile_data) > 0:
-            industry = profile_data[0].get("industry")
-            if industry:
-                # Get companies in the same industry
-                industry_url = f"{BASE_URL}/stock-screener?industry={industry}&apikey={API_KEY}"
-                industry_response = requests.get(industry_url)
-                
-                if industry_response.status_code == 200:
-                    industry_companies = industry_response.json()
-                    revenues = []
-                    
-                    # Get revenues for up to 5 companies in the industry
-                    for company in industry_companies[:5]:
-                        company_symbol = company.get("symbol")
-                        if company_symbol:
-                            revenue = get_revenue(company_symbol)
-                            if revenue is not None:
-                                revenues.append(revenue)
-                    
-                    if revenues:
-                        return sum(revenues) / len(revenues)
-    return None
+    return industry_index.get_aggregate(symbol, "revenue")
 
 ##### Get revenue vs industry revenue ratio #####
 def get_revenue_vs_industry_revenue(symbol):
@@ -135,74 +86,55 @@ def get_revenue_vs_industry_revenue(symbol):
 
 ##### Get Price-to-Book Ratio #####
 def get_pb_ratio(symbol):
-    url = f"{BASE_URL}/ratios-ttm/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
+    data = get_ratios_ttm(symbol)
 
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            return data[0].get("priceToBookRatioTTM")
+    if data and len(data) > 0:
+        return data[0].get("priceToBookRatioTTM")
     return None
 
 ##### Get Price-to-Sales Ratio #####
 def get_ps_ratio(symbol):
-    url = f"{BASE_URL}/ratios-ttm/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
+    data = get_ratios_ttm(symbol)
 
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            return data[0].get("priceToSalesRatioTTM")
+    if data and len(data) > 0:
+        return data[0].get("priceToSalesRatioTTM")
     return None
 
 ##### Get Debt-to-Equity Ratio #####
 def get_debt_to_equity_ratio(symbol):
-    url = f"{BASE_URL}/ratios-ttm/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
+    data = get_ratios_ttm(symbol)
 
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            return data[0].get("debtEquityRatioTTM")
+    if data and len(data) > 0:
+        return data[0].get("debtEquityRatioTTM")
     return None
 
 ##### Get EV/EBITDA Ratio #####
 def get_ev_to_ebitda(symbol):
-    url = f"{BASE_URL}/ratios-ttm/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
+    data = get_ratios_ttm(symbol)
 
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            return data[0].get("enterpriseValueMultipleTTM")
+    if data and len(data) > 0:
+        return data[0].get("enterpriseValueMultipleTTM")
     return None
 
 ##### Get 2-Year Return on Equity #####
 def get_two_year_roe(symbol):
-    # Get income statement data
-    income_url = f"{BASE_URL}/income-statement/{symbol}?limit=2&apikey={API_KEY}"
-    income_response = requests.get(income_url)
-    
-    # Get balance sheet data
-    balance_url = f"{BASE_URL}/balance-sheet-statement/{symbol}?limit=2&apikey={API_KEY}"
-    balance_response = requests.get(balance_url)
-    
-    if income_response.status_code == 200 and balance_response.status_code == 200:
-        income_data = income_response.json()
-        balance_data = balance_response.json()
-        
+    # Get income statement and balance sheet data
+    income_data = get_income_statement(symbol)
+    balance_data = get_balance_sheet(symbol)
+
+    if income_data is not None and balance_data is not None:
         if len(income_data) >= 2 and len(balance_data) >= 2:
             roe_values = []
-            
+
             # Calculate ROE for each year
             for i in range(2):
                 net_income = income_data[i].get("netIncome")
                 equity = balance_data[i].get("totalStockholdersEquity")
-                
+
                 if net_income is not None and equity is not None and equity != 0:
                     roe = (net_income / equity) * 100  # Convert to percentage
                     roe_values.append(roe)
-            
+
             if roe_values:
                 return sum(roe_values) / len(roe_values)  # Average ROE over 2 years
     return None
@@ -210,61 +142,29 @@ def get_two_year_roe(symbol):
 ##### Get 2-Year ROI #####
 def get_two_year_roi(symbol):
     # Get historical price data
-    url = f"{BASE_URL}/historical-price-full/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
+    data = fmp_get(f"historical-price-full/{symbol}")
+
+    if data is not None:
         historical_prices = data.get("historical", [])
         if len(historical_prices) >= 504:  # Approximately 2 years of trading days
             current_price = historical_prices[0].get("close")
             price_2_years_ago = historical_prices[503].get("close")
-            
+
             if current_price is not None and price_2_years_ago is not None and price_2_years_ago != 0:
                 return ((current_price - price_2_years_ago) / price_2_years_ago) * 100  # Return as percentage
     return None
 
 ##### Get Beta #####
 def get_beta(symbol):
-    url = f"{BASE_URL}/profile/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
+    data = get_profile(symbol)
 
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            return data[0].get("beta")
+    if data and len(data) > 0:
+        return data[0].get("beta")
     return None
 
 ##### Get Industry Beta #####
 def get_industry_beta(symbol):
-    # Get company's industry
-    profile_url = f"{BASE_URL}/profile/{symbol}?apikey={API_KEY}"
-    profile_response = requests.get(profile_url)
-    
-    if profile_response.status_code == 200:
-        profile_data = profile_response.json()
-        if profile_data and len(profile_data) > 0:
-            industry = profile_data[0].get("industry")
-            if industry:
-                # Get companies in the same industry
-                industry_url = f"{BASE_URL}/stock-screener?industry={industry}&apikey={API_KEY}"
-                industry_response = requests.get(industry_url)
-                
-                if industry_response.status_code == 200:
-                    industry_companies = industry_response.json()
-                    betas = []
-                    
-                    # Get betas for up to 5 companies in the industry
-                    for company in industry_companies[:5]:
-                        company_symbol = company.get("symbol")
-                        if company_symbol:
-                            beta = get_beta(company_symbol)
-                            if beta is not None:
-                                betas.append(beta)
-                    
-                    if betas:
-                        return sum(betas) / len(betas)
-    return None
+    return industry_index.get_aggregate(symbol, "beta")
 
 ##### Get Beta vs Industry Beta #####
 def get_beta_vs_industry_beta(symbol):
@@ -276,45 +176,15 @@ def get_beta_vs_industry_beta(symbol):
 
 ##### Get Trading Volume #####
 def get_trading_volume(symbol):
-    url = f"{BASE_URL}/quote/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
+    data = fmp_get(f"quote/{symbol}")
 
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            return data[0].get("volume")
+    if data and len(data) > 0:
+        return data[0].get("volume")
     return None
 
 ##### Get Industry Trading Volume #####
 def get_industry_trading_volume(symbol):
-    # Get company's industry
-    profile_url = f"{BASE_URL}/profile/{symbol}?apikey={API_KEY}"
-    profile_response = requests.get(profile_url)
-    
-    if profile_response.status_code == 200:
-        profile_data = profile_response.json()
-        if profile_data and len(profile_data) > 0:
-            industry = profile_data[0].get("industry")
-            if industry:
-                # Get companies in the same industry
-                industry_url = f"{BASE_URL}/stock-screener?industry={industry}&apikey={API_KEY}"
-                industry_response = requests.get(industry_url)
-                
-                if industry_response.status_code == 200:
-                    industry_companies = industry_response.json()
-                    volumes = []
-                    
-                    # Get trading volumes for up to 5 companies in the industry
-                    for company in industry_companies[:5]:
-                        company_symbol = company.get("symbol")
-                        if company_symbol:
-                            volume = get_trading_volume(company_symbol)
-                            if volume is not None:
-                                volumes.append(volume)
-                    
-                    if volumes:
-                        return sum(volumes) / len(volumes)
-    return None
+    return industry_index.get_aggregate(symbol, "trading_volume")
 
 ##### Get Trading Volume vs Industry Trading Volume #####
 def get_volume_vs_industry_volume(symbol):
@@ -326,82 +196,47 @@ def get_volume_vs_industry_volume(symbol):
 
 ##### Get Altman Z-Score #####
 def get_altman_z_score(symbol):
-    # Get balance sheet data
-    balance_url = f"{BASE_URL}/balance-sheet-statement/{symbol}?apikey={API_KEY}"
-    balance_response = requests.get(balance_url)
-    
-    # Get income statement data
-    income_url = f"{BASE_URL}/income-statement/{symbol}?apikey={API_KEY}"
-    income_response = requests.get(income_url)
-    
-    if balance_response.status_code == 200 and income_response.status_code == 200:
-        balance_data = balance_response.json()
-        income_data = income_response.json()
-        
-        if balance_data and income_data and len(balance_data) > 0 and len(income_data) > 0:
-            # Get required values from balance sheet
-            total_assets = balance_data[0].get("totalAssets")
-            current_assets = balance_data[0].get("totalCurrentAssets")
-            current_liabilities = balance_data[0].get("totalCurrentLiabilities")
-            retained_earnings = balance_data[0].get("retainedEarnings")
-            total_liabilities = balance_data[0].get("totalLiabilities")
-            
-            # Get required values from income statement
-            ebit = income_data[0].get("operatingIncome")  # Using operatingIncome instead of ebit
-            revenue = income_data[0].get("revenue")
-            
-            # Get market cap for market value of equity
-            market_cap = get_market_cap(symbol)
-            
-            if all(v is not None and v != 0 for v in [total_assets, current_assets, current_liabilities, 
-                                                     retained_earnings, total_liabilities, ebit, 
-                                                     revenue, market_cap]):
-                # Calculate working capital
-                working_capital = current_assets - current_liabilities
-                
-                # Calculate Altman Z-Score components
-                a = working_capital / total_assets
-                b = retained_earnings / total_assets
-                c = ebit / total_assets
-                d = market_cap / total_liabilities
-                e = revenue / total_assets
-                
-                # Calculate Z-Score
-                z_score = (1.2 * a) + (1.4 * b) + (3.3 * c) + (0.6 * d) + (1.0 * e)
-                
-                return z_score
+    # Get balance sheet and income statement data
+    balance_data = get_balance_sheet(symbol)
+    income_data = get_income_statement(symbol)
+
+    if balance_data and income_data and len(balance_data) > 0 and len(income_data) > 0:
+        # Get required values from balance sheet
+        total_assets = balance_data[0].get("totalAssets")
+        current_assets = balance_data[0].get("totalCurrentAssets")
+        current_liabilities = balance_data[0].get("totalCurrentLiabilities")
+        retained_earnings = balance_data[0].get("retainedEarnings")
+        total_liabilities = balance_data[0].get("totalLiabilities")
+
+        # Get required values from income statement
+        ebit = income_data[0].get("operatingIncome")  # Using operatingIncome instead of ebit
+        revenue = income_data[0].get("revenue")
+
+        # Get market cap for market value of equity
+        market_cap = get_market_cap(symbol)
+
+        if all(v is not None and v != 0 for v in [total_assets, current_assets, current_liabilities,
+                                                 retained_earnings, total_liabilities, ebit,
+                                                 revenue, market_cap]):
+            # Calculate working capital
+            working_capital = current_assets - current_liabilities
+
+            # Calculate Altman Z-Score components
+            a = working_capital / total_assets
+            b = retained_earnings / total_assets
+            c = ebit / total_assets
+            d = market_cap / total_liabilities
+            e = revenue / total_assets
+
+            # Calculate Z-Score
+            z_score = (1.2 * a) + (1.4 * b) + (3.3 * c) + (0.6 * d) + (1.0 * e)
+
+            return z_score
     return None
 
 ##### Get Industry Altman Z-Score #####
 def get_industry_altman_z_score(symbol):
-    # Get company's industry
-    profile_url = f"{BASE_URL}/profile/{symbol}?apikey={API_KEY}"
-    profile_response = requests.get(profile_url)
-    
-    if profile_response.status_code == 200:
-        profile_data = profile_response.json()
-        if profile_data and len(profile_data) > 0:
-            industry = profile_data[0].get("industry")
-            if industry:
-                # Get companies in the same industry
-                industry_url = f"{BASE_URL}/stock-screener?industry={industry}&apikey={API_KEY}"
-                industry_response = requests.get(industry_url)
-                
-                if industry_response.status_code == 200:
-                    industry_companies = industry_response.json()
-                    z_scores = []
-                    
-                    # Get Z-scores for up to 5 companies in the industry
-                    for company in industry_companies[:5]:
-                        company_symbol = company.get("symbol")
-                        if company_symbol:
-                            z_score = get_altman_z_score(company_symbol)
-                            if z_score is not None:
-                                z_scores.append(z_score)
-                    
-                    if z_scores:
-                        return sum(z_scores) / len(z_scores)
-    return None
+    return industry_index.get_aggregate(symbol, "altman_z_score")
 
 ##### Get Z-Score vs Industry Z-Score #####
 def get_z_score_vs_industry_z_score(symbol):
@@ -414,15 +249,13 @@ def get_z_score_vs_industry_z_score(symbol):
 ##### Get Historical Revenue Growth Rate #####
 def get_historical_revenue_growth(symbol):
     # Get income statement data for last 2 years
-    url = f"{BASE_URL}/income-statement/{symbol}?limit=2&apikey={API_KEY}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
+    data = get_income_statement(symbol)
+
+    if data is not None:
         if len(data) >= 2:  # Need at least 2 years of data
             current_revenue = data[0].get("revenue")
             two_year_ago_revenue = data[1].get("revenue")
-            
+
             if current_revenue is not None and two_year_ago_revenue is not None and two_year_ago_revenue != 0:
                 growth_rate = ((current_revenue - two_year_ago_revenue) / two_year_ago_revenue) * 100
                 return growth_rate
@@ -430,34 +263,7 @@ def get_historical_revenue_growth(symbol):
 
 ##### Get Industry Historical Revenue Growth Rate #####
 def get_industry_historical_revenue_growth(symbol):
-    # Get company's industry
-    profile_url = f"{BASE_URL}/profile/{symbol}?apikey={API_KEY}"
-    profile_response = requests.get(profile_url)
-    
-    if profile_response.status_code == 200:
-        profile_data = profile_response.json()
-        if profile_data and len(profile_data) > 0:
-            industry = profile_data[0].get("industry")
-            if industry:
-                # Get companies in the same industry
-                industry_url = f"{BASE_URL}/stock-screener?industry={industry}&apikey={API_KEY}"
-                industry_response = requests.get(industry_url)
-                
-                if industry_response.status_code == 200:
-                    industry_companies = industry_response.json()
-                    growth_rates = []
-                    
-                    # Get growth rates for up to 5 companies in the industry
-                    for company in industry_companies[:5]:
-                        company_symbol = company.get("symbol")
-                        if company_symbol:
-                            growth_rate = get_historical_revenue_growth(company_symbol)
-                            if growth_rate is not None:
-                                growth_rates.append(growth_rate)
-                    
-                    if growth_rates:
-                        return sum(growth_rates) / len(growth_rates)
-    return None
+    return industry_index.get_aggregate(symbol, "revenue_growth")
 
 ##### Get Growth Rate vs Industry Growth Rate #####
 def get_growth_vs_industry_growth(symbol):
@@ -470,73 +276,69 @@ def get_growth_vs_industry_growth(symbol):
         return growth_rate - industry_growth_rate
     return None
 
+##### Get the screener parameters for a company's market share peers #####
+def get_market_share_search_params(industry, sector):
+    # Special handling for tech companies
+    if industry in ["Internet Content & Information", "Software—Application", "Software—Infrastructure"]:
+        return {"sector": "Technology"}
+    # Try industry first, if not available use sector
+    if industry:
+        return {"industry": industry}
+    if sector:
+        return {"sector": sector}
+    # Without either filter the screener would list the whole market
+    return None
+
 ##### Get Market Share for a Specific Year #####
 def get_market_share_for_year(symbol, year_index=0):
     try:
         print(f"\nCalculating market share for {symbol}, year_index: {year_index}")
         # Get revenue for specific year
-        url = f"{BASE_URL}/income-statement/{symbol}?limit={year_index + 1}&apikey={API_KEY}"
-        response = requests.get(url)
-        
-        if response.status_code == 200:
-            data = response.json()
+        data = get_income_statement(symbol)
+
+        if data is not None:
             if len(data) > year_index:
                 company_revenue = data[year_index].get("revenue")
                 print(f"{symbol} revenue: {company_revenue}")
-                
+
                 if company_revenue is None:
                     print(f"No revenue data available for {symbol}")
                     return None
-                
-                # Get company's industry
-                profile_url = f"{BASE_URL}/profile/{symbol}?apikey={API_KEY}"
-                profile_response = requests.get(profile_url)
-                time.sleep(0.25)  # Add delay to avoid rate limiting
-                
-                if profile_response.status_code == 200:
-                    profile_data = profile_response.json()
+
+                # Get company's industry (the shared client spaces out network requests)
+                profile_data = get_profile(symbol)
+
+                if profile_data is not None:
                     if profile_data and len(profile_data) > 0:
                         industry = profile_data[0].get("industry")
                         sector = profile_data[0].get("sector")
                         print(f"{symbol} industry: {industry}, sector: {sector}")
-                        
-                        # Special handling for tech companies
-                        if industry in ["Internet Content & Information", "Software—Application", "Software—Infrastructure"]:
-                            search_params = "sector=Technology"
-                        else:
-                            # Try industry first, if not available use sector
-                            search_category = industry if industry else sector
-                            search_params = f"{'industry' if industry else 'sector'}={search_category}"
-                        
+
+                        search_params = get_market_share_search_params(industry, sector)
+
                         if search_params:
                             # Get companies in the same category
-                            search_url = f"{BASE_URL}/stock-screener?{search_params}&apikey={API_KEY}"
-                            search_response = requests.get(search_url)
-                            time.sleep(0.25)  # Add delay to avoid rate limiting
-                            
-                            if search_response.status_code == 200:
-                                peer_companies = search_response.json()
+                            peer_companies = fmp_get("stock-screener", **search_params)
+
+                            if peer_companies is not None:
                                 print(f"Found {len(peer_companies)} companies in category")
-                                
+
                                 if len(peer_companies) == 0:
                                     print(f"No peer companies found for {symbol}")
                                     return None
-                                
+
                                 total_revenue = 0
                                 processed_companies = []
-                                
+
                                 # Get revenues for peer companies
-                                for company in peer_companies[:10]:  # Limit to top 10 companies
+                                for company in peer_companies[:MARKET_SHARE_PEER_COUNT]:  # Limit to top 10 companies
                                     peer_symbol = company.get("symbol")
                                     if peer_symbol and peer_symbol not in processed_companies:
                                         processed_companies.append(peer_symbol)
                                         try:
-                                            rev_url = f"{BASE_URL}/income-statement/{peer_symbol}?limit={year_index + 1}&apikey={API_KEY}"
-                                            rev_response = requests.get(rev_url)
-                                            time.sleep(0.25)  # Add delay to avoid rate limiting
-                                            
-                                            if rev_response.status_code == 200:
-                                                rev_data = rev_response.json()
+                                            rev_data = get_income_statement(peer_symbol)
+
+                                            if rev_data is not None:
                                                 if len(rev_data) > year_index:
                                                     revenue = rev_data[year_index].get("revenue")
                                                     if revenue is not None:
@@ -545,7 +347,7 @@ def get_market_share_for_year(symbol, year_index=0):
                                         except Exception as e:
                                             print(f"Error processing {peer_symbol}: {str(e)}")
                                             continue
-                                
+
                                 print(f"Total category revenue: {total_revenue}")
                                 if total_revenue > 0:
                                     market_share = (company_revenue / total_revenue) * 100
@@ -573,66 +375,33 @@ def get_market_share_for_year(symbol, year_index=0):
 def get_market_share_growth(symbol):
     current_market_share = get_market_share_for_year(symbol, 0)
     two_year_ago_market_share = get_market_share_for_year(symbol, 1)
-    
+
     if current_market_share is not None and two_year_ago_market_share is not None and two_year_ago_market_share != 0:
         return current_market_share - two_year_ago_market_share  # Return change in percentage points
     return None
 
 def get_rd_spending(symbol):
-    url = f"{BASE_URL}/income-statement/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            rd_expenses = data[0].get("researchAndDevelopmentExpenses")
-            return rd_expenses
+    data = get_income_statement(symbol)
+    if data and len(data) > 0:
+        rd_expenses = data[0].get("researchAndDevelopmentExpenses")
+        return rd_expenses
     return None
 
 ##### Get R&D to Revenue Ratio #####
 def get_rd_to_revenue_ratio(symbol):
-    url = f"{BASE_URL}/income-statement/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            rd_expenses = data[0].get("researchAndDevelopmentExpenses")
-            revenue = data[0].get("revenue")
-            
-            if rd_expenses is not None and revenue is not None and revenue != 0:
-                return (rd_expenses / revenue) * 100
+    data = get_income_statement(symbol)
+
+    if data and len(data) > 0:
+        rd_expenses = data[0].get("researchAndDevelopmentExpenses")
+        revenue = data[0].get("revenue")
+
+        if rd_expenses is not None and revenue is not None and revenue != 0:
+            return (rd_expenses / revenue) * 100
     return None
 
 ##### Get Industry R&D to Revenue Ratio #####
 def get_industry_rd_to_revenue_ratio(symbol):
-    # Get company's industry
-    profile_url = f"{BASE_URL}/profile/{symbol}?apikey={API_KEY}"
-    profile_response = requests.get(profile_url)
-    
-    if profile_response.status_code == 200:
-        profile_data = profile_response.json()
-        if profile_data and len(profile_data) > 0:
-            industry = profile_data[0].get("industry")
-            if industry:
-                # Get companies in the same industry
-                industry_url = f"{BASE_URL}/stock-screener?industry={industry}&apikey={API_KEY}"
-                industry_response = requests.get(industry_url)
-                
-                if industry_response.status_code == 200:
-                    industry_companies = industry_response.json()
-                    rd_ratios = []
-                    
-                    # Get R&D ratios for up to 5 companies in the industry
-                    for company in industry_companies[:5]:
-                        company_symbol = company.get("symbol")
-                        if company_symbol:
-                            rd_ratio = get_rd_to_revenue_ratio(company_symbol)
-                            if rd_ratio is not None:
-                                rd_ratios.append(rd_ratio)
-                    
-                    if rd_ratios:
-                        return sum(rd_ratios) / len(rd_ratios)
-    return None
+    return industry_index.get_aggregate(symbol, "rd_to_revenue")
 
 ##### Get R&D Investment Level vs Industry #####
 def get_rd_vs_industry(symbol):
@@ -647,31 +416,26 @@ def get_rd_vs_industry(symbol):
 
 ##### Get EPS (Basic and Diluted) #####
 def get_eps(symbol):
-    url = f"{BASE_URL}/income-statement/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            basic_eps = data[0].get("eps")
-            diluted_eps = data[0].get("epsdiluted")
-            return {
-                "basic": basic_eps,
-                "diluted": diluted_eps
-            }
+    data = get_income_statement(symbol)
+
+    if data and len(data) > 0:
+        basic_eps = data[0].get("eps")
+        diluted_eps = data[0].get("epsdiluted")
+        return {
+            "basic": basic_eps,
+            "diluted": diluted_eps
+        }
     return None
 
 ##### Get Earnings Growth Rate for a Period #####
 def get_earnings_growth_rate(symbol, year_index=0):
-    url = f"{BASE_URL}/income-statement/{symbol}?limit={year_index + 2}&apikey={API_KEY}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
+    data = get_income_statement(symbol)
+
+    if data is not None:
         if len(data) >= year_index + 2:
             current_earnings = data[year_index].get("netIncome")
             prev_earnings = data[year_index + 1].get("netIncome")
-            
+
             if current_earnings is not None and prev_earnings is not None and prev_earnings != 0:
                 return ((current_earnings - prev_earnings) / abs(prev_earnings)) * 100  # Return as percentage
     return None
@@ -679,29 +443,27 @@ def get_earnings_growth_rate(symbol, year_index=0):
 ##### Get Earnings Stability #####
 def get_earnings_stability(symbol):
     # Get 4 years of earnings growth rates (resulting in 3 year-over-year changes)
-    url = f"{BASE_URL}/income-statement/{symbol}?limit=4&apikey={API_KEY}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
+    data = get_income_statement(symbol)
+
+    if data is not None:
         if len(data) >= 4:
             growth_rates = []
-            
+
             # Calculate year-over-year growth rates
             for i in range(3):
                 current_earnings = data[i].get("netIncome")
                 prev_earnings = data[i + 1].get("netIncome")
-                
+
                 if current_earnings is not None and prev_earnings is not None and prev_earnings != 0:
                     growth_rate = ((current_earnings - prev_earnings) / abs(prev_earnings)) * 100
                     growth_rates.append(growth_rate)
-            
+
             if len(growth_rates) >= 2:
                 # Calculate the standard deviation of growth rates
                 mean_growth = sum(growth_rates) / len(growth_rates)
                 squared_diff_sum = sum((x - mean_growth) ** 2 for x in growth_rates)
                 std_dev = (squared_diff_sum / len(growth_rates)) ** 0.5
-                
+
                 # Calculate coefficient of variation (CV) for normalized volatility measure
                 if mean_growth != 0:
                     cv = (std_dev / abs(mean_growth)) * 100
@@ -714,17 +476,15 @@ def get_earnings_stability(symbol):
 
 ##### Get Margins for a Specific Year #####
 def get_margins_for_year(symbol, year_index=0):
-    url = f"{BASE_URL}/income-statement/{symbol}?limit={year_index + 1}&apikey={API_KEY}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
+    data = get_income_statement(symbol)
+
+    if data is not None:
         if len(data) > year_index:
             revenue = data[year_index].get("revenue")
             gross_profit = data[year_index].get("grossProfit")
             operating_income = data[year_index].get("operatingIncome")
             net_income = data[year_index].get("netIncome")
-            
+
             if all(v is not None and revenue != 0 for v in [revenue, gross_profit, operating_income, net_income]):
                 return {
                     "gross_margin": (gross_profit / revenue) * 100,
@@ -736,20 +496,18 @@ def get_margins_for_year(symbol, year_index=0):
 ##### Get Overall Margin Changes #####
 def get_overall_margin_changes(symbol):
     # Get 3 years of margin data
-    url = f"{BASE_URL}/income-statement/{symbol}?limit=3&apikey={API_KEY}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
+    data = get_income_statement(symbol)
+
+    if data is not None:
         if len(data) >= 3:
             margins_by_year = []
-            
+
             # Get margins for each year
             for i in range(3):
                 margins = get_margins_for_year(symbol, i)
                 if margins:
                     margins_by_year.append(margins)
-            
+
             if len(margins_by_year) >= 3:
                 # Calculate year-over-year changes
                 changes = {
@@ -760,7 +518,7 @@ def get_overall_margin_changes(symbol):
                     "current_operating_margin": margins_by_year[0]["operating_margin"],
                     "current_net_margin": margins_by_year[0]["net_margin"]
                 }
-                
+
                 # Calculate overall margin trend score
                 # Positive score means improving margins
                 # Negative score means deteriorating margins
@@ -769,9 +527,9 @@ def get_overall_margin_changes(symbol):
                     changes["operating_margin_change"] * 1.5 +  # Weight operating margin changes more
                     changes["net_margin_change"] * 2  # Weight net margin changes the most
                 ) / 4.5  # Normalize by sum of weights
-                
+
                 changes["margin_trend_score"] = trend_score
-                
+
                 # Calculate margin stability
                 stability_scores = []
                 for margin_type in ["gross_margin", "operating_margin", "net_margin"]:
@@ -780,169 +538,505 @@ def get_overall_margin_changes(symbol):
                     std_dev = (sum((x - mean) ** 2 for x in values) / len(values)) ** 0.5
                     cv = (std_dev / abs(mean)) * 100 if mean != 0 else float('inf')
                     stability_scores.append(cv)
-                
+
                 # Lower stability score means more stable margins
                 changes["margin_stability_score"] = sum(stability_scores) / len(stability_scores)
-                
+
                 return changes
     return None
 
+##### Industry peer index (one screener call and one aggregate pass per industry) #####
+class IndustryIndex:
+    """
+    Resolves each symbol's industry once, fetches each industry's screener
+    result once, and computes every peer aggregate in a single pass so all
+    symbols in the same industry share it.
+    """
+
+    # Aggregate name -> per-symbol metric averaged over the industry peers
+    PEER_METRICS = {
+        "pe_ratio": get_pe_ratio,
+        "revenue": get_revenue,
+        "beta": get_beta,
+        "trading_volume": get_trading_volume,
+        "altman_z_score": get_altman_z_score,
+        "revenue_growth": get_historical_revenue_growth,
+        "rd_to_revenue": get_rd_to_revenue_ratio,
+    }
+
+    def __init__(self, peer_count=5):
+        self.peer_count = peer_count
+        self.industry_by_symbol = {}
+        self.peers_by_industry = {}
+        self.aggregates_by_industry = {}
+
+        # Symbols are collected concurrently; one lock per industry keeps
+        # each aggregate pass from running more than once, and _locks_lock
+        # guards the lock table and every cache dict
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _industry_lock(self, industry):
+        with self._locks_lock:
+            return self._locks.setdefault(industry, threading.Lock())
+
+    def _lookup(self, cache, key):
+        with self._locks_lock:
+            return key in cache, cache.get(key)
+
+    def _remember(self, cache, key, value):
+        with self._locks_lock:
+            return cache.setdefault(key, value)
+
+    def clear(self):
+        """Forget every industry, peer set and aggregate, so the next run sees current peers"""
+        with self._locks_lock:
+            self.industry_by_symbol.clear()
+            self.peers_by_industry.clear()
+            self.aggregates_by_industry.clear()
+
+    def get_industry(self, symbol):
+        found, industry = self._lookup(self.industry_by_symbol, symbol)
+        if found:
+            return industry
+        profile_data = get_profile(symbol)
+        if profile_data and len(profile_data) > 0:
+            industry = profile_data[0].get("industry")
+        return self._remember(self.industry_by_symbol, symbol, industry)
+
+    def get_peers(self, industry):
+        found, peers = self._lookup(self.peers_by_industry, industry)
+        if found:
+            return peers
+        industry_companies = fmp_get("stock-screener", industry=industry)
+        if industry_companies is not None:
+            # Top companies in the industry, as listed by the screener
+            peers = [company.get("symbol") for company in industry_companies[:self.peer_count]
+                     if company.get("symbol")]
+        return self._remember(self.peers_by_industry, industry, peers)
+
+    def get_aggregates(self, industry):
+        with self._industry_lock(industry):
+            return self._get_aggregates(industry)
+
+    def _get_aggregates(self, industry):
+        found, aggregates = self._lookup(self.aggregates_by_industry, industry)
+        if found:
+            return aggregates
+        peers = self.get_peers(industry)
+        aggregates = {}
+        if peers:
+            # One row per peer, one column per metric; mean() skips missing values
+            peer_metrics = pd.DataFrame(
+                [{name: metric(peer) for name, metric in self.PEER_METRICS.items()} for peer in peers],
+                columns=list(self.PEER_METRICS), dtype=float
+            )
+            means = peer_metrics.mean()
+            aggregates = {name: float(value) for name, value in means.items() if pd.notna(value)}
+        return self._remember(self.aggregates_by_industry, industry, aggregates)
+
+    def get_aggregate(self, symbol, metric):
+        industry = self.get_industry(symbol)
+        if not industry:
+            return None
+        return self.get_aggregates(industry).get(metric)
+
+industry_index = IndustryIndex()
+
 ##### Get all features #####
+# Column -> helper, in output order; each helper returns one column
+SINGLE_FEATURES = [
+    ("Market Cap", get_market_cap),
+    ("PE Ratio", get_pe_ratio),
+    ("Industry PE Ratio", get_industry_pe_ratio),
+    ("PE vs Industry PE", get_pe_vs_industry_pe),
+    ("PEG Ratio", get_peg_ratio),
+    ("Price-to-Book Ratio", get_pb_ratio),
+    ("Price-to-Sales Ratio", get_ps_ratio),
+    ("EV/EBITDA", get_ev_to_ebitda),
+    ("Beta", get_beta),
+    ("Industry Beta", get_industry_beta),
+    ("Beta vs Industry Beta", get_beta_vs_industry_beta),
+    ("Debt/Equity Ratio", get_debt_to_equity_ratio),
+    ("2-Year ROE (%)", get_two_year_roe),
+    ("2-Year ROI (%)", get_two_year_roi),
+    ("Revenue", get_revenue),
+    ("Industry Revenue", get_industry_revenue),
+    ("Revenue vs Industry Revenue", get_revenue_vs_industry_revenue),
+    ("Current Market Share (%)", lambda symbol: get_market_share_for_year(symbol, 0)),
+    ("Market Share 2 Years Ago (%)", lambda symbol: get_market_share_for_year(symbol, 1)),
+    ("Market Share Growth (pp)", get_market_share_growth),
+    ("R&D", get_rd_spending),
+    ("R&D vs Revenue (%)", get_rd_to_revenue_ratio),
+    ("Industry R&D to Revenue (%)", get_industry_rd_to_revenue_ratio),
+    ("R&D Investment vs Industry (pp)", get_rd_vs_industry),
+    ("2-Year Revenue Growth (%)", get_historical_revenue_growth),
+    ("Industry Revenue Growth (%)", get_industry_historical_revenue_growth),
+    ("Growth vs Industry Growth (pp)", get_growth_vs_industry_growth),
+    ("Trading Volume", get_trading_volume),
+    ("Industry Trading Volume", get_industry_trading_volume),
+    ("Trading Volume vs Industry", get_volume_vs_industry_volume),
+    ("Altman Z-Score", get_altman_z_score),
+    ("Industry Z-Score", get_industry_altman_z_score),
+    ("Z-Score vs Industry", get_z_score_vs_industry_z_score),
+]
+
+# Helpers that return several columns at once: (scope name, helper, {column: key})
+GROUPED_FEATURES = [
+    ("Earnings Per Share", get_eps, {
+        "Basic EPS": "basic",
+        "Diluted EPS": "diluted",
+    }),
+    ("Earnings Stability", get_earnings_stability, {
+        "Earnings Growth Volatility (%)": "volatility",
+        "Mean Earnings Growth (%)": "mean_growth",
+        "Earnings Growth Std Dev": "std_dev",
+    }),
+    ("Margin Changes", get_overall_margin_changes, {
+        "Current Gross Margin (%)": "current_gross_margin",
+        "Current Operating Margin (%)": "current_operating_margin",
+        "Current Net Margin (%)": "current_net_margin",
+        "Gross Margin Change (pp)": "gross_margin_change",
+        "Operating Margin Change (pp)": "operating_margin_change",
+        "Net Margin Change (pp)": "net_margin_change",
+        "Margin Trend Score": "margin_trend_score",
+        "Margin Stability Score": "margin_stability_score",
+    }),
+]
+
 def get_all_features(symbol):
-    eps_data = get_eps(symbol)
-    stability_data = get_earnings_stability(symbol)
-    margin_data = get_overall_margin_changes(symbol)
-    
-    features = {
-        "Market Cap": get_market_cap(symbol),
-        "PE Ratio": get_pe_ratio(symbol),
-        "Industry PE Ratio": get_industry_pe_ratio(symbol),
-        "PE vs Industry PE": get_pe_vs_industry_pe(symbol),
-        "PEG Ratio": get_peg_ratio(symbol),
-        "Price-to-Book Ratio": get_pb_ratio(symbol),
-        "Price-to-Sales Ratio": get_ps_ratio(symbol),
-        "EV/EBITDA": get_ev_to_ebitda(symbol),
-        "Beta": get_beta(symbol),
-        "Industry Beta": get_industry_beta(symbol),
-        "Beta vs Industry Beta": get_beta_vs_industry_beta(symbol),
-        "Debt/Equity Ratio": get_debt_to_equity_ratio(symbol),
-        "2-Year ROE (%)": get_two_year_roe(symbol),
-        "2-Year ROI (%)": get_two_year_roi(symbol),
-        "Revenue": get_revenue(symbol),
-        "Industry Revenue": get_industry_revenue(symbol),
-        "Revenue vs Industry Revenue": get_revenue_vs_industry_revenue(symbol),
-        "Current Market Share (%)": get_market_share_for_year(symbol, 0),
-        "Market Share 2 Years Ago (%)": get_market_share_for_year(symbol, 1),
-        "Market Share Growth (pp)": get_market_share_growth(symbol),
-        "R&D": get_rd_spending(symbol),
-        "R&D vs Revenue (%)": get_rd_to_revenue_ratio(symbol),
-        "Industry R&D to Revenue (%)": get_industry_rd_to_revenue_ratio(symbol),
-        "R&D Investment vs Industry (pp)": get_rd_vs_industry(symbol),
-        "2-Year Revenue Growth (%)": get_historical_revenue_growth(symbol),
-        "Industry Revenue Growth (%)": get_industry_historical_revenue_growth(symbol),
-        "Growth vs Industry Growth (pp)": get_growth_vs_industry_growth(symbol),
-        "Trading Volume": get_trading_volume(symbol),
-        "Industry Trading Volume": get_industry_trading_volume(symbol),
-        "Trading Volume vs Industry": get_volume_vs_industry_volume(symbol),
-        "Altman Z-Score": get_altman_z_score(symbol),
-        "Industry Z-Score": get_industry_altman_z_score(symbol),
-        "Z-Score vs Industry": get_z_score_vs_industry_z_score(symbol),
-        "Basic EPS": eps_data.get("basic") if eps_data else None,
-        "Diluted EPS": eps_data.get("diluted") if eps_data else None,
-        "Earnings Growth Volatility (%)": stability_data.get("volatility") if stability_data else None,
-        "Mean Earnings Growth (%)": stability_data.get("mean_growth") if stability_data else None,
-        "Earnings Growth Std Dev": stability_data.get("std_dev") if stability_data else None,
-        "Current Gross Margin (%)": margin_data.get("current_gross_margin") if margin_data else None,
-        "Current Operating Margin (%)": margin_data.get("current_operating_margin") if margin_data else None,
-        "Current Net Margin (%)": margin_data.get("current_net_margin") if margin_data else None,
-        "Gross Margin Change (pp)": margin_data.get("gross_margin_change") if margin_data else None,
-        "Operating Margin Change (pp)": margin_data.get("operating_margin_change") if margin_data else None,
-        "Net Margin Change (pp)": margin_data.get("net_margin_change") if margin_data else None,
-        "Margin Trend Score": margin_data.get("margin_trend_score") if margin_data else None,
-        "Margin Stability Score": margin_data.get("margin_stability_score") if margin_data else None
-    }
+    # Each helper runs in its own cost scope so --profile can charge it for its requests
+    grouped = {}
+    for name, helper, _ in GROUPED_FEATURES:
+        with feature_cost(name):
+            grouped[name] = helper(symbol)
+
+    features = {}
+    for column, helper in SINGLE_FEATURES:
+        with feature_cost(column):
+            features[column] = helper(symbol)
+    for name, _, columns in GROUPED_FEATURES:
+        data = grouped[name]
+        for column, key in columns.items():
+            features[column] = data.get(key) if data else None
+    return features
+
+##### Output files and refresh policy #####
+FEATURES_CSV_PATH = "stock_features.csv"
+MANIFEST_PATH = "stock_features_manifest.json"
+PRICE_TTL = 24 * 60 * 60  # Seconds before price-derived fields are refetched
+# Payloads that change when a company files, dropped from the cache for new filers
+FILING_ENDPOINTS = ["income-statement", "balance-sheet-statement", "ratios-ttm"]
+
+##### Symbols collected into stock_features.csv #####
+SYMBOLS = ["GOOGL", "T", "CHTR", "EA", "META", "NFLX", "VZ", "WBD", 
+           "ABNB", "AMZN", "CMG", "DHI", "F", "HD", "LULU", "MCD", "NKE", "TSLA", 
+           "KO", "COST", "GIS", "PEP", "PG", "WBA", "WMT",
+           "CVX", "COP", "XOM", "VLO",
+           "ALL", "AXP", "BAC", "BLK", "CB", "GS", "JPM", "PYPL", "V", 
+           "AMGN", "CI", "CVS", "HUM", "ISRG", "JNJ", "LLY", "MRNA", "PFE",
+           "BA", "DAL", "FDX", "HON", "LMT", "UBER", "WM",
+           "ACN", "AMD", "AAPL", "AVGO", "CSCO", "IBM", "INTC", "MU", "MSFT", "NVDA", "ORCL", "PLTR", "QCOM", "CRM", "NOW",
+           "AMCR", "DD", "FMC", "PPG", "SHW",
+           "CBRE", "EQIX", "O",
+           "AEP", "D", "VST", "XEL"]
+
+##### Endpoints every symbol needs, fetched concurrently before feature math #####
+def get_symbol_endpoints(symbol):
+    return [
+        f"profile/{symbol}",
+        f"quote/{symbol}",
+        f"ratios-ttm/{symbol}",
+        f"income-statement/{symbol}",
+        f"balance-sheet-statement/{symbol}",
+        f"historical-price-full/{symbol}",
+    ]
+
+##### Collect features for one symbol #####
+def collect_symbol_features(symbol, prefetch=True):
+    # prefetch=False leaves every request to the feature helper that first reads
+    # the payload, so a cost profile charges it to that column
+    print(f"Processing {symbol}...")
+    if prefetch:
+        get_client().prefetch(get_symbol_endpoints(symbol))
+    features = get_all_features(symbol)
+    features["Symbol"] = symbol
     return features
 
+##### Stage one: download every raw payload the features need into a local store #####
+# Peers only feed the industry aggregates and market share totals
+PEER_ENDPOINTS = ["profile", "quote", "ratios-ttm", "income-statement", "balance-sheet-statement"]
+MARKET_SHARE_PEER_COUNT = 10
+
+def download_symbol_statements(symbol, store, client):
+    for endpoint in get_symbol_endpoints(symbol):
+        store.download(client, endpoint)
+
+    profile_data = store.get_json(f"profile/{symbol}")
+    if not profile_data:
+        return
+    industry = profile_data[0].get("industry")
+    sector = profile_data[0].get("sector")
+
+    peer_symbols = set()
+    if industry:
+        industry_companies = store.download(client, "stock-screener", {"industry": industry})
+        for company in (industry_companies or [])[:industry_index.peer_count]:
+            if company.get("symbol"):
+                peer_symbols.add(company["symbol"])
+    for peer in peer_symbols:
+        for endpoint in PEER_ENDPOINTS:
+            store.download(client, f"{endpoint}/{peer}")
+
+    search_params = get_market_share_search_params(industry, sector)
+    if not search_params:
+        return
+    peer_companies = store.download(client, "stock-screener", search_params)
+    for company in (peer_companies or [])[:MARKET_SHARE_PEER_COUNT]:
+        if company.get("symbol"):
+            store.download(client, f"income-statement/{company['symbol']}")
+
+def download_raw_statements(symbols=SYMBOLS, store_path=RAW_STORE_PATH, max_workers=8):
+    store = RawStatementStore(store_path)
+    client = get_client()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(download_symbol_statements, symbol, store, client): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                future.result()
+                print(f"Downloaded raw statements for {symbol}")
+            except Exception as e:
+                print(f"Error downloading {symbol}: {str(e)}")
+
+    print(f"Raw store {store_path} holds {len(store)} payloads")
+    return store
+
+##### Stage two: derive every feature column from the store, with no network access #####
+def features_from_store(symbols=SYMBOLS, store_path=RAW_STORE_PATH, max_workers=8):
+    live_client = get_client()
+    set_client(RawStatementStore(store_path))
+    try:
+        return features_to_csv(symbols, max_workers=max_workers)
+    finally:
+        set_client(live_client)
+
+##### Output columns, in logical groups #####
+COLUMN_ORDER = [
+    "Symbol",
+    # Size metrics
+    "Market Cap",
+    "Revenue",
+    # Market Share metrics
+    "Current Market Share (%)",
+    "Market Share 2 Years Ago (%)",
+    "Market Share Growth (pp)",
+    # Margin metrics
+    "Current Gross Margin (%)",
+    "Current Operating Margin (%)",
+    "Current Net Margin (%)",
+    "Gross Margin Change (pp)",
+    "Operating Margin Change (pp)",
+    "Net Margin Change (pp)",
+    "Margin Trend Score",
+    "Margin Stability Score",
+    # Earnings metrics
+    "Basic EPS",
+    "Diluted EPS",
+    "Earnings Growth Volatility (%)",
+    "Mean Earnings Growth (%)",
+    "Earnings Growth Std Dev",
+    # Growth metrics
+    "2-Year Revenue Growth (%)",
+    "Industry Revenue Growth (%)",
+    "Growth vs Industry Growth (pp)",
+    # R&D metrics
+    "R&D",
+    "R&D vs Revenue (%)",
+    "Industry R&D to Revenue (%)",
+    "R&D Investment vs Industry (pp)",
+    # Volume metrics
+    "Trading Volume",
+    "Industry Trading Volume",
+    "Trading Volume vs Industry",
+    # Industry comparisons
+    "Industry Revenue",
+    "Revenue vs Industry Revenue",
+    # Risk metrics
+    "Beta",
+    "Industry Beta",
+    "Beta vs Industry Beta",
+    "Altman Z-Score",
+    "Industry Z-Score",
+    "Z-Score vs Industry",
+    # Valuation metrics
+    "PE Ratio",
+    "Industry PE Ratio",
+    "PE vs Industry PE",
+    "PEG Ratio",
+    "Price-to-Book Ratio",
+    "Price-to-Sales Ratio",
+    "EV/EBITDA",
+    # Performance metrics
+    "2-Year ROE (%)",
+    "2-Year ROI (%)",
+    # Financial health metrics
+    "Debt/Equity Ratio"
+]
+
+##### Collect features for many symbols in parallel #####
+def collect_features(symbols, max_workers=8, prefetch=True):
+    # Symbols are collected in parallel; the shared client's token bucket
+    # keeps the combined request rate within our FMP plan
+    results = {}
+    # Industries and peer sets are rebuilt each run rather than kept for the process lifetime
+    industry_index.clear()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(collect_symbol_features, symbol, prefetch): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                print(f"Error processing {symbol}: {str(e)}")
+
+    # Keep the original symbol order in the output
+    return [results[symbol] for symbol in symbols if symbol in results]
+
 ##### Save features to CSV #####
-def features_to_csv():
-    symbols = ["GOOGL", "T", "CHTR", "EA", "META", "NFLX", "VZ", "WBD", 
-               "ABNB", "AMZN", "CMG", "DHI", "F", "HD", "LULU", "MCD", "NKE", "TSLA", 
-               "KO", "COST", "GIS", "PEP", "PG", "WBA", "WMT",
-               "CVX", "COP", "XOM", "VLO",
-               "ALL", "AXP", "BAC", "BLK", "CB", "GS", "JPM", "PYPL", "V", 
-               "AMGN", "CI", "CVS", "HUM", "ISRG", "JNJ", "LLY", "MRNA", "PFE",
-               "BA", "DAL", "FDX", "HON", "LMT", "UBER", "WM",
-               "ACN", "AMD", "AAPL", "AVGO", "CSCO", "IBM", "INTC", "MU", "MSFT", "NVDA", "ORCL", "PLTR", "QCOM", "CRM", "NOW",
-               "AMCR", "DD", "FMC", "PPG", "SHW",
-               "CBRE", "EQIX", "O",
-               "AEP", "D", "VST", "XEL"]
-    data = []
-    
-    for symbol in symbols:
-        try:
-            print(f"Processing {symbol}...")
-            features = get_all_features(symbol)
-            features["Symbol"] = symbol
-            data.append(features)
-            time.sleep(0.25)  # Add a small delay between stocks to avoid hitting API rate limits
-        except Exception as e:
-            print(f"Error processing {symbol}: {str(e)}")
-            continue
+def features_to_csv(symbols=SYMBOLS, max_workers=8, output_path=FEATURES_CSV_PATH, profile=False,
+                    report_path=None, manifest_path=MANIFEST_PATH):
+    # profile: print each feature's upstream cost (requests, bytes, throttle waits, time)
+    # after collecting; report_path also saves the cost report as JSON. Profiled runs
+    # skip the per-symbol prefetch so each request is charged to a feature column
+    if profile:
+        with FeatureCostProfiler(get_client()) as profiler:
+            data = collect_features(symbols, max_workers, prefetch=False)
+        profiler.print_report(len(symbols))
+        if report_path:
+            profiler.write_report(report_path, len(symbols))
+    else:
+        data = collect_features(symbols, max_workers)
 
     if not data:
         print("No data was collected. Please check your API key and internet connection.")
         return
 
     df = pd.DataFrame(data)
-    
-    # Reorder columns in logical groups
-    column_order = [
-        "Symbol",
-        # Size metrics
-        "Market Cap",
-        "Revenue",
-        # Market Share metrics
-        "Current Market Share (%)",
-        "Market Share 2 Years Ago (%)",
-        "Market Share Growth (pp)",
-        # Margin metrics
-        "Current Gross Margin (%)",
-        "Current Operating Margin (%)",
-        "Current Net Margin (%)",
-        "Gross Margin Change (pp)",
-        "Operating Margin Change (pp)",
-        "Net Margin Change (pp)",
-        "Margin Trend Score",
-        "Margin Stability Score",
-        # Earnings metrics
-        "Basic EPS",
-        "Diluted EPS",
-        "Earnings Growth Volatility (%)",
-        "Mean Earnings Growth (%)",
-        "Earnings Growth Std Dev",
-        # Growth metrics
-        "2-Year Revenue Growth (%)",
-        "Industry Revenue Growth (%)",
-        "Growth vs Industry Growth (pp)",
-        # R&D metrics
-        "R&D",
-        "R&D vs Revenue (%)",
-        "Industry R&D to Revenue (%)",
-        "R&D Investment vs Industry (pp)",
-        # Volume metrics
-        "Trading Volume",
-        "Industry Trading Volume",
-        "Trading Volume vs Industry",
-        # Industry comparisons
-        "Industry Revenue",
-        "Revenue vs Industry Revenue",
-        # Risk metrics
-        "Beta",
-        "Industry Beta",
-        "Beta vs Industry Beta",
-        "Altman Z-Score",
-        "Industry Z-Score",
-        "Z-Score vs Industry",
-        # Valuation metrics
-        "PE Ratio",
-        "Industry PE Ratio",
-        "PE vs Industry PE",
-        "PEG Ratio",
-        "Price-to-Book Ratio",
-        "Price-to-Sales Ratio",
-        "EV/EBITDA",
-        # Performance metrics
-        "2-Year ROE (%)",
-        "2-Year ROI (%)",
-        # Financial health metrics
-        "Debt/Equity Ratio"
-    ]
-    
-    df = df[column_order]
-    df.to_csv("stock_features.csv", index=False)
+    df = df[COLUMN_ORDER]
+    df.to_csv(output_path, index=False)
+
+    # Record what was collected so the next --refresh only refetches what changed
+    manifest = load_manifest(manifest_path)
+    client = get_client()
+    fetched_at = time.time()
+    for features in data:
+        symbol = features["Symbol"]
+        manifest[symbol] = {
+            "filing_date": filing_date_of(get_income_statement(symbol)),
+            # A raw store serves payloads as old as their download
+            "fetched_at": (client.fetched_at(f"quote/{symbol}") if hasattr(client, "fetched_at") else None)
+                          or fetched_at,
+        }
+    save_manifest(manifest, manifest_path)
+    return df
+
+##### Incremental refresh: refetch only symbols with new filings or stale prices #####
+def filing_date_of(income_statement):
+    if income_statement and len(income_statement) > 0:
+        return income_statement[0].get("fillingDate") or income_statement[0].get("date")
+    return None
+
+def get_latest_filing_date(symbol):
+    # A one-row statement request is the cheapest way to see whether a company
+    # filed; it must come from FMP, and is never worth caching
+    return filing_date_of(get_client().get_json(f"income-statement/{symbol}", {"limit": 1}, use_cache=False))
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest, manifest_path):
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+def refresh_features_csv(symbols=SYMBOLS, max_workers=8, output_path=FEATURES_CSV_PATH,
+                         manifest_path=MANIFEST_PATH, price_ttl=PRICE_TTL):
+    if not Path(output_path).exists():
+        print(f"No existing {output_path}; running a full build.")
+        existing = pd.DataFrame(columns=COLUMN_ORDER)
+    else:
+        existing = pd.read_csv(output_path)
+    manifest = load_manifest(manifest_path)
+    existing_symbols = set(existing["Symbol"])
+    now = time.time()
+
+    # Check every symbol's latest filing concurrently
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        filing_dates = dict(zip(symbols, executor.map(get_latest_filing_date, symbols)))
+
+    stale = []
+    new_filers = []
+    for symbol in symbols:
+        entry = manifest.get(symbol)
+        if symbol not in existing_symbols or entry is None:
+            stale.append(symbol)
+        elif filing_dates[symbol] is not None and filing_dates[symbol] != entry.get("filing_date"):
+            stale.append(symbol)
+            new_filers.append(symbol)
+        elif now - entry.get("fetched_at", 0) > price_ttl:
+            stale.append(symbol)
+
+    # Statements cached before the new filing (e.g. in the 24 h disk tier) would
+    # rebuild the row from old numbers, so refetch them
+    client = get_client()
+    if hasattr(client, "invalidate"):
+        for symbol in new_filers:
+            for endpoint in FILING_ENDPOINTS:
+                client.invalidate(f"{endpoint}/{symbol}")
+
+    print(f"Refreshing {len(stale)} of {len(symbols)} symbols...")
+    if not stale:
+        return existing
+
+    data = collect_features(stale, max_workers)
+    fetched_at = time.time()
+    for features in data:
+        symbol = features["Symbol"]
+        manifest[symbol] = {"filing_date": filing_dates.get(symbol), "fetched_at": fetched_at}
+
+    # Fresh rows replace stale ones; untouched symbols keep their existing rows
+    refreshed = pd.DataFrame(data, columns=COLUMN_ORDER)
+    kept = existing[~existing["Symbol"].isin(refreshed["Symbol"])]
+    df = pd.concat([kept, refreshed], ignore_index=True)
+    order = {symbol: i for i, symbol in enumerate(symbols)}
+    df = df.sort_values("Symbol", key=lambda col: col.map(lambda s: order.get(s, len(order))), kind="stable")
+    df = df[COLUMN_ORDER]
+
+    df.to_csv(output_path, index=False)
+    save_manifest(manifest, manifest_path)
+    return df
 
-def main():    
-    features_to_csv()
+def main():
+    # --download: stage one only; --from-store: stage two only;
+    # --refresh [ttl_hours]: incremental update; --profile [report.json]: full live
+    # collection plus a per-feature cost report; default: full live collection
+    if len(sys.argv) > 1 and sys.argv[1] == '--download':
+        download_raw_statements()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--refresh':
+        price_ttl = float(sys.argv[2]) * 60 * 60 if len(sys.argv) > 2 else PRICE_TTL
+        refresh_features_csv(price_ttl=price_ttl)
+    elif len(sys.argv) > 1 and sys.argv[1] == '--from-store':
+        features_from_store()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--profile':
+        features_to_csv(profile=True, report_path=sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        features_to_csv()
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
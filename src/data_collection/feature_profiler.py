@@ -0,0 +1,181 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# ====================================================
+# Upstream Cost Profiler for Feature Collection
+# ====================================================
+# Attributes every FMP lookup made while collecting features to the feature
+# column whose helper made it. Helpers run inside feature_cost(column); the
+# client reports each lookup to the active profiler, which charges it to the
+# innermost open scope in the calling thread (prefetch workers inherit it).
+# Profiled collections skip the per-symbol endpoint prefetch, so every request
+# is made, and charged, by the first column that reads the payload.
+#
+# Two views per feature:
+#   attributed  - network requests, bytes, throttle waits and retries the feature
+#                 actually caused (anything an earlier feature already cached is free)
+#   standalone  - distinct payloads the feature reads, i.e. what it would cost if
+#                 it were the only column collected
+#
+# Industry aggregates are computed once per industry and memoized outside the
+# client, so they are charged to the first column that needs them (e.g.
+# "Industry PE Ratio") and the later industry columns show no lookups at all.
+#
+# Throttle time is the client's rate-limiter wait; retry backoff is part of the
+# request time, since the adapter sleeps between attempts.
+
+UNATTRIBUTED = "(unattributed)"
+
+_current_feature = contextvars.ContextVar("current_feature", default=None)
+_active_profiler = None
+
+
+@contextmanager
+def feature_cost(name):
+    """Charge FMP lookups and time inside the with-block to a feature (no-op unless profiling)"""
+    profiler = _active_profiler
+    if profiler is None:
+        yield
+        return
+    token = _current_feature.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current_feature.reset(token)
+        profiler.add_call(name, time.perf_counter() - start)
+
+
+class FeatureCost:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.requests = 0
+        self.bytes = 0
+        self.request_seconds = 0.0
+        self.throttle_seconds = 0.0
+        self.retries = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.keys = set()
+
+
+class FeatureCostProfiler:
+    def __init__(self, client):
+        """
+        Per-feature cost of a collection run
+
+        Use as a context manager around the collection; only one profiler can be active.
+
+        Args:
+            client: The shared FMP client (a RawStatementStore has no listeners and reports nothing)
+        """
+        self.client = client
+        self.features = {}
+        self.payload_bytes = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        global _active_profiler
+        if _active_profiler is not None:
+            raise RuntimeError("A feature cost profiler is already active")
+        _active_profiler = self
+        if hasattr(self.client, "add_listener"):
+            self.client.add_listener(self.on_lookup)
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active_profiler
+        if hasattr(self.client, "remove_listener"):
+            self.client.remove_listener(self.on_lookup)
+        _active_profiler = None
+        return False
+
+    def _feature(self, name):
+        return self.features.setdefault(name, FeatureCost())
+
+    def add_call(self, name, seconds):
+        with self._lock:
+            cost = self._feature(name)
+            cost.calls += 1
+            cost.seconds += seconds
+
+    def on_lookup(self, event):
+        """FMP client listener: charge one lookup to the current feature"""
+        name = _current_feature.get() or UNATTRIBUTED
+        with self._lock:
+            cost = self._feature(name)
+            cost.keys.add(event["key"])
+            if event["kind"] == "network":
+                cost.requests += 1
+                cost.bytes += event["bytes"]
+                cost.request_seconds += event["seconds"]
+                cost.throttle_seconds += event["throttle_seconds"]
+                cost.retries += event["retries"]
+                if event["status"] != 200:
+                    cost.failures += 1
+                self.payload_bytes[event["key"]] = event["bytes"]
+            elif event["kind"] == "coalesced":
+                cost.coalesced += 1
+            else:
+                cost.cache_hits += 1
+
+    def report(self, symbol_count=1):
+        """
+        Features ranked by attributed requests, then bytes, then time
+
+        Args:
+            symbol_count: Symbols collected, for the per-symbol averages
+        """
+        per_symbol = max(symbol_count, 1)
+        with self._lock:
+            rows = []
+            for name, cost in self.features.items():
+                standalone_bytes = sum(self.payload_bytes.get(key, 0) for key in cost.keys)
+                rows.append({
+                    "feature": name,
+                    "calls": cost.calls,
+                    "ms": round(cost.seconds * 1000, 1),
+                    "requests": cost.requests,
+                    "bytes": cost.bytes,
+                    "request_ms": round(cost.request_seconds * 1000, 1),
+                    "throttle_ms": round(cost.throttle_seconds * 1000, 1),
+                    "retries": cost.retries,
+                    "failures": cost.failures,
+                    "cache_hits": cost.cache_hits,
+                    "coalesced": cost.coalesced,
+                    "standalone_requests": len(cost.keys),
+                    "standalone_bytes": standalone_bytes,
+                    "requests_per_symbol": round(cost.requests / per_symbol, 2),
+                    "bytes_per_symbol": round(cost.bytes / per_symbol),
+                    "ms_per_symbol": round(cost.seconds * 1000 / per_symbol, 1),
+                })
+        rows.sort(key=lambda row: (row["requests"], row["bytes"], row["ms"]), reverse=True)
+        return {
+            "symbols": symbol_count,
+            "requests": sum(row["requests"] for row in rows),
+            "bytes": sum(row["bytes"] for row in rows),
+            "throttle_ms": round(sum(row["throttle_ms"] for row in rows), 1),
+            "features": rows,
+        }
+
+    def print_report(self, symbol_count=1, top=None):
+        report = self.report(symbol_count)
+        print(f"\nUpstream cost by feature ({report['symbols']} symbols, {report['requests']} requests, "
+              f"{report['bytes'] / 1e6:.1f} MB, {report['throttle_ms'] / 1000:.1f} s throttled)")
+        print(f"{'feature':<40} {'req':>6} {'req/sym':>8} {'KB':>9} {'ms':>9} {'throttle':>9} "
+              f"{'retry':>6} {'hits':>6} {'alone':>6}")
+        for row in report["features"][:top]:
+            print(f"{row['feature'][:40]:<40} {row['requests']:>6} {row['requests_per_symbol']:>8} "
+                  f"{row['bytes'] / 1000:>9.1f} {row['ms']:>9.1f} {row['throttle_ms']:>9.1f} "
+                  f"{row['retries']:>6} {row['cache_hits']:>6} {row['standalone_requests']:>6}")
+        return report
+
+    def write_report(self, path, symbol_count=1):
+        with open(path, "w") as f:
+            json.dump(self.report(symbol_count), f, indent=2)
+        print(f"Wrote feature cost report to {path}")
@@ -0,0 +1,86 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from fmp_client import FMPClient
+
+RAW_STORE_PATH = "raw_statements.sqlite"
+
+
+class RawStatementStore:
+    def __init__(self, path=RAW_STORE_PATH):
+        """
+        Local SQLite store of raw FMP payloads (statements, ratios, profiles, prices)
+
+        Payloads are keyed exactly like the FMP client cache, so the store can
+        stand in for the client and serve every feature helper with no network.
+
+        Args:
+            path: SQLite file holding the payloads
+        """
+        self.path = Path(path)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS payloads (
+                       key TEXT PRIMARY KEY,
+                       path TEXT NOT NULL,
+                       fetched_at REAL NOT NULL,
+                       data TEXT NOT NULL
+                   )"""
+            )
+
+    def _connect(self):
+        """One connection per thread; SQLite connections cannot be shared"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def put(self, endpoint, data, params=None, fetched_at=None):
+        """Store one raw payload"""
+        path, query = FMPClient._split_endpoint(endpoint, params)
+        key = FMPClient.cache_key(path, query)
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO payloads (key, path, fetched_at, data) VALUES (?, ?, ?, ?)",
+                    (key, path, fetched_at or time.time(), json.dumps(data)),
+                )
+
+    def get_json(self, endpoint, params=None, **kwargs):
+        """Serve a payload from the store; never touches the network"""
+        path, query = FMPClient._split_endpoint(endpoint, params)
+        key = FMPClient.cache_key(path, query)
+        row = self._connect().execute("SELECT data FROM payloads WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def prefetch(self, endpoints, max_workers=None):
+        """Everything is already local, so prefetching is just a lookup"""
+        return [self.get_json(*endpoint) if isinstance(endpoint, tuple) else self.get_json(endpoint)
+                for endpoint in endpoints]
+
+    def fetched_at(self, endpoint, params=None):
+        """When a payload was downloaded (None if it is not in the store)"""
+        path, query = FMPClient._split_endpoint(endpoint, params)
+        key = FMPClient.cache_key(path, query)
+        row = self._connect().execute("SELECT fetched_at FROM payloads WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def download(self, client, endpoint, params=None):
+        """Fetch a payload through the live client and keep a copy in the store"""
+        data = client.get_json(endpoint, params)
+        if data is not None:
+            self.put(endpoint, data, params)
+        return data
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM payloads").fetchone()[0]
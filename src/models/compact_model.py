@@ -0,0 +1,373 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# ====================================================
+# Compact Inference Format for Trained Models
+# ====================================================
+# A trained model (sklearn Pipeline / estimator, XGBoost regressor) is exported
+# to a directory holding a manifest.json plus one .npy file per array:
+#   - tree ensembles become flat node arrays (feature, threshold, children,
+#     leaf value, missing-value direction) with one root offset per tree
+#   - linear models become a coefficient vector and intercept
+#   - RobustScaler / MinMaxScaler preprocessing becomes plain arrays
+# Loading needs only numpy: the arrays are memory-mapped, so a cold start does
+# not unpickle sklearn objects and every worker shares the same pages.
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+def compact_path(pickle_path):
+    """Directory a pickled model is exported to (e.g. risk_model.pkl -> risk_model.compact)"""
+    return Path(pickle_path).with_suffix(".compact")
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def artifact_mtime(pickle_path):
+    """
+    Modification times (ns) of a saved model as (pickle, compact manifest)
+
+    Either entry is None when that file is missing, and the whole result is
+    None if neither exists. Both are tracked so exporting a compact copy next
+    to an already-loaded pickle counts as a change and triggers a reload.
+    """
+    mtimes = []
+    for path in (Path(pickle_path), compact_path(pickle_path) / MANIFEST):
+        try:
+            mtimes.append(path.stat().st_mtime_ns)
+        except FileNotFoundError:
+            mtimes.append(None)
+    if mtimes == [None, None]:
+        return None
+    return tuple(mtimes)
+
+
+def is_current(pickle_path):
+    """
+    True if the compact export exists and was made from the pickle as it is now
+
+    A compact export deployed without its pickle is current (see artifact_mtime).
+    """
+    manifest_path = compact_path(pickle_path) / MANIFEST
+    if not manifest_path.exists():
+        return False
+    if not Path(pickle_path).exists():
+        return True
+    try:
+        with open(manifest_path) as f:
+            source = json.load(f).get("source_sha1")
+    except (OSError, ValueError):
+        return False
+    # File times are not reliable across checkouts, so compare content
+    return source == _file_digest(pickle_path)
+
+
+# ====================================================
+# Export (runs where the training libraries are installed)
+# ====================================================
+# Estimators are recognised by class name so this module never imports sklearn.
+
+def _flatten_sklearn_trees(estimators):
+    feature, threshold, left, right, value, default_left, roots = [], [], [], [], [], [], []
+    offset = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        feature.append(np.where(is_leaf, -1, tree.feature))
+        threshold.append(tree.threshold)
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        value.append(tree.value[:, 0, 0])
+        # Trees fitted without missing values send NaN right (NaN <= t is False)
+        missing_left = getattr(tree, "missing_go_to_left", None)
+        default_left.append(np.zeros(tree.node_count, dtype=bool) if missing_left is None
+                            else missing_left.astype(bool))
+        offset += tree.node_count
+    return feature, threshold, left, right, value, default_left, roots
+
+
+def _flatten_xgboost(booster):
+    model = json.loads(booster.save_raw("json"))
+    learner = model["learner"]
+    objective = learner["objective"]["name"]
+    if objective not in ("reg:squarederror", "reg:linear"):
+        raise ValueError(f"Unsupported XGBoost objective '{objective}'")
+
+    feature, threshold, left, right, value, default_left, roots = [], [], [], [], [], [], []
+    offset = 0
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        children_left = np.array(tree["left_children"])
+        children_right = np.array(tree["right_children"])
+        conditions = np.array(tree["split_conditions"], dtype=np.float32)
+        is_leaf = children_left == -1
+        roots.append(offset)
+        feature.append(np.where(is_leaf, -1, tree["split_indices"]))
+        threshold.append(conditions)
+        left.append(np.where(is_leaf, -1, children_left + offset))
+        right.append(np.where(is_leaf, -1, children_right + offset))
+        # Leaf values are stored in split_conditions
+        value.append(np.where(is_leaf, conditions, 0))
+        default_left.append(np.array(tree["default_left"], dtype=bool))
+        offset += len(children_left)
+
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+    return (feature, threshold, left, right, value, default_left, roots), base_score
+
+
+def _flatten_hist_gradient_boosting(model):
+    feature, threshold, left, right, value, default_left, roots = [], [], [], [], [], [], []
+    offset = 0
+    for predictors in model._predictors:
+        nodes = predictors[0].nodes
+        is_leaf = nodes["is_leaf"].astype(bool)
+        roots.append(offset)
+        feature.append(np.where(is_leaf, -1, nodes["feature_idx"]))
+        threshold.append(nodes["num_threshold"])
+        left.append(np.where(is_leaf, -1, nodes["left"].astype(np.int64) + offset))
+        right.append(np.where(is_leaf, -1, nodes["right"].astype(np.int64) + offset))
+        value.append(nodes["value"])
+        default_left.append(nodes["missing_go_to_left"].astype(bool))
+        offset += len(nodes)
+    return feature, threshold, left, right, value, default_left, roots
+
+
+def _tree_depth(left, right, roots):
+    depth = 0
+    for root in roots:
+        stack = [(root, 0)]
+        while stack:
+            node, level = stack.pop()
+            depth = max(depth, level)
+            if left[node] != -1:
+                stack.append((left[node], level + 1))
+                stack.append((right[node], level + 1))
+    return depth
+
+
+def _export_estimator(estimator):
+    """Manifest entries and arrays for the final estimator"""
+    name = type(estimator).__name__
+
+    if name in ("LinearRegression", "Ridge", "Lasso", "ElasticNet"):
+        return {"kind": "linear", "intercept": float(np.ravel(estimator.intercept_)[0])}, {
+            "coef": np.ravel(estimator.coef_).astype(np.float64)
+        }
+
+    if name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        parts = _flatten_sklearn_trees(estimator.estimators_)
+        spec = {"aggregate": "mean", "base_score": 0.0, "comparison": "le", "input_dtype": "float32"}
+    elif name == "XGBRegressor":
+        parts, base_score = _flatten_xgboost(estimator.get_booster())
+        spec = {"aggregate": "sum", "base_score": base_score, "comparison": "lt", "input_dtype": "float32"}
+    elif name == "HistGradientBoostingRegressor":
+        parts = _flatten_hist_gradient_boosting(estimator)
+        spec = {"aggregate": "sum", "base_score": float(np.ravel(estimator._baseline_prediction)[0]),
+                "comparison": "le", "input_dtype": "float64"}
+    else:
+        raise ValueError(f"No compact export for {name}")
+
+    feature, threshold, left, right, value, default_left, roots = parts
+    arrays = {
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "value": np.concatenate(value).astype(np.float64),
+        "default_left": np.concatenate(default_left).astype(bool),
+        "roots": np.array(roots, dtype=np.int32),
+    }
+    spec.update(kind="tree_ensemble", estimator=name,
+                max_depth=_tree_depth(arrays["left"], arrays["right"], arrays["roots"]))
+    return spec, arrays
+
+
+def _export_preprocessor(preprocessor):
+    """Column selection + RobustScaler from the risk pipeline's ColumnTransformer"""
+    transformers = [t for t in preprocessor.transformers_ if t[0] != "remainder"]
+    if (len(transformers) != 1 or type(transformers[0][1]).__name__ != "RobustScaler"
+            or preprocessor.remainder != "drop"):
+        raise ValueError("Only a single RobustScaler ColumnTransformer can be exported")
+    _, scaler, columns = transformers[0]
+    n = len(columns)
+    center = scaler.center_ if scaler.with_centering else np.zeros(n)
+    scale = scaler.scale_ if scaler.with_scaling else np.ones(n)
+    return {"columns": list(columns)}, {"robust_center": np.asarray(center, dtype=np.float64),
+                                        "robust_scale": np.asarray(scale, dtype=np.float64)}
+
+
+def export_compact(model, path, scalers=None, metadata=None, source=None):
+    """
+    Export a trained model to the compact inference format
+
+    Args:
+        model: Fitted estimator, or a Pipeline of a ColumnTransformer and an estimator
+        path: Output directory (replaced atomically)
+        scalers: Optional dict of fitted MinMaxScalers keyed by feature (growth model)
+        metadata: JSON-serialisable extras stored in the manifest
+        source: Pickle the model was saved to; its digest marks the export as current
+    """
+    manifest = {"format": FORMAT_VERSION, "metadata": metadata or {}}
+    if source is not None:
+        manifest["source_sha1"] = _file_digest(source)
+    arrays = {}
+
+    estimator = model
+    if type(model).__name__ == "Pipeline":
+        steps = dict(model.steps)
+        estimator = model.steps[-1][1]
+        if "preprocessor" in steps:
+            spec, preprocess_arrays = _export_preprocessor(steps["preprocessor"])
+            manifest["preprocess"] = spec
+            arrays.update(preprocess_arrays)
+
+    spec, model_arrays = _export_estimator(estimator)
+    manifest["model"] = spec
+    arrays.update(model_arrays)
+
+    feature_names = getattr(estimator, "feature_names_in_", None)
+    if feature_names is not None:
+        manifest["model"]["feature_names"] = [str(name) for name in feature_names]
+
+    if scalers:
+        manifest["scalers"] = list(scalers)
+        arrays["scaler_min"] = np.array([float(scalers[f].min_[0]) for f in scalers])
+        arrays["scaler_scale"] = np.array([float(scalers[f].scale_[0]) for f in scalers])
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(tmp_path / f"{name}.npy", np.ascontiguousarray(array))
+    with open(tmp_path / MANIFEST, "w") as f:
+        json.dump(manifest, f, default=str)
+
+    # Swap the new export in place of the old one
+    old_path = path.with_name(path.name + ".old")
+    shutil.rmtree(old_path, ignore_errors=True)
+    if path.exists():
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    print(f"Exported compact model to {path}")
+    return path
+
+
+# ====================================================
+# Inference (numpy only)
+# ====================================================
+
+class CompactMinMaxScaler:
+    """Stand-in for a fitted MinMaxScaler: transform(X) = X * scale + min"""
+
+    def __init__(self, min_, scale_):
+        self.min_ = min_
+        self.scale_ = scale_
+
+    def transform(self, values):
+        return np.asarray(values, dtype=np.float64) * self.scale_ + self.min_
+
+
+class CompactModel:
+    def __init__(self, path):
+        """
+        Numpy-only predictor for a model exported with export_compact
+
+        Args:
+            path: Export directory; arrays are memory-mapped read-only
+        """
+        self.path = Path(path)
+        with open(self.path / MANIFEST) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model format in {self.path}")
+
+        self.manifest = manifest
+        self.metadata = manifest.get("metadata", {})
+        self.spec = manifest["model"]
+        self.arrays = {p.stem: np.load(p, mmap_mode="r") for p in self.path.glob("*.npy")}
+
+        self.columns = manifest.get("preprocess", {}).get("columns") or self.spec.get("feature_names")
+        self.scalers = None
+        if "scalers" in manifest:
+            self.scalers = {
+                feature: CompactMinMaxScaler(self.arrays["scaler_min"][i], self.arrays["scaler_scale"][i])
+                for i, feature in enumerate(manifest["scalers"])
+            }
+
+    def _inputs(self, X):
+        if self.columns is not None and hasattr(X, "columns"):
+            X = X[self.columns]
+        X = np.array(X, dtype=np.float64)
+        if "robust_center" in self.arrays:
+            X = (X - self.arrays["robust_center"]) / self.arrays["robust_scale"]
+        return X
+
+    def _predict_trees(self, X):
+        a = self.arrays
+        X = X.astype(self.spec["input_dtype"])
+        n = X.shape[0]
+        rows = np.arange(n)[:, None]
+        # Walk every (sample, tree) pair one level per iteration
+        nodes = np.broadcast_to(a["roots"], (n, len(a["roots"]))).copy()
+        for _ in range(self.spec["max_depth"]):
+            feature = a["feature"][nodes]
+            leaf = feature < 0
+            if leaf.all():
+                break
+            x = X[rows, np.where(leaf, 0, feature)]
+            threshold = a["threshold"][nodes]
+            if self.spec["comparison"] == "lt":
+                # XGBoost compares in float32
+                go_left = x < threshold.astype(np.float32)
+            else:
+                go_left = x <= threshold
+            go_left = np.where(np.isnan(x), a["default_left"][nodes], go_left)
+            nodes = np.where(leaf, nodes, np.where(go_left, a["left"][nodes], a["right"][nodes]))
+
+        leaf_values = a["value"][nodes]
+        if self.spec["aggregate"] == "mean":
+            return leaf_values.mean(axis=1)
+        return self.spec["base_score"] + leaf_values.sum(axis=1)
+
+    def predict(self, X):
+        X = self._inputs(X)
+        if self.spec["kind"] == "linear":
+            return X @ self.arrays["coef"] + self.spec["intercept"]
+        return self._predict_trees(X)
+
+
+def load_compact(path):
+    return CompactModel(path)
+
+
+if __name__ == "__main__":
+    # Export the saved growth and risk pickles: python compact_model.py [model_dir]
+    import joblib
+
+    model_dir = Path(sys.argv[1] if len(sys.argv) > 1 else "../model_data")
+
+    growth_path = model_dir / "growth_potential_model.pkl"
+    if growth_path.exists():
+        growth = joblib.load(growth_path)
+        export_compact(growth["model"], compact_path(growth_path), scalers=growth["scalers"],
+                       source=growth_path)
+
+    risk_path = model_dir / "risk_model.pkl"
+    if risk_path.exists():
+        risk = joblib.load(risk_path)
+        export_compact(risk["model"], compact_path(risk_path), metadata={
+            "feature_columns": risk["feature_columns"],
+            "model_metadata": risk.get("model_metadata", {})
+        }, source=risk_path)
@@ -0,0 +1,547 @@
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from service_metrics import FMP_CACHE_LOOKUPS, FMP_LATENCY, FMP_REQUESTS, FMP_RETRIES, fmp_endpoint
+
+# Import your API key
+try:
+    from API_KEY import API_KEY
+except ImportError:
+    API_KEY = None
+    print("Warning: API_KEY not found. Please create API_KEY.py with your API key.")
+
+# Point every module at another server (e.g. fmp_replay.py) with FMP_BASE_URL
+BASE_URL = os.environ.get("FMP_BASE_URL", "https://financialmodelingprep.com/api/v3")
+
+# Requests per minute allowed by our FMP plan
+CALLS_PER_MINUTE = int(os.environ.get("FMP_CALLS_PER_MINUTE", 300))
+
+# ====================================================
+# Connection Pooling and Retries
+# ====================================================
+POOL_SIZE = 16
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+CONNECT_TIMEOUT = 3.05
+
+
+def create_session(pool_size=POOL_SIZE, retries=3, backoff_factor=0.5):
+    """
+    Create a keep-alive session with a bounded connection pool
+
+    Retries 429/5xx responses and connection errors with exponential backoff,
+    honouring FMP's Retry-After header when present.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry, pool_block=True)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return session
+
+
+# ====================================================
+# Cache Lifetimes (seconds) by FMP Endpoint
+# ====================================================
+# Statements only change when a company files, prices move all day.
+DEFAULT_TTL = 60 * 60
+ENDPOINT_TTLS = {
+    "quote": 60,
+    "historical-price-full": 60 * 60,
+    "profile": 60 * 60,
+    "ratios-ttm": 60 * 60,
+    "stock-screener": 24 * 60 * 60,
+    "income-statement": 24 * 60 * 60,
+    "balance-sheet-statement": 24 * 60 * 60,
+    "cash-flow-statement": 24 * 60 * 60,
+}
+
+# Most symbols sent in one comma-separated quote/profile request
+BATCH_CHUNK_SIZE = 50
+
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every thread making FMP requests"""
+
+    def __init__(self, calls_per_minute=CALLS_PER_MINUTE, burst=None):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1, calls_per_minute // 10)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class DiskCache:
+    """Optional on-disk cache tier storing one JSON file per response"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.json"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) < time.time():
+            return None
+        return entry.get("data")
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"key": key, "expires_at": time.time() + ttl, "data": value}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write cache entry for {key}: {e}")
+
+    def delete(self, key):
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FixtureArchive:
+    """Recorded FMP responses, one JSON file per request, served by fmp_replay.py"""
+
+    def __init__(self, archive_dir):
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.archive_dir / f"{digest}.json"
+
+    def record(self, key, value):
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"key": key, "data": value}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not record fixture for {key}: {e}")
+
+    def load(self):
+        """All recorded responses keyed by request (path and sorted query)"""
+        responses = {}
+        for path in self.archive_dir.glob("*.json"):
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            responses[entry["key"]] = entry["data"]
+        return responses
+
+
+class FMPClient:
+    def __init__(self, api_key=None, base_url=BASE_URL, cache_dir=None,
+                 max_entries=2048, calls_per_minute=CALLS_PER_MINUTE, timeout=10,
+                 pool_size=POOL_SIZE, retries=3, record_dir=None):
+        """
+        Shared Financial Modeling Prep client with a response cache
+
+        Args:
+            api_key: FMP API key (defaults to API_KEY.py)
+            base_url: FMP API root
+            cache_dir: Directory for the on-disk cache tier (disabled if None)
+            max_entries: Size of the in-memory LRU tier
+            calls_per_minute: Token-bucket rate limit for network requests (None disables it)
+            timeout: Per-request read timeout in seconds
+            pool_size: Maximum number of pooled keep-alive connections
+            retries: Retries for 429/5xx responses and connection errors
+            record_dir: Record every response fetched to this fixture archive (disabled if None)
+        """
+        self.api_key = api_key if api_key is not None else API_KEY
+        self.base_url = base_url.rstrip("/")
+        self.memory_cache = TTLCache(max_entries)
+        self.disk_cache = DiskCache(cache_dir) if cache_dir else None
+        self.archive = FixtureArchive(record_dir) if record_dir else None
+        self.rate_limiter = RateLimiter(calls_per_minute) if calls_per_minute else None
+        self.timeout = (CONNECT_TIMEOUT, timeout)
+        self.session = create_session(pool_size, retries)
+
+        # Requests currently on the wire, so concurrent identical lookups share one call
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        # Updated under _in_flight_lock
+        self.stats = {"requests": 0, "memory_hits": 0, "disk_hits": 0}
+
+        # Called with an event dict for every lookup, in the calling thread
+        self.listeners = []
+
+    def add_listener(self, listener):
+        """Call listener(event) for every lookup (e.g. data_collection's cost profiler)"""
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def _notify(self, kind, key, **details):
+        for listener in list(self.listeners):
+            listener(dict(details, kind=kind, key=key))
+
+    @staticmethod
+    def _split_endpoint(endpoint, params):
+        """Split an endpoint with an inline query string into path and params"""
+        path, _, query = endpoint.partition("?")
+        merged = dict(parse_qsl(query))
+        if params:
+            merged.update({k: v for k, v in params.items() if v is not None})
+        merged.pop("apikey", None)
+        return path.strip("/"), merged
+
+    @staticmethod
+    def cache_key(path, params):
+        """Cache key for a request (never includes the API key)"""
+        query = "&".join(f"{k}={params[k]}" for k in sorted(params))
+        return f"{path}?{query}" if query else path
+
+    @staticmethod
+    def _ttl_for(path):
+        return ENDPOINT_TTLS.get(path.split("/", 1)[0], DEFAULT_TTL)
+
+    def _throttle(self):
+        """Wait for the shared token bucket to stay under the FMP rate limit"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+    def get_json(self, endpoint, params=None, ttl=None, use_cache=True):
+        """
+        Fetch an FMP endpoint, serving repeated requests from the cache
+
+        Args:
+            endpoint: Path below the API root, optionally with a query string
+                      (e.g. "income-statement/AAPL?limit=3")
+            params: Extra query parameters
+            ttl: Override the endpoint's default cache lifetime
+            use_cache: False always makes the request and neither reads nor writes the caches
+
+        Returns:
+            Parsed JSON payload, or None if the request did not succeed
+        """
+        path, query = self._split_endpoint(endpoint, params)
+        key = self.cache_key(path, query)
+        ttl = ttl if ttl is not None else self._ttl_for(path)
+
+        if not use_cache:
+            FMP_CACHE_LOOKUPS.inc(result="miss")
+            data = self._fetch(path, query)
+            if data is not None and self.archive is not None:
+                self.archive.record(key, data)
+            return data
+
+        data = self._cached(key, ttl)
+        if data is not None:
+            return data
+
+        with self._in_flight_lock:
+            pending = self._in_flight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._in_flight[key] = _PendingRequest()
+
+        if not leader:
+            return self._wait(key, pending)
+
+        FMP_CACHE_LOOKUPS.inc(result="miss")
+        try:
+            data = self._fetch(path, query)
+            self._store(key, data, ttl)
+            pending.data = data
+        finally:
+            self._release(key, pending)
+        return data
+
+    def get_many(self, endpoint, symbols, chunk_size=BATCH_CHUNK_SIZE, ttl=None):
+        """
+        Per-symbol payloads of a multi-symbol endpoint (quote, profile)
+
+        Symbols missing from the caches are fetched in comma-separated batches
+        ("quote/AAPL,MSFT"). Each symbol is cached and coalesced under its own
+        single-symbol key, so batches and get_json(f"quote/{symbol}") share results.
+
+        Args:
+            endpoint: FMP endpoint name without a symbol (e.g. "quote")
+            symbols: Ticker symbols
+            chunk_size: Most symbols sent upstream in one request
+            ttl: Override the endpoint's default cache lifetime
+
+        Returns:
+            Dict of symbol -> payload as the single-symbol endpoint returns it
+            (a list, empty for unknown symbols), or None if its request failed
+        """
+        ttl = ttl if ttl is not None else self._ttl_for(endpoint)
+        results, waiting, leading = {}, {}, {}
+        for symbol in dict.fromkeys(symbols):
+            key = self.cache_key(f"{endpoint}/{symbol}", {})
+            data = self._cached(key, ttl)
+            if data is not None:
+                results[symbol] = data
+                continue
+            with self._in_flight_lock:
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    leading[symbol] = self._in_flight[key] = _PendingRequest()
+                else:
+                    waiting[symbol] = pending
+
+        leaders = list(leading)
+        chunks = [leaders[i:i + chunk_size] for i in range(0, len(leaders), chunk_size)]
+        try:
+            with ThreadPoolExecutor(max_workers=min(len(chunks), 8) or 1) as executor:
+                batches = executor.map(lambda chunk: self._fetch(f"{endpoint}/{','.join(chunk)}", {}), chunks)
+                for chunk, batch in zip(chunks, batches):
+                    FMP_CACHE_LOOKUPS.inc(len(chunk), result="miss")
+                    by_symbol = {}
+                    for item in batch if isinstance(batch, list) else []:
+                        if isinstance(item, dict) and item.get("symbol"):
+                            by_symbol.setdefault(item["symbol"].upper(), []).append(item)
+                    for symbol in chunk:
+                        data = None if batch is None else by_symbol.get(symbol.upper(), [])
+                        key = self.cache_key(f"{endpoint}/{symbol}", {})
+                        self._store(key, data, ttl)
+                        leading[symbol].data = results[symbol] = data
+        finally:
+            # Release every claimed symbol, including any whose batch raised
+            for symbol, pending in leading.items():
+                self._release(self.cache_key(f"{endpoint}/{symbol}", {}), pending)
+
+        for symbol, pending in waiting.items():
+            results[symbol] = self._wait(self.cache_key(f"{endpoint}/{symbol}", {}), pending)
+        return {symbol: results.get(symbol) for symbol in dict.fromkeys(symbols)}
+
+    def _count(self, stat):
+        """Bump a stats counter (lookups run on many threads at once)"""
+        with self._in_flight_lock:
+            self.stats[stat] += 1
+
+    def _cached(self, key, ttl):
+        """A payload from the memory or disk cache (None on a miss)"""
+        data = self.memory_cache.get(key)
+        if data is not None:
+            self._count("memory_hits")
+            FMP_CACHE_LOOKUPS.inc(result="memory_hit")
+            if self.listeners:
+                self._notify("memory_hit", key)
+            return data
+
+        if self.disk_cache is not None:
+            data = self.disk_cache.get(key)
+            if data is not None:
+                self._count("disk_hits")
+                FMP_CACHE_LOOKUPS.inc(result="disk_hit")
+                self.memory_cache.set(key, data, ttl)
+                if self.archive is not None:
+                    self.archive.record(key, data)
+                if self.listeners:
+                    self._notify("disk_hit", key)
+                return data
+        return None
+
+    def _store(self, key, data, ttl):
+        """Cache (and record) a fetched payload"""
+        if data is None:
+            return
+        self.memory_cache.set(key, data, ttl)
+        if self.disk_cache is not None:
+            self.disk_cache.set(key, data, ttl)
+        if self.archive is not None:
+            self.archive.record(key, data)
+
+    def _wait(self, key, pending):
+        """Wait for another thread's request for the same key and share its result"""
+        FMP_CACHE_LOOKUPS.inc(result="coalesced")
+        start = time.perf_counter()
+        pending.done.wait()
+        if self.listeners:
+            self._notify("coalesced", key, seconds=time.perf_counter() - start)
+        return pending.data
+
+    def _release(self, key, pending):
+        with self._in_flight_lock:
+            if self._in_flight.get(key) is pending:
+                del self._in_flight[key]
+        pending.done.set()
+
+    def prefetch(self, endpoints, max_workers=8):
+        """
+        Fetch several endpoints concurrently so later lookups are cache hits
+
+        Args:
+            endpoints: Endpoint strings, or (endpoint, params) pairs for query
+                parameters that need encoding (e.g. an industry containing "&")
+        """
+        # Workers run in a copy of the caller's context, so listeners see its context variables
+        calls = [endpoint if isinstance(endpoint, tuple) else (endpoint, None) for endpoint in endpoints]
+        contexts = [contextvars.copy_context() for _ in calls]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda context, call: context.run(self.get_json, *call),
+                                     contexts, calls))
+
+    def _fetch(self, path, query):
+        """Make the network request over the pooled session (retries happen in the adapter)"""
+        url = f"{self.base_url}/{path}"
+        request_params = dict(query, apikey=self.api_key)
+
+        throttle_start = time.perf_counter()
+        self._throttle()
+        throttle_seconds = time.perf_counter() - throttle_start
+        self._count("requests")
+        endpoint = fmp_endpoint(path)
+        status, retries, size = "error", 0, 0
+        start = time.perf_counter()
+        try:
+            with FMP_LATENCY.time(endpoint=endpoint):
+                response = self.session.get(url, params=request_params, timeout=self.timeout)
+            status = response.status_code
+            retries = self._count_retries(endpoint, response)
+            size = len(response.content)
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code in RETRY_STATUSES:
+                print(f"API call failed for {path}: HTTP {response.status_code} after retries")
+        except Exception as e:
+            print(f"API call failed for {path}: {e}")
+        finally:
+            FMP_REQUESTS.inc(endpoint=endpoint, status=status)
+            if self.listeners:
+                self._notify("network", self.cache_key(path, query), seconds=time.perf_counter() - start,
+                             throttle_seconds=throttle_seconds, bytes=size, retries=retries, status=status)
+        return None
+
+    @staticmethod
+    def _count_retries(endpoint, response):
+        """Count the retries the adapter made before this response (e.g. after a 429)"""
+        history = getattr(getattr(response.raw, "retries", None), "history", ())
+        for attempt in history:
+            FMP_RETRIES.inc(endpoint=endpoint, status=attempt.status or "error")
+        return len(history)
+
+    def clear_cache(self):
+        self.memory_cache.clear()
+
+    def invalidate(self, endpoint, params=None):
+        """Drop one endpoint's cached payload from the memory and disk tiers"""
+        path, query = self._split_endpoint(endpoint, params)
+        key = self.cache_key(path, query)
+        self.memory_cache.delete(key)
+        if self.disk_cache is not None:
+            self.disk_cache.delete(key)
+
+
+class _PendingRequest:
+    """A network request other threads can wait on instead of repeating it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+
+
+# ====================================================
+# Process-wide Shared Client
+# ====================================================
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide FMP client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = FMPClient(cache_dir=os.environ.get("FMP_CACHE_DIR"),
+                                    record_dir=os.environ.get("FMP_RECORD_DIR"))
+    return _client
+
+
+def set_client(client):
+    """Replace the process-wide FMP client (e.g. with a differently configured one)"""
+    global _client
+    _client = client
+
+
+def fmp_get(endpoint, **params):
+    """Fetch an FMP endpoint through the shared, cached client"""
+    return get_client().get_json(endpoint, params)
@@ -0,0 +1,222 @@
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from flask import Flask, jsonify, request
+
+from fmp_client import FMPClient, FixtureArchive, set_client
+
+# ====================================================
+# FMP Record / Replay Server
+# ====================================================
+# Serves a fixture archive of recorded FMP responses over HTTP so every module
+# can run offline and deterministically. Point the shared client at it with
+#   FMP_BASE_URL=http://localhost:5005/api/v3
+# Latency and 429 responses can be injected to mimic the real API under load.
+#
+# Record an archive by running any module with FMP_RECORD_DIR=<archive> set, or
+# record everything the scoring services need for a symbol list with --record.
+#
+# With --alias, a per-symbol request for a symbol that was never recorded is
+# answered with a recorded symbol's payload (picked by a stable hash), so a
+# small archive can stand in for a universe of any size.
+#
+# Multi-symbol requests ("profile/AAPL,MSFT") are answered by joining the
+# per-symbol recordings, which is how the client records them.
+
+REPLAY_PORT = 5005
+ARCHIVE_DIR = "../model_data/fmp_fixtures"
+
+# Extra per-symbol endpoints the proxies and data collection read
+RECORD_EXTRA_ENDPOINTS = ["quote/{symbol}"]
+
+
+class FixtureReplay:
+    def __init__(self, responses=None, latency_ms=0, jitter_ms=0, rate_429=0.0, retry_after=1, seed=0,
+                 alias=False):
+        """
+        Recorded FMP responses plus the injected network behaviour
+
+        Args:
+            responses: Response payloads keyed like FMPClient.cache_key
+            latency_ms: Mean delay added to every response
+            jitter_ms: Uniform +/- variation around the mean delay
+            rate_429: Fraction of requests answered with HTTP 429
+            retry_after: Retry-After seconds sent with a 429
+            seed: Seed for the latency and 429 draws (same seed, same sequence)
+            alias: Serve unrecorded symbols from recorded ones
+        """
+        self.responses = responses or {}
+        self.alias = alias
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+        # (endpoint, query) -> recorded symbols, for aliasing
+        self._symbols = defaultdict(list)
+        for key in sorted(self.responses):
+            path, _, query = key.partition("?")
+            endpoint, _, symbol = path.partition("/")
+            if symbol and "/" not in symbol:
+                self._symbols[(endpoint, query)].append(symbol)
+
+    def recorded_symbols(self):
+        """Symbols with a recorded profile"""
+        return list(self._symbols.get(("profile", ""), []))
+
+    def _aliased(self, key):
+        """A recorded symbol's response standing in for an unrecorded one"""
+        path, _, query = key.partition("?")
+        endpoint, _, symbol = path.partition("/")
+        candidates = self._symbols.get((endpoint, query))
+        if not symbol or not candidates:
+            return None
+        source = candidates[zlib.crc32(symbol.encode("utf-8")) % len(candidates)]
+        source_key = f"{endpoint}/{source}?{query}" if query else f"{endpoint}/{source}"
+        return _rename_symbol(self.responses[source_key], source, symbol)
+
+    def _lookup(self, key):
+        """(payload, aliased) for one recorded key"""
+        data = self.responses.get(key)
+        if data is None and self.alias:
+            data = self._aliased(key)
+            return data, data is not None
+        return data, False
+
+    def _lookup_symbols(self, key):
+        """
+        (payload, aliased) for a key, joining per-symbol recordings for a
+        comma-separated multi-symbol request ("quote/AAPL,MSFT")
+
+        Multi-symbol requests are recorded per symbol (see FMPClient.get_many),
+        and like FMP the joined list simply leaves out unknown symbols.
+        """
+        path, _, query = key.partition("?")
+        endpoint, _, symbols = path.partition("/")
+        if "," not in symbols or "/" in symbols:
+            return self._lookup(key)
+
+        items, found, aliased = [], False, False
+        for symbol in symbols.split(","):
+            symbol_key = f"{endpoint}/{symbol}?{query}" if query else f"{endpoint}/{symbol}"
+            data, symbol_aliased = self._lookup(symbol_key)
+            if isinstance(data, list):
+                items += data
+                found = True
+                aliased = aliased or symbol_aliased
+        return (items if found else None), aliased
+
+    def respond(self, path, params):
+        """(status, payload, headers) for a request, after the injected delay"""
+        key = FMPClient.cache_key(path, {k: v for k, v in params.items() if k != "apikey"})
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms))
+            throttled = self.random.random() < self.rate_429
+        time.sleep(delay / 1000)
+
+        data, aliased = None, False
+        if not throttled:
+            data, aliased = self._lookup_symbols(key)
+
+        with self._lock:
+            self.stats["requests"] += 1
+            if throttled:
+                self.stats["throttled"] += 1
+            elif data is not None:
+                self.stats["served"] += 1
+                if aliased:
+                    self.stats["aliased"] += 1
+            else:
+                self.stats["missing"] += 1
+
+        if throttled:
+            return 429, {"error": "Too many requests (injected)"}, {"Retry-After": str(self.retry_after)}
+        if data is None:
+            return 404, {"error": f"No recorded response for {key}"}, {}
+        return 200, data, {}
+
+
+def _rename_symbol(payload, source, symbol):
+    """Copy of a payload with its 'symbol' fields switched from source to symbol"""
+    def rename(item):
+        if isinstance(item, dict) and item.get("symbol") == source:
+            return dict(item, symbol=symbol)
+        return item
+
+    if isinstance(payload, list):
+        return [rename(item) for item in payload]
+    return rename(payload)
+
+
+replay = FixtureReplay()
+
+app = Flask(__name__)
+
+
+@app.route('/api/v3/<path:path>')
+def replay_endpoint(path):
+    status, payload, headers = replay.respond(path, request.args.to_dict())
+    response = jsonify(payload)
+    response.status_code = status
+    response.headers.update(headers)
+    return response
+
+
+@app.route('/replay/stats')
+def replay_stats():
+    return jsonify({'responses': len(replay.responses), **replay.stats})
+
+
+@app.route('/replay/reset', methods=['POST'])
+def replay_reset():
+    """Clear the counters between benchmark runs"""
+    replay.stats.clear()
+    return jsonify({'status': 'ok'})
+
+
+def record_symbols(symbols, archive_dir=ARCHIVE_DIR):
+    """Record every FMP response the scoring services need for the given symbols"""
+    from scoring_gateway import prefetch_symbols
+
+    client = FMPClient(record_dir=archive_dir)
+    set_client(client)
+    prefetch_symbols(symbols)
+    client.prefetch([template.format(symbol=symbol) for symbol in symbols
+                     for template in RECORD_EXTRA_ENDPOINTS])
+    print(f"Recorded {client.stats['requests']} responses for {len(symbols)} symbols to {archive_dir}")
+
+
+if __name__ == "__main__":
+    # python fmp_replay.py --server [--archive DIR] [--port N] [--latency-ms MS] [--jitter-ms MS]
+    #                               [--rate-429 FRACTION] [--retry-after S] [--seed N] [--alias]
+    # python fmp_replay.py --record SYMBOLS_FILE [--archive DIR]
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    archive_dir = option('--archive', ARCHIVE_DIR)
+    if '--record' in args:
+        from risk_training_data import symbols_from_file
+        record_symbols(symbols_from_file(option('--record', None)), archive_dir)
+    elif '--server' in args:
+        replay = FixtureReplay(
+            FixtureArchive(archive_dir).load(),
+            latency_ms=float(option('--latency-ms', 0)),
+            jitter_ms=float(option('--jitter-ms', 0)),
+            rate_429=float(option('--rate-429', 0)),
+            retry_after=int(option('--retry-after', 1)),
+            seed=int(option('--seed', 0)),
+            alias='--alias' in args
+        )
+        port = int(option('--port', REPLAY_PORT))
+        print(f"Replaying {len(replay.responses)} recorded FMP responses on port {port}...")
+        app.run(host='0.0.0.0', port=port, threaded=True)
+    else:
+        print("Usage: python fmp_replay.py --server [--archive DIR] | --record SYMBOLS_FILE [--archive DIR]")
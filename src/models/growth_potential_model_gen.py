@@ -1,13 +1,17 @@
 import pandas as pd
 import numpy as np
 import time
-import requests
-import joblib
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from sklearn.preprocessing import MinMaxScaler
-from API_KEY import API_KEY
+from fmp_client import fmp_get, get_client
+from model_registry import model_registry
+from compact_model import compact_path, is_current, load_compact
+from streaming import requested_stream_format, stream_scores
+from serialization import score_records, serialize_response
+from score_snapshot import score_snapshot, utc_now, GROWTH_KEYS
+from service_metrics import MODEL_LOAD, MODEL_PREDICT, instrument_app
 
 # ====================================================
 # Define the Growth Metrics and Their Weights
@@ -22,42 +26,35 @@ METRICS_WEIGHTS = {
     "Margin Trend Score": 0.05
 }
 
-BASE_URL = "https://financialmodelingprep.com/api/v3"
+# Saved growth model and its fitted scalers
+GROWTH_MODEL_PATH = "../model_data/growth_potential_model.pkl"
 
 # ====================================================
 # Data Collection Functions for Growth Metrics
 # ====================================================
 
 def get_revenue(symbol):
-    url = f"{BASE_URL}/income-statement/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            return data[0].get("revenue")
+    data = fmp_get(f"income-statement/{symbol}")
+    if data and len(data) > 0:
+        return data[0].get("revenue")
     return None
 
 def get_industry_revenue(symbol):
-    profile_url = f"{BASE_URL}/profile/{symbol}?apikey={API_KEY}"
-    profile_response = requests.get(profile_url)
-    if profile_response.status_code == 200:
-        profile_data = profile_response.json()
-        if profile_data and len(profile_data) > 0:
-            industry = profile_data[0].get("industry")
-            if industry:
-                industry_url = f"{BASE_URL}/stock-screener?industry={industry}&apikey={API_KEY}"
-                industry_response = requests.get(industry_url)
-                if industry_response.status_code == 200:
-                    industry_companies = industry_response.json()
-                    revenues = []
-                    for company in industry_companies[:5]:
-                        comp_symbol = company.get("symbol")
-                        if comp_symbol:
-                            rev = get_revenue(comp_symbol)
-                            if rev is not None:
-                                revenues.append(rev)
-                    if revenues:
-                        return sum(revenues) / len(revenues)
+    profile_data = fmp_get(f"profile/{symbol}")
+    if profile_data and len(profile_data) > 0:
+        industry = profile_data[0].get("industry")
+        if industry:
+            industry_companies = fmp_get("stock-screener", industry=industry)
+            if industry_companies is not None:
+                revenues = []
+                for company in industry_companies[:5]:
+                    comp_symbol = company.get("symbol")
+                    if comp_symbol:
+                        rev = get_revenue(comp_symbol)
+                        if rev is not None:
+                            revenues.append(rev)
+                if revenues:
+                    return sum(revenues) / len(revenues)
     return None
 
 def get_revenue_vs_industry_revenue(symbol):
@@ -68,20 +65,15 @@ def get_revenue_vs_industry_revenue(symbol):
     return None
 
 def get_peg_ratio(symbol):
-    url = f"{BASE_URL}/ratios-ttm/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            print(data[0].get("pegRatioTTM"))
-            return data[0].get("pegRatioTTM")
+    data = fmp_get(f"ratios-ttm/{symbol}")
+    if data and len(data) > 0:
+        print(data[0].get("pegRatioTTM"))
+        return data[0].get("pegRatioTTM")
     return None
 
 def get_two_year_roi(symbol):
-    url = f"{BASE_URL}/historical-price-full/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
+    data = fmp_get(f"historical-price-full/{symbol}")
+    if data is not None:
         historical_prices = data.get("historical", [])
         if len(historical_prices) >= 504:
             current_price = historical_prices[0].get("close")
@@ -91,10 +83,8 @@ def get_two_year_roi(symbol):
     return None
 
 def get_two_year_revenue_growth(symbol):
-    url = f"{BASE_URL}/income-statement/{symbol}?limit=2&apikey={API_KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
+    data = fmp_get(f"income-statement/{symbol}")
+    if data is not None:
         if len(data) >= 2:
             rev_current = data[0].get("revenue")
             rev_previous = data[1].get("revenue")
@@ -104,10 +94,8 @@ def get_two_year_revenue_growth(symbol):
 
 def get_market_share_for_year(symbol, year_index=0):
     # (Placeholder) Using revenue as a proxy for market share
-    url = f"{BASE_URL}/income-statement/{symbol}?limit={year_index+1}&apikey={API_KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
+    data = fmp_get(f"income-statement/{symbol}")
+    if data is not None:
         if len(data) > year_index:
             return data[year_index].get("revenue")
     return None
@@ -120,15 +108,12 @@ def get_market_share_growth(symbol):
     return None
 
 def get_rd_to_revenue_ratio(symbol):
-    url = f"{BASE_URL}/income-statement/{symbol}?apikey={API_KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        if data and len(data) > 0:
-            rd_exp = data[0].get("researchAndDevelopmentExpenses")
-            revenue = data[0].get("revenue")
-            if rd_exp is not None and revenue is not None and revenue != 0:
-                return (rd_exp / revenue) * 100
+    data = fmp_get(f"income-statement/{symbol}")
+    if data and len(data) > 0:
+        rd_exp = data[0].get("researchAndDevelopmentExpenses")
+        revenue = data[0].get("revenue")
+        if rd_exp is not None and revenue is not None and revenue != 0:
+            return (rd_exp / revenue) * 100
     return None
 
 def get_margin_trend_score(symbol):
@@ -147,6 +132,26 @@ def get_all_growth_features(symbol):
     }
     return features
 
+# ====================================================
+# Saved Model (loaded once per process, reloaded if the pickle changes)
+# ====================================================
+
+def _load_growth_artifact(path):
+    """Prefer the numpy-only compact export when it was made from this pickle"""
+    if is_current(path):
+        with MODEL_LOAD.time(model="growth", format="compact"):
+            compact = load_compact(compact_path(path))
+        return {"model": compact, "scalers": compact.scalers}
+    # Unpickling the full model imports joblib and sklearn, so only do it as a fallback
+    with MODEL_LOAD.time(model="growth", format="pickle"):
+        import joblib
+        return joblib.load(path)
+
+def load_growth_model():
+    """Return the saved model and scalers from the process-wide registry"""
+    saved_model_data = model_registry.get(GROWTH_MODEL_PATH, loader=_load_growth_artifact)
+    return saved_model_data["model"], saved_model_data["scalers"]
+
 # ====================================================
 # Normalization Using Saved Scalers
 # ====================================================
@@ -186,22 +191,19 @@ def create_growth_potential_score(df):
 # New Function: Score Given a List of Tickers with Error Handling
 # ====================================================
 
-def run_scoring_for_tickers(ticker_list):
-    collected_data = []
-    for ticker in ticker_list:
-        print(f"\nCollecting growth data for {ticker}...")
-        try:
-            features = get_all_growth_features(ticker)
-            features["Symbol"] = ticker
-            collected_data.append(features)
-        except Exception as e:
-            print(f"Error collecting data for {ticker}: {e}")
-            continue
-
-    if not collected_data:
-        print("No data was collected for the provided tickers.")
-        return
+def collect_growth_features(ticker):
+    """Growth features for one ticker (None if collection fails)"""
+    print(f"\nCollecting growth data for {ticker}...")
+    try:
+        features = get_all_growth_features(ticker)
+        features["Symbol"] = ticker
+        return features
+    except Exception as e:
+        print(f"Error collecting data for {ticker}: {e}")
+        return None
 
+def score_growth_features(collected_data):
+    """Normalize collected features and predict growth potential with the saved model"""
     df = pd.DataFrame(collected_data)
     print("\nCollected Growth Data:")
     print(df.head())
@@ -219,10 +221,8 @@ def run_scoring_for_tickers(ticker_list):
             print(f"Warning: {feature} not found in collected data. Creating column with default value 1.")
             df[feature] = 1
 
-    # Load the saved growth model and scalers from your original model file
-    saved_model_data = joblib.load("../model_data/growth_potential_model.pkl")
-    saved_scalers = saved_model_data["scalers"]
-    saved_model = saved_model_data["model"]
+    # Get the saved growth model and scalers (already loaded at startup)
+    saved_model, saved_scalers = load_growth_model()
 
     # Normalize the new data using the saved scalers
     df_normalized = normalize_with_saved_scalers(df, saved_scalers, required_features)
@@ -232,26 +232,65 @@ def run_scoring_for_tickers(ticker_list):
     # Prepare predictors (raw and normalized features) for the model
     predictors = list(METRICS_WEIGHTS.keys()) + [f"{feature}_normalized" for feature in METRICS_WEIGHTS.keys()]
     X_pred = df_normalized[predictors]
-    df_normalized["predicted_growth_potential"] = saved_model.predict(X_pred)
+    with MODEL_PREDICT.time(model="growth"):
+        df_normalized["predicted_growth_potential"] = saved_model.predict(X_pred)
+    return df_normalized
+
+def run_scoring_for_tickers(ticker_list):
+    collected_data = []
+    for ticker in ticker_list:
+        features = collect_growth_features(ticker)
+        if features is not None:
+            collected_data.append(features)
+
+    if not collected_data:
+        print("No data was collected for the provided tickers.")
+        return
+
+    df_normalized = score_growth_features(collected_data)
 
     print("\nPredicted Growth Potential Scores:")
-    for index, row in df_normalized.iterrows():
-        symbol = row.get("Symbol", f"Stock {index}")
-        score = row["predicted_growth_potential"]
+    for symbol, score in zip(df_normalized["Symbol"], df_normalized["predicted_growth_potential"]):
         print(f"{symbol}: {score:.2f}/100")
     return df_normalized
 
+def iter_growth_scores(ticker_list, batch_size=8, max_workers=8):
+    """
+    Yield growth scores in micro-batches as tickers' data arrives
+
+    Missing feature values are filled from the medians of each micro-batch
+    rather than of the whole request.
+    """
+    batch = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(collect_growth_features, ticker) for ticker in ticker_list]
+        for future in as_completed(futures):
+            features = future.result()
+            if features is None:
+                continue
+            batch.append(features)
+            if len(batch) >= batch_size:
+                yield score_growth_features(batch)
+                batch = []
+    if batch:
+        yield score_growth_features(batch)
+
 # ====================================================
 # Flask Web API Endpoints
 # ====================================================
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+instrument_app(app)  # Per-route request metrics and /metrics
 
 @app.route('/api/growth/<symbol>')
 def get_growth_score(symbol):
-    """Get growth score for a single stock symbol"""
+    """Get growth score for a single stock symbol (from the snapshot when available)"""
     try:
+        snapshot = score_snapshot.lookup(symbol, GROWTH_KEYS)
+        if snapshot is not None:
+            return jsonify(dict(snapshot, source='snapshot', status='success'))
+
         print(f"Getting growth score for {symbol}...")
         result = run_scoring_for_tickers([symbol])
         if result is not None and not result.empty:
@@ -259,6 +298,8 @@ def get_growth_score(symbol):
             return jsonify({
                 'symbol': symbol,
                 'growthScore': float(score),
+                'as_of': utc_now(),
+                'source': 'live',
                 'status': 'success'
             })
         else:
@@ -267,26 +308,40 @@ def get_growth_score(symbol):
         print(f"Error getting growth score for {symbol}: {e}")
         return jsonify({'error': str(e)}), 500
 
+def _growth_score_records(result):
+    return score_records(result, {'Symbol': 'symbol', 'predicted_growth_potential': 'growthScore'},
+                         as_of=utc_now())
+
 @app.route('/api/growth/bulk', methods=['POST'])
 def get_bulk_growth_scores():
-    """Get growth scores for multiple stock symbols"""
+    """
+    Get growth scores for multiple stock symbols
+
+    Symbols in the score snapshot are served from memory; only the rest are
+    scored live. With ?stream=ndjson (or ?stream=sse) scores are sent as they
+    are computed, followed by a final summary record. ?format=msgpack|arrow
+    selects a binary encoding for the non-streaming response.
+    """
     try:
         data = request.get_json()
         symbols = data.get('symbols', [])
         if not symbols:
             return jsonify({'error': 'No symbols provided'}), 400
         
-        print(f"Getting growth scores for {len(symbols)} symbols...")
-        result = run_scoring_for_tickers(symbols)
+        scores, missing = score_snapshot.partition(symbols, GROWTH_KEYS)
+        print(f"Getting growth scores for {len(symbols)} symbols ({len(missing)} live)...")
+        stream_format = requested_stream_format()
+        if stream_format:
+            return stream_scores(iter_growth_scores(missing), _growth_score_records, len(symbols),
+                                 stream_format, ready_records=scores)
+
+        if missing:
+            result = run_scoring_for_tickers(missing)
+            if result is not None and not result.empty:
+                scores += _growth_score_records(result)
         
-        if result is not None and not result.empty:
-            scores = []
-            for _, row in result.iterrows():
-                scores.append({
-                    'symbol': row['Symbol'],
-                    'growthScore': float(row['predicted_growth_potential'])
-                })
-            return jsonify({'scores': scores, 'status': 'success'})
+        if scores:
+            return serialize_response({'scores': scores, 'status': 'success'})
         else:
             return jsonify({'error': 'No data found'}), 404
     except Exception as e:
@@ -296,42 +351,42 @@ def get_bulk_growth_scores():
 @app.route('/api/growth/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'growth_model'})
+    return jsonify({'status': 'healthy', 'service': 'growth_model', 'snapshot': score_snapshot.status()})
 
-@app.route('/api/fmp/profile/<symbol>')
-def proxy_fmp_profile(symbol):
-    """Proxy FMP profile API to avoid CORS issues"""
-    try:
-        import requests
-        from API_KEY import API_KEY
-        
-        url = f"https://financialmodelingprep.com/api/v3/profile/{symbol}?apikey={API_KEY}"
-        response = requests.get(url)
-        
-        if response.status_code == 200:
-            return jsonify(response.json())
-        else:
-            return jsonify({'error': f'FMP API returned {response.status_code}'}), response.status_code
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+# Most symbols accepted by one proxy request
+MAX_PROXY_SYMBOLS = 500
+
+def _proxy_fmp_symbols(endpoint, symbols):
+    """
+    Proxy a per-symbol FMP endpoint for one or more comma-separated symbols
 
-@app.route('/api/fmp/quote/<symbol>')
-def proxy_fmp_quote(symbol):
-    """Proxy FMP quote API to avoid CORS issues"""
+    Symbols are fetched through the shared client in comma-separated batches,
+    each cached under its own symbol, so a page of N stocks costs a handful of
+    upstream calls. The response is FMP's list, in the requested order.
+    """
+    symbol_list = [symbol.strip() for symbol in symbols.split(",") if symbol.strip()]
+    if not symbol_list:
+        return jsonify({'error': 'No symbols provided'}), 400
+    if len(symbol_list) > MAX_PROXY_SYMBOLS:
+        return jsonify({'error': f'At most {MAX_PROXY_SYMBOLS} symbols per request'}), 400
     try:
-        import requests
-        from API_KEY import API_KEY
-        
-        url = f"https://financialmodelingprep.com/api/v3/quote/{symbol}?apikey={API_KEY}"
-        response = requests.get(url)
-        
-        if response.status_code == 200:
-            return jsonify(response.json())
-        else:
-            return jsonify({'error': f'FMP API returned {response.status_code}'}), response.status_code
+        payloads = get_client().get_many(endpoint, symbol_list)
+        if all(payload is None for payload in payloads.values()):
+            return jsonify({'error': 'FMP API request failed'}), 502
+        return jsonify([item for payload in payloads.values() for item in payload or []])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/fmp/profile/<symbols>')
+def proxy_fmp_profile(symbols):
+    """Proxy FMP profile API to avoid CORS issues (e.g. /api/fmp/profile/AAPL,MSFT)"""
+    return _proxy_fmp_symbols("profile", symbols)
+
+@app.route('/api/fmp/quote/<symbols>')
+def proxy_fmp_quote(symbols):
+    """Proxy FMP quote API to avoid CORS issues (e.g. /api/fmp/quote/AAPL,MSFT)"""
+    return _proxy_fmp_symbols("quote", symbols)
+
 # ====================================================
 # Main Execution Block
 # ====================================================
@@ -339,6 +394,7 @@ if __name__ == "__main__":
     # Check if running as web server or training script
     if len(sys.argv) > 1 and sys.argv[1] == '--server':
         print("Starting Growth Model API server on port 5001...")
+        load_growth_model()
         app.run(host='0.0.0.0', port=5001, debug=True)
     else:
         # Original training code
@@ -0,0 +1,56 @@
+import threading
+from pathlib import Path
+
+from compact_model import artifact_mtime
+
+
+class _LoadedArtifact:
+    def __init__(self, value, mtime):
+        self.value = value
+        self.mtime = mtime
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded model artifacts
+
+    Each artifact is unpickled once and shared by every request. When the
+    pickle or its compact export changes on disk (e.g. after retraining, or
+    exporting a compact copy) the next lookup reloads it. A model deployed
+    only as a compact export is tracked by its manifest alone.
+    """
+
+    def __init__(self):
+        self._artifacts = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, loader=None):
+        """Return the loaded artifact at path, reloading it if the file changed (joblib by default)"""
+        if loader is None:
+            import joblib
+            loader = joblib.load
+        path = Path(path).resolve()
+        mtime = artifact_mtime(path)
+        if mtime is None:
+            raise FileNotFoundError(f"No saved model found at {path}")
+
+        artifact = self._artifacts.get(path)
+        if artifact is not None and artifact.mtime == mtime:
+            return artifact.value
+
+        with self._lock:
+            artifact = self._artifacts.get(path)
+            if artifact is None or artifact.mtime != mtime:
+                action = "Loaded" if artifact is None else "Reloaded"
+                artifact = _LoadedArtifact(loader(path), mtime)
+                self._artifacts[path] = artifact
+                print(f"{action} model artifact {path}")
+        return artifact.value
+
+    def clear(self):
+        with self._lock:
+            self._artifacts.clear()
+
+
+# Shared by every service in the process
+model_registry = ModelRegistry()
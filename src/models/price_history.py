@@ -0,0 +1,166 @@
+import warnings
+
+import numpy as np
+
+# ====================================================
+# Columnar Price History and Vectorized Risk Metrics
+# ====================================================
+# FMP's historical-price-full payload (newest day first) becomes aligned date /
+# close / volume arrays per symbol, and many symbols are stacked into 2-D close /
+# volume arrays (one row per symbol, newest day in column 0, NaN padding after
+# the last valid day). Every metric is then one array operation over all rows.
+#
+# A day is kept only when both its close and its volume are positive, so the
+# close and volume series always stay aligned on the same dates.
+
+PRICE_WINDOW = 252          # ~1 trading year
+SHORT_WINDOW = 60           # ~3 months
+MOMENTUM_LAG = 126          # ~6 months
+ROLLING_WINDOW = 21         # ~1 month
+MIN_DAYS = 60
+
+
+def price_history_arrays(price_data, days=PRICE_WINDOW):
+    """
+    Aligned date, close and volume arrays for one historical-price-full payload
+
+    Args:
+        price_data: FMP payload ({'symbol': ..., 'historical': [...]})
+        days: Most recent trading days to keep (before invalid days are dropped)
+    """
+    history = price_data.get('historical') or [] if isinstance(price_data, dict) else []
+    history = history[:days]
+    dates = np.array([day.get('date') for day in history], dtype=object)
+    closes = np.array([day.get('close') for day in history], dtype=float)
+    volumes = np.array([day.get('volume') for day in history], dtype=float)
+    with np.errstate(invalid='ignore'):
+        valid = (closes > 0) & (volumes > 0)
+    return dates[valid], closes[valid], volumes[valid]
+
+
+def stack_price_histories(histories, days=PRICE_WINDOW):
+    """
+    Stack per-symbol (dates, closes, volumes) arrays into (n_symbols, days) arrays
+
+    Returns:
+        (closes, volumes, counts) where counts holds each row's number of valid days
+    """
+    closes = np.full((len(histories), days), np.nan)
+    volumes = np.full((len(histories), days), np.nan)
+    counts = np.zeros(len(histories), dtype=int)
+    for row, (_, symbol_closes, symbol_volumes) in enumerate(histories):
+        n = min(len(symbol_closes), days)
+        closes[row, :n] = symbol_closes[:n]
+        volumes[row, :n] = symbol_volumes[:n]
+        counts[row] = n
+    return closes, volumes, counts
+
+
+def _rolling_sums(values, window):
+    """Sums over every window of consecutive columns, row by row"""
+    totals = np.cumsum(values, axis=1)
+    totals = np.concatenate([np.zeros((len(values), 1)), totals], axis=1)
+    return totals[:, window:] - totals[:, :-window]
+
+
+def _trailing_nan_percentile(values, counts, q):
+    """np.percentile of each row's first counts[row] values (the rest are NaN padding)"""
+    ordered = np.sort(values, axis=1)
+    position = np.maximum(counts - 1, 0) * q / 100
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+    rows = np.arange(len(values))
+    return ordered[rows, lower] + (position - lower) * (ordered[rows, upper] - ordered[rows, lower])
+
+
+def price_risk_metrics(closes, volumes, counts):
+    """
+    Risk metrics for every row of stacked price histories
+
+    Rows with fewer valid days than a metric needs get NaN for that metric.
+
+    Returns:
+        Dict of metric name -> array with one value per row
+    """
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        # All-NaN rows (short histories) warn in the nan-aware reductions
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        # The model was trained on returns taken in payload order (older vs newer
+        # day, relative to the newer close), so the original three metrics keep it
+        payload_returns = np.diff(closes, axis=1) / closes[:, :-1]
+        # Chronological daily returns: newer close over the previous day's close
+        daily_returns = closes[:, :-1] / closes[:, 1:] - 1
+        short = slice(0, SHORT_WINDOW)
+
+        metrics = {}
+
+        # Price volatility (annualized)
+        metrics['price_volatility_3m'] = np.where(
+            counts > SHORT_WINDOW,
+            np.std(payload_returns[:, short], axis=1) * np.sqrt(252) * 100, np.nan)
+
+        # Volume volatility
+        volume_changes = np.diff(volumes[:, short], axis=1) / volumes[:, :SHORT_WINDOW - 1]
+        metrics['trading_volume_volatility'] = np.where(
+            counts >= SHORT_WINDOW, np.std(volume_changes, axis=1) * 100, np.nan)
+
+        # Price momentum (3m vs 6m performance); inconsistency = risk
+        if closes.shape[1] > MOMENTUM_LAG:
+            latest = closes[:, 0]
+            perf_3m = (latest - closes[:, SHORT_WINDOW]) / closes[:, SHORT_WINDOW] * 100
+            perf_6m = (latest - closes[:, MOMENTUM_LAG]) / closes[:, MOMENTUM_LAG] * 100
+            metrics['price_momentum'] = np.where(counts > MOMENTUM_LAG, np.abs(perf_3m - perf_6m), np.nan)
+        else:
+            metrics['price_momentum'] = np.full(len(closes), np.nan)
+
+        # Maximum drawdown over the window (oldest -> newest running peak)
+        chronological = closes[:, ::-1]
+        running_peak = np.fmax.accumulate(chronological, axis=1)
+        drawdown = np.nanmax(1 - chronological / running_peak, axis=1) * 100
+        metrics['max_drawdown_1y'] = np.where(counts >= MIN_DAYS, drawdown, np.nan)
+
+        # Downside volatility: only losing days count (annualized)
+        downside = np.minimum(daily_returns[:, short], 0)
+        metrics['downside_volatility_3m'] = np.where(
+            counts > SHORT_WINDOW,
+            np.sqrt(np.mean(downside ** 2, axis=1)) * np.sqrt(252) * 100, np.nan)
+
+        # Worst one-month rolling volatility over the year (annualized). Padding
+        # only trails the valid days, so windows that touch it come out NaN
+        window_sums = _rolling_sums(daily_returns, ROLLING_WINDOW)
+        window_squares = _rolling_sums(daily_returns ** 2, ROLLING_WINDOW)
+        window_mean = window_sums / ROLLING_WINDOW
+        rolling_variance = np.maximum(window_squares / ROLLING_WINDOW - window_mean ** 2, 0)
+        rolling_volatility = np.sqrt(np.nanmax(rolling_variance, axis=1)) * np.sqrt(252) * 100
+        metrics['rolling_volatility_max'] = np.where(counts >= MIN_DAYS, rolling_volatility, np.nan)
+
+        # Historical 1-day value at risk at 95% (as a positive % loss)
+        metrics['value_at_risk_95'] = np.where(
+            counts >= MIN_DAYS, -_trailing_nan_percentile(daily_returns, counts - 1, 5) * 100, np.nan)
+
+    return metrics
+
+
+def price_metric_records(price_payloads, days=PRICE_WINDOW):
+    """
+    Price risk metrics for many historical-price-full payloads at once
+
+    Returns:
+        One dict per payload holding the metrics that could be computed
+        (empty when the history has fewer than MIN_DAYS valid days)
+    """
+    if not price_payloads:
+        return []
+    histories = [price_history_arrays(price_data, days) for price_data in price_payloads]
+    closes, volumes, counts = stack_price_histories(histories, days)
+    metrics = price_risk_metrics(closes, volumes, counts)
+
+    records = []
+    for row in range(len(histories)):
+        if counts[row] < MIN_DAYS:
+            records.append({})
+            continue
+        records.append({name: float(values[row]) for name, values in metrics.items()
+                        if np.isfinite(values[row])})
+    return records
@@ -1,31 +1,26 @@
 import pandas as pd
 import numpy as np
 import time
-import requests
-import joblib
 import warnings
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 warnings.filterwarnings('ignore')
 
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.preprocessing import RobustScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-import xgboost as xgb
-from scipy import stats
+from fmp_client import get_client
+from compact_model import artifact_mtime, compact_path, export_compact, is_current, load_compact
+from streaming import requested_stream_format, stream_scores
+from serialization import score_records, serialize_response
+from score_snapshot import score_snapshot, utc_now, RISK_KEYS
+from price_history import price_metric_records
+from service_metrics import MODEL_LOAD, MODEL_PREDICT, instrument_app
 
-# Import your API key
-try:
-    from API_KEY import API_KEY
-except ImportError:
-    API_KEY = None
-    print("Warning: API_KEY not found. Please create API_KEY.py with your API key.")
+# Training-only dependencies (sklearn, xgboost via risk_training, and joblib) are
+# imported where they are used, so the API server only loads what inference needs.
 
 class risk_model_gen:
     def __init__(self, model_dir="model_data"):
@@ -35,8 +30,7 @@ class risk_model_gen:
         Args:
             model_dir: Directory to store model files and data
         """
-        self.base_url = "https://financialmodelingprep.com/api/v3"
-        self.api_key = API_KEY
+        self.fmp = get_client()
         self.model_dir = Path(model_dir)
         self.model_dir.mkdir(exist_ok=True)
         
@@ -44,6 +38,7 @@ class risk_model_gen:
         self.model_path = self.model_dir / "risk_model.pkl"
         self.training_data_path = self.model_dir / "training_data.pkl"
         self.model_metadata_path = self.model_dir / "model_metadata.pkl"
+        self.compact_model_path = compact_path(self.model_path)
         
         # Model components
         self.model = None
@@ -52,69 +47,21 @@ class risk_model_gen:
         
         # Key features for risk assessment
         self.feature_config = {
-            'price_metrics': ['price_volatility_3m', 'trading_volume_volatility', 'price_momentum'],
+            'price_metrics': ['price_volatility_3m', 'trading_volume_volatility', 'price_momentum',
+                              'max_drawdown_1y', 'downside_volatility_3m', 'rolling_volatility_max',
+                              'value_at_risk_95'],
             'financial_health': ['altman_z_score', 'current_ratio', 'debt_to_equity', 'interest_coverage'],
             'profitability': ['roe', 'roa', 'profit_margin', 'earnings_growth'],
             'market_metrics': ['beta', 'market_cap_log']
         }
     
-    def _api_call(self, endpoint, retries=3):
-        """Make API call with error handling"""
-        url = f"{self.base_url}/{endpoint}?apikey={self.api_key}"
-        
-        for attempt in range(retries):
-            try:
-                response = requests.get(url, timeout=10)
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 429:
-                    time.sleep(0.5 * (2 ** attempt))
-                    continue
-            except Exception as e:
-                if attempt == retries - 1:
-                    print(f"API call failed for {endpoint}: {e}")
-                time.sleep(0.2)
-        return None
+    def _api_call(self, endpoint):
+        """Make API call through the shared, pooled and cached FMP client"""
+        return self.fmp.get_json(endpoint)
     
     def _calculate_price_metrics(self, price_data):
-        """Calculate price-based risk metrics"""
-        if not price_data or 'historical' not in price_data:
-            return {}
-        
-        prices = price_data['historical'][:252]  # 1 year
-        if len(prices) < 60:
-            return {}
-        
-        closes = [p['close'] for p in prices if p['close']]
-        volumes = [p['volume'] for p in prices if p['volume']]
-        
-        if len(closes) < 60:
-            return {}
-        
-        returns = np.diff(closes) / np.array(closes[:-1])
-        returns = returns[np.isfinite(returns)]
-        
-        metrics = {}
-        
-        # Price volatility (annualized)
-        if len(returns) >= 60:
-            recent_returns = returns[:60]
-            metrics['price_volatility_3m'] = np.std(recent_returns) * np.sqrt(252) * 100
-        
-        # Volume volatility
-        if len(volumes) >= 60:
-            vol_changes = np.diff(volumes[:60]) / np.array(volumes[:59])
-            vol_changes = vol_changes[np.isfinite(vol_changes)]
-            if len(vol_changes) > 0:
-                metrics['trading_volume_volatility'] = np.std(vol_changes) * 100
-        
-        # Price momentum (3m vs 6m performance)
-        if len(closes) >= 126:
-            perf_3m = (closes[0] - closes[60]) / closes[60] * 100
-            perf_6m = (closes[0] - closes[126]) / closes[126] * 100
-            metrics['price_momentum'] = abs(perf_3m - perf_6m)  # Momentum inconsistency = risk
-        
-        return metrics
+        """Calculate price-based risk metrics for one symbol"""
+        return price_metric_records([price_data])[0]
     
     def _calculate_financial_metrics(self, income_stmt, balance_sheet, cash_flow):
         """Calculate financial health metrics"""
@@ -218,32 +165,53 @@ class risk_model_gen:
         
         return metrics
     
-    def get_stock_features(self, symbol):
-        """Get all features for a single stock"""
+    def _fetch_stock_data(self, symbol):
+        """Fetch one stock's price history plus its financial and market metrics"""
         print(f"Collecting data for {symbol}...")
-        features = {'symbol': symbol}
-        
         try:
-            # Price metrics
             price_data = self._api_call(f"historical-price-full/{symbol}")
-            features.update(self._calculate_price_metrics(price_data))
             
             # Financial statements
-            income_stmt = self._api_call(f"income-statement/{symbol}?limit=3")
-            balance_sheet = self._api_call(f"balance-sheet-statement/{symbol}?limit=3")
-            cash_flow = self._api_call(f"cash-flow-statement/{symbol}?limit=3")
-            
-            features.update(self._calculate_financial_metrics(income_stmt, balance_sheet, cash_flow))
+            income_stmt = self._api_call(f"income-statement/{symbol}")
+            balance_sheet = self._api_call(f"balance-sheet-statement/{symbol}")
+            cash_flow = self._api_call(f"cash-flow-statement/{symbol}")
+            financial_metrics = self._calculate_financial_metrics(income_stmt, balance_sheet, cash_flow)
             
             # Market metrics
-            features.update(self._get_market_metrics(symbol))
-            
-            # Rate limiting
-            
+            market_metrics = self._get_market_metrics(symbol)
         except Exception as e:
             print(f"Error collecting data for {symbol}: {e}")
+            return None
         
-        return features if len(features) > 5 else None  # Ensure we have enough features
+        return symbol, price_data, financial_metrics, market_metrics
+    
+    def _build_features(self, fetched):
+        """
+        Feature rows for a batch of fetched stocks
+        
+        Price metrics for the whole batch are computed together as 2-D array
+        operations over the stacked price histories.
+        """
+        fetched = [stock for stock in fetched if stock is not None]
+        price_metrics = price_metric_records([price_data for _, price_data, _, _ in fetched])
+        
+        rows = []
+        for (symbol, _, financial_metrics, market_metrics), metrics in zip(fetched, price_metrics):
+            # Ensure we have enough features; price history counts for at most
+            # three, so a stock still needs some fundamentals to qualify
+            if min(len(metrics), 3) + len(financial_metrics) + len(market_metrics) < 5:
+                continue
+            features = {'symbol': symbol}
+            features.update(metrics)
+            features.update(financial_metrics)
+            features.update(market_metrics)
+            rows.append(features)
+        return rows
+    
+    def get_stock_features(self, symbol):
+        """Get all features for a single stock"""
+        rows = self._build_features([self._fetch_stock_data(symbol)])
+        return rows[0] if rows else None
     
     def _create_risk_labels(self, df):
         """Create synthetic risk labels (higher score = lower risk)"""
@@ -310,8 +278,9 @@ class risk_model_gen:
         
         return risk_score
     
-    def collect_training_data(self, symbols, force_refresh=False):
+    def collect_training_data(self, symbols, force_refresh=False, max_workers=8):
         """Collect training data with caching"""
+        import joblib
         if not force_refresh and self.training_data_path.exists():
             print("Loading cached training data...")
             return joblib.load(self.training_data_path)
@@ -319,19 +288,26 @@ class risk_model_gen:
         print(f"Collecting training data for {len(symbols)} symbols...")
         
         data_list = []
-        for i, symbol in enumerate(symbols):
-            features = self.get_stock_features(symbol)
-            if features:
-                data_list.append(features)
+        for features in self._collect_features(symbols, max_workers):
+            data_list.append(features)
             
-            if (i + 1) % 10 == 0:
-                print(f"Processed {i + 1}/{len(symbols)} symbols...")
+            if len(data_list) % 10 == 0:
+                print(f"Processed {len(data_list)}/{len(symbols)} symbols...")
         
         if not data_list:
             raise ValueError("No data collected successfully")
         
-        # Create DataFrame
-        df = pd.DataFrame(data_list)
+        df = self.prepare_training_data(pd.DataFrame(data_list))
+        
+        # Cache the data
+        joblib.dump(df, self.training_data_path)
+        print(f"Training data saved to {self.training_data_path}")
+        
+        return df
+    
+    def prepare_training_data(self, df):
+        """Clip outliers, fill gaps and add risk labels to raw collected features"""
+        df = df.copy()
         
         # Clean data
         numeric_cols = [col for col in df.columns if col != 'symbol']
@@ -349,15 +325,22 @@ class risk_model_gen:
         
         # Create risk labels
         df['risk_score'] = self._create_risk_labels(df)
-        
-        # Cache the data
-        joblib.dump(df, self.training_data_path)
-        print(f"Training data saved to {self.training_data_path}")
-        
         return df
     
-    def train_model(self, training_data=None, symbols=None):
-        """Train the risk scoring model"""
+    def train_model(self, training_data=None, symbols=None, mode="holdout", cv_folds=5, n_workers=None):
+        """
+        Train the risk scoring model
+        
+        Args:
+            training_data: Prepared training DataFrame (collected from symbols if None)
+            symbols: Symbols to collect training data for
+            mode: "holdout" fits RandomForest and XGBoost on one 80/20 split;
+                  "cv" evaluates every CV_CANDIDATES grid point with k-fold CV
+                  in a process pool and refits the best one on all the data
+            cv_folds: Number of folds in "cv" mode
+            n_workers: Worker processes in "cv" mode (defaults to CPU count)
+        """
+        start = time.time()
         if training_data is None:
             if symbols is None:
                 # Default training symbols
@@ -376,80 +359,63 @@ class risk_model_gen:
         X = training_data[feature_columns].copy()
         y = training_data['risk_score'].copy()
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
-        
-        # Create preprocessing pipeline
-        preprocessor = ColumnTransformer(
-            transformers=[('scaler', RobustScaler(), feature_columns)]
-        )
-        
-        # Train multiple models and select the best
-        models = {
-            'random_forest': RandomForestRegressor(
-                n_estimators=100, max_depth=8, min_samples_split=5,
-                random_state=42, n_jobs=-1
-            ),
-            'xgboost': xgb.XGBRegressor(
-                n_estimators=100, learning_rate=0.1, max_depth=6,
-                random_state=42, eval_metric='rmse'
+        from risk_training import select_model_cv, select_model_holdout, peak_memory_mb
+        if mode == "cv":
+            best_model, best_score, selection = select_model_cv(
+                X, y, feature_columns, cv_folds, n_workers
             )
-        }
-        
-        best_score = -np.inf
-        best_model = None
-        
-        for name, model in models.items():
-            # Create pipeline
-            pipeline = Pipeline([
-                ('preprocessor', preprocessor),
-                ('regressor', model)
-            ])
-            
-            # Train and evaluate
-            pipeline.fit(X_train, y_train)
-            y_pred = pipeline.predict(X_test)
-            r2 = r2_score(y_test, y_pred)
-            
-            print(f"{name} - R²: {r2:.3f}")
-            
-            if r2 > best_score:
-                best_score = r2
-                best_model = pipeline
+        else:
+            best_model, best_score, selection = select_model_holdout(X, y, feature_columns)
         
         # Store model and metadata
+        peak_mb, peak_worker_mb = peak_memory_mb()
         self.model = best_model
         self.feature_columns = feature_columns
         self.model_metadata = {
             'training_samples': len(training_data),
             'features_used': feature_columns,
             'r2_score': best_score,
-            'training_date': pd.Timestamp.now().isoformat()
+            'training_date': pd.Timestamp.now().isoformat(),
+            'training_mode': mode,
+            'training_seconds': time.time() - start,
+            'peak_memory_mb': peak_mb,
+            'peak_worker_memory_mb': peak_worker_mb
         }
+        self.model_metadata.update(selection)
         
         # Save everything
         self.save_model()
         
-        print(f"Model trained successfully! R²: {best_score:.3f}")
+        print(f"Model trained successfully! R²: {best_score:.3f} "
+              f"({self.model_metadata['training_seconds']:.1f}s)")
         return best_model
     
-    def predict_risk_scores(self, symbols):
-        """Predict risk scores for given symbols"""
-        if self.model is None:
-            raise ValueError("Model not trained. Please train or load a model first.")
-        
-        # Collect prediction data
-        prediction_data = []
-        for symbol in symbols:
-            features = self.get_stock_features(symbol)
-            if features:
-                prediction_data.append(features)
-        
-        if not prediction_data:
-            return pd.DataFrame()
+    def _collect_features(self, symbols, max_workers=8, ordered=True, batch_size=32):
+        """
+        Fetch features for many symbols concurrently
         
+        Every worker goes through the shared FMP client, so the token-bucket
+        rate limit holds across all of them. Fetched stocks are turned into
+        features batch_size at a time; with ordered=False a batch is formed
+        from whichever symbols' data arrives first.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if ordered:
+                results = executor.map(self._fetch_stock_data, symbols)
+            else:
+                futures = [executor.submit(self._fetch_stock_data, symbol) for symbol in symbols]
+                results = (future.result() for future in as_completed(futures))
+            batch = []
+            for fetched in results:
+                batch.append(fetched)
+                if len(batch) >= batch_size:
+                    yield from self._build_features(batch)
+                    batch = []
+            if batch:
+                yield from self._build_features(batch)
+    
+    def _score_features(self, prediction_data):
+        """Run one model.predict over the feature rows of many symbols"""
         # Create DataFrame and prepare features
         pred_df = pd.DataFrame(prediction_data)
         
@@ -465,18 +431,55 @@ class risk_model_gen:
         
         # Predict
         X_pred = pred_df[self.feature_columns]
-        predictions = self.model.predict(X_pred)
+        with MODEL_PREDICT.time(model="risk"):
+            predictions = self.model.predict(X_pred)
         predictions = np.clip(predictions, 0, 100)
         
         # Create results
-        results = pd.DataFrame({
+        return pd.DataFrame({
             'symbol': pred_df['symbol'],
             'risk_score': predictions,
             'risk_category': self._categorize_risk(predictions)
         })
+    
+    def predict_risk_scores(self, symbols, max_workers=8):
+        """Predict risk scores for given symbols"""
+        if self.model is None:
+            raise ValueError("Model not trained. Please train or load a model first.")
+        
+        # Collect prediction data for every symbol concurrently
+        prediction_data = list(self._collect_features(symbols, max_workers))
         
+        if not prediction_data:
+            return pd.DataFrame()
+        
+        results = self._score_features(prediction_data)
         return results.sort_values('risk_score', ascending=False)
     
+    def iter_risk_scores(self, symbols, batch_size=8, max_workers=8):
+        """
+        Yield risk scores in micro-batches as symbols' data arrives
+        
+        Missing feature values are filled from the medians of each micro-batch
+        rather than of the whole request.
+        
+        Args:
+            symbols: Symbols to score
+            batch_size: Symbols per model.predict call
+            max_workers: Concurrent feature fetches
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Please train or load a model first.")
+        
+        batch = []
+        for features in self._collect_features(symbols, max_workers, ordered=False, batch_size=batch_size):
+            batch.append(features)
+            if len(batch) >= batch_size:
+                yield self._score_features(batch)
+                batch = []
+        if batch:
+            yield self._score_features(batch)
+    
     def _categorize_risk(self, scores):
         """Categorize risk scores"""
         return ['Low Risk' if score >= 70 else 'Medium Risk' if score >= 40 else 'High Risk' 
@@ -484,6 +487,7 @@ class risk_model_gen:
     
     def save_model(self):
         """Save model and all associated data"""
+        import joblib
         model_data = {
             'model': self.model,
             'feature_columns': self.feature_columns,
@@ -493,16 +497,34 @@ class risk_model_gen:
         joblib.dump(model_data, self.model_path)
         joblib.dump(self.model_metadata, self.model_metadata_path)
         print(f"Model saved to {self.model_path}")
+        
+        # Numpy-only copy for fast, low-memory loading by the API servers
+        try:
+            export_compact(self.model, self.compact_model_path, metadata={
+                'feature_columns': self.feature_columns,
+                'model_metadata': self.model_metadata
+            }, source=self.model_path)
+        except Exception as e:
+            print(f"Warning: could not export compact model: {e}")
     
     def load_model(self):
-        """Load saved model"""
-        if not self.model_path.exists():
+        """Load saved model (from the compact export when it matches the pickle, or stands alone)"""
+        if artifact_mtime(self.model_path) is None:
             raise FileNotFoundError(f"No saved model found at {self.model_path}")
         
-        model_data = joblib.load(self.model_path)
-        self.model = model_data['model']
-        self.feature_columns = model_data['feature_columns']
-        self.model_metadata = model_data.get('model_metadata', {})
+        if is_current(self.model_path):
+            with MODEL_LOAD.time(model="risk", format="compact"):
+                compact = load_compact(self.compact_model_path)
+            self.model = compact
+            self.feature_columns = compact.metadata['feature_columns']
+            self.model_metadata = compact.metadata.get('model_metadata', {})
+        else:
+            with MODEL_LOAD.time(model="risk", format="pickle"):
+                import joblib
+                model_data = joblib.load(self.model_path)
+            self.model = model_data['model']
+            self.feature_columns = model_data['feature_columns']
+            self.model_metadata = model_data.get('model_metadata', {})
         
         print(f"Model loaded successfully!")
         print(f"Training date: {self.model_metadata.get('training_date', 'Unknown')}")
@@ -536,31 +558,161 @@ def quick_risk_analysis(symbols, model_dir="../model_data"):
     
     return scorer.predict_risk_scores(symbols)
 
-def train_new_model(symbols=None, model_dir="../model_data", force_refresh=False):
-    """Train a new model from scratch"""
+def train_new_model(symbols=None, model_dir="../model_data", force_refresh=False, mode="holdout"):
+    """Train a new model from scratch (mode="cv" for parallel cross-validated selection)"""
     scorer = risk_model_gen(model_dir)
-    scorer.train_model(symbols=symbols)
+    scorer.train_model(symbols=symbols, mode=mode)
     return scorer
 
+# ====================================================
+# Warm Risk Scorer for the API Server
+# ====================================================
+
+class RiskScorerService:
+    def __init__(self, model_dir="../model_data", poll_interval=30, max_retry_interval=600):
+        """
+        Keeps one warm risk scorer for the API server
+
+        Loading, training (when no saved model exists) and reloading after the
+        model file changes all happen on a background thread; requests only ever
+        read the current scorer and never wait on disk or on training. A failed
+        load or training run is retried with exponential backoff.
+
+        Args:
+            model_dir: Directory holding the saved risk model
+            poll_interval: Seconds between checks for a changed pickle or compact export
+            max_retry_interval: Longest wait in seconds between retries after a failure
+        """
+        self.model_dir = model_dir
+        self.model_path = Path(model_dir) / "risk_model.pkl"
+        self.poll_interval = poll_interval
+        self.max_retry_interval = max_retry_interval
+
+        self.scorer = None
+        self.state = "cold"   # cold -> loading/training -> ready (or failed, then retried)
+        self.error = None
+        self._loaded_mtime = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the background loader (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="risk-model-loader", daemon=True)
+                self._thread.start()
+
+    def get_scorer(self):
+        """Return the warm scorer, or None while the model is warming or has failed"""
+        self.start()
+        return self.scorer
+
+    def status(self):
+        return {'state': self.state, 'error': self.error}
+
+    def _model_mtime(self):
+        return artifact_mtime(self.model_path)
+
+    def _load(self, mtime):
+        scorer = risk_model_gen(self.model_dir)
+        scorer.load_model()
+        self.scorer = scorer  # Swap in only once fully loaded
+        self._loaded_mtime = mtime
+        self.state = "ready"
+        self.error = None
+
+    def _warm(self):
+        """Load the saved model, or train one when none exists"""
+        mtime = self._model_mtime()
+        if mtime is None:
+            self.state = "training"
+            print("No saved model found. Training new model in the background...")
+            scorer = risk_model_gen(self.model_dir)
+            scorer.train_model()
+            self.scorer = scorer
+            self._loaded_mtime = self._model_mtime()
+            self.state = "ready"
+            self.error = None
+        else:
+            self.state = "loading"
+            self._load(mtime)
+
+    def _run(self):
+        retry_interval = self.poll_interval
+        next_retry = None
+        try:
+            self._warm()
+        except Exception as e:
+            print(f"Error warming risk model: {e}")
+            self.state = "failed"
+            self.error = str(e)
+            next_retry = time.monotonic() + retry_interval
+
+        # Retry failed warm-ups and pick up retrained models without blocking requests
+        while True:
+            time.sleep(self.poll_interval)
+            mtime = self._model_mtime()
+            if self.state == "failed":
+                # A changed model file is worth trying straight away
+                if time.monotonic() < next_retry and (mtime is None or mtime == self._loaded_mtime):
+                    continue
+                try:
+                    self._warm()
+                    print("Risk model ready after retrying")
+                    retry_interval = self.poll_interval
+                except Exception as e:
+                    retry_interval = min(retry_interval * 2, self.max_retry_interval)
+                    print(f"Error warming risk model (retrying in {retry_interval}s): {e}")
+                    self.state = "failed"
+                    self.error = str(e)
+                    next_retry = time.monotonic() + retry_interval
+            elif mtime is not None and mtime != self._loaded_mtime:
+                try:
+                    self._load(mtime)
+                    print("Reloaded risk model after the saved model changed")
+                except Exception as e:
+                    print(f"Error reloading risk model: {e}")
+
+risk_service = RiskScorerService(model_dir="../model_data")
+
+def model_warming_response():
+    """503 returned while the risk model is loading or training, or after it failed"""
+    status = risk_service.status()
+    if status['state'] == 'failed':
+        # Not a transient warm-up, so no Retry-After; the loader keeps retrying in the background
+        return jsonify({
+            'status': 'failed',
+            'model': status,
+            'error': f"Risk model failed to load: {status['error']}"
+        }), 503
+    response = jsonify({
+        'status': 'warming',
+        'model': status,
+        'error': 'Risk model is warming up, please retry shortly'
+    })
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
 # ====================================================
 # Flask Web API Endpoints
 # ====================================================
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+instrument_app(app)  # Per-route request metrics and /metrics
 
 @app.route('/api/risk/<symbol>')
 def get_risk_score(symbol):
-    """Get risk score for a single stock symbol"""
+    """Get risk score for a single stock symbol (from the snapshot when available)"""
     try:
-        print(f"Getting risk score for {symbol}...")
-        scorer = risk_model_gen(model_dir="../model_data")
+        snapshot = score_snapshot.lookup(symbol, RISK_KEYS)
+        if snapshot is not None:
+            return jsonify(dict(snapshot, source='snapshot', status='success'))
         
-        try:
-            scorer.load_model()
-        except FileNotFoundError:
-            print("No saved model found. Training new model...")
-            scorer.train_model()
+        print(f"Getting risk score for {symbol}...")
+        scorer = risk_service.get_scorer()
+        if scorer is None:
+            return model_warming_response()
         
         results = scorer.predict_risk_scores([symbol])
         if not results.empty:
@@ -569,6 +721,8 @@ def get_risk_score(symbol):
                 'symbol': symbol,
                 'riskScore': float(row['risk_score']),
                 'riskCategory': row['risk_category'],
+                'as_of': utc_now(),
+                'source': 'live',
                 'status': 'success'
             })
         else:
@@ -577,35 +731,46 @@ def get_risk_score(symbol):
         print(f"Error getting risk score for {symbol}: {e}")
         return jsonify({'error': str(e)}), 500
 
+def _risk_score_records(results):
+    return score_records(results, {'symbol': 'symbol', 'risk_score': 'riskScore', 'risk_category': 'riskCategory'},
+                         as_of=utc_now())
+
 @app.route('/api/risk/bulk', methods=['POST'])
 def get_bulk_risk_scores():
-    """Get risk scores for multiple stock symbols"""
+    """
+    Get risk scores for multiple stock symbols
+    
+    Symbols in the score snapshot are served from memory; only the rest are
+    scored live. With ?stream=ndjson (or ?stream=sse) scores are sent as they
+    are computed, followed by a final summary record. ?format=msgpack|arrow
+    selects a binary encoding for the non-streaming response.
+    """
     try:
         data = request.get_json()
         symbols = data.get('symbols', [])
         if not symbols:
             return jsonify({'error': 'No symbols provided'}), 400
         
-        print(f"Getting risk scores for {len(symbols)} symbols...")
-        scorer = risk_model_gen(model_dir="../model_data")
-        
-        try:
-            scorer.load_model()
-        except FileNotFoundError:
-            print("No saved model found. Training new model...")
-            scorer.train_model()
-        
-        results = scorer.predict_risk_scores(symbols)
-        
-        if not results.empty:
-            scores = []
-            for _, row in results.iterrows():
-                scores.append({
-                    'symbol': row['symbol'],
-                    'riskScore': float(row['risk_score']),
-                    'riskCategory': row['risk_category']
-                })
-            return jsonify({'scores': scores, 'status': 'success'})
+        scores, missing = score_snapshot.partition(symbols, RISK_KEYS)
+        print(f"Getting risk scores for {len(symbols)} symbols ({len(missing)} live)...")
+        scorer = None
+        if missing:
+            scorer = risk_service.get_scorer()
+            if scorer is None:
+                return model_warming_response()
+        
+        stream_format = requested_stream_format()
+        if stream_format:
+            batches = scorer.iter_risk_scores(missing) if missing else []
+            return stream_scores(batches, _risk_score_records, len(symbols), stream_format, ready_records=scores)
+        
+        if missing:
+            results = scorer.predict_risk_scores(missing)
+            if not results.empty:
+                scores += _risk_score_records(results)
+        
+        if scores:
+            return serialize_response({'scores': scores, 'status': 'success'})
         else:
             return jsonify({'error': 'No data found'}), 404
     except Exception as e:
@@ -615,14 +780,23 @@ def get_bulk_risk_scores():
 @app.route('/api/risk/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'risk_model'})
+    return jsonify({'status': 'healthy', 'service': 'risk_model', 'model': risk_service.status(),
+                    'snapshot': score_snapshot.status()})
 
 # Example usage
 if __name__ == "__main__":
     # Check if running as web server or training script
     if len(sys.argv) > 1 and sys.argv[1] == '--server':
         print("Starting Risk Model API server on port 5002...")
+        # With the debug reloader, only the serving child process warms the model
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            risk_service.start()
         app.run(host='0.0.0.0', port=5002, debug=True)
+    elif len(sys.argv) > 1 and sys.argv[1] == '--train':
+        # python risk_model_gen.py --train [--cv] (same as python risk_training.py [--cv])
+        mode = "cv" if '--cv' in sys.argv else "holdout"
+        scorer = train_new_model(mode=mode)
+        print(scorer.get_model_info())
     else:
         # Original training code
         test_symbols = [
@@ -636,8 +810,8 @@ if __name__ == "__main__":
         if not results.empty:
             print("\nRisk Analysis Results:")
             print("-" * 50)
-            for _, row in results.iterrows():
-                print(f"{row['symbol']:6} | {row['risk_score']:5.1f} | {row['risk_category']}")
+            for symbol, score, category in zip(results['symbol'], results['risk_score'], results['risk_category']):
+                print(f"{symbol:6} | {score:5.1f} | {category}")
         
         print(f"\nNote: Higher scores indicate LOWER risk!")
         print("Risk Categories:")
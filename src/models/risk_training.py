@@ -0,0 +1,197 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.linear_model import Ridge
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split, KFold, ParameterGrid, cross_val_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import RobustScaler
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Optional: without xgboost its candidates are skipped; without threadpoolctl
+# CV workers are limited through OMP_NUM_THREADS only
+try:
+    import xgboost as xgb
+except ImportError:
+    xgb = None
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+# Train-time half of the risk model: candidate estimators, model selection and
+# the training entry point. risk_model_gen imports this lazily from train_model,
+# so the API server never loads sklearn or xgboost unless it has to train.
+
+# ====================================================
+# Cross-Validated Model Selection
+# ====================================================
+# Candidate models and hyperparameter grids evaluated by train_model(mode="cv").
+# Each grid point is scored with k-fold CV in its own worker process, so the
+# estimators themselves run single-threaded. The instances here are templates:
+# every fit uses a clone, so tasks never share or mutate them.
+CV_CANDIDATES = {
+    'random_forest': (
+        RandomForestRegressor(random_state=42, n_jobs=1),
+        {'n_estimators': [100, 300], 'max_depth': [6, 8, None], 'min_samples_split': [5]}
+    ),
+    'hist_gradient_boosting': (
+        HistGradientBoostingRegressor(random_state=42),
+        {'max_iter': [200], 'learning_rate': [0.05, 0.1], 'max_leaf_nodes': [15, 31]}
+    ),
+    'ridge': (
+        Ridge(),
+        {'alpha': [0.1, 1.0, 10.0]}
+    )
+}
+if xgb is not None:
+    CV_CANDIDATES['xgboost'] = (
+        xgb.XGBRegressor(random_state=42, eval_metric='rmse', n_jobs=1),
+        {'n_estimators': [100, 300], 'learning_rate': [0.05, 0.1], 'max_depth': [4, 6]}
+    )
+
+def _build_pipeline(feature_columns, model):
+    preprocessor = ColumnTransformer(
+        transformers=[('scaler', RobustScaler(), feature_columns)]
+    )
+    return Pipeline([
+        ('preprocessor', preprocessor),
+        ('regressor', model)
+    ])
+
+def _single_threaded_worker():
+    """
+    Process pool initializer: one native thread per worker
+
+    HistGradientBoosting (OpenMP) and BLAS would otherwise use every core in
+    every worker, oversubscribing the CPU and skewing the reported timings.
+    """
+    os.environ["OMP_NUM_THREADS"] = "1"
+    if threadpool_limits is not None:
+        threadpool_limits(1)
+
+def _cv_evaluate(name, model, params, X, y, feature_columns, cv_folds):
+    """Score one candidate/grid point with k-fold CV (runs in a worker process)"""
+    start = time.time()
+    pipeline = _build_pipeline(feature_columns, clone(model).set_params(**params))
+    folds = KFold(n_splits=cv_folds, shuffle=True, random_state=42)
+    scores = cross_val_score(pipeline, X, y, cv=folds, scoring='r2')
+    return {
+        'model': name,
+        'params': params,
+        'r2_mean': float(np.mean(scores)),
+        'r2_std': float(np.std(scores)),
+        'seconds': time.time() - start
+    }
+
+def peak_memory_mb():
+    """Peak resident memory (MB) of this process and of its largest finished worker, separately"""
+    if resource is None:
+        return None, None
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    # RUSAGE_CHILDREN is the largest single finished child (not a total, and
+    # 0 before any worker exits); the two peaks need not overlap, so never add them
+    worker = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return own, worker or None
+
+def select_model_holdout(X, y, feature_columns):
+    """Fit RandomForest and XGBoost (when installed) on one 80/20 split and keep the best"""
+    # Split data
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+
+    # Train multiple models and select the best
+    models = {
+        'random_forest': RandomForestRegressor(
+            n_estimators=100, max_depth=8, min_samples_split=5,
+            random_state=42, n_jobs=-1
+        )
+    }
+    if xgb is not None:
+        models['xgboost'] = xgb.XGBRegressor(
+            n_estimators=100, learning_rate=0.1, max_depth=6,
+            random_state=42, eval_metric='rmse'
+        )
+
+    best_score = -np.inf
+    best_model = None
+    best_name = None
+
+    for name, model in models.items():
+        # Create pipeline
+        pipeline = _build_pipeline(feature_columns, model)
+
+        # Train and evaluate
+        pipeline.fit(X_train, y_train)
+        y_pred = pipeline.predict(X_test)
+        r2 = r2_score(y_test, y_pred)
+
+        print(f"{name} - R²: {r2:.3f}")
+
+        if r2 > best_score:
+            best_score = r2
+            best_model = pipeline
+            best_name = name
+
+    return best_model, best_score, {'model_name': best_name}
+
+def select_model_cv(X, y, feature_columns, cv_folds=5, n_workers=None):
+    """Cross-validate every candidate grid point in parallel and refit the best"""
+    tasks = [(name, model, params)
+             for name, (model, grid) in CV_CANDIDATES.items()
+             for params in ParameterGrid(grid)]
+    print(f"Cross-validating {len(tasks)} candidate configurations ({cv_folds}-fold)...")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_single_threaded_worker) as executor:
+        futures = [executor.submit(_cv_evaluate, name, model, params, X, y, feature_columns, cv_folds)
+                   for name, model, params in tasks]
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Candidate failed: {e}")
+                continue
+            print(f"{result['model']} {result['params']} - "
+                  f"R²: {result['r2_mean']:.3f} ± {result['r2_std']:.3f}")
+            results.append(result)
+
+    if not results:
+        raise ValueError("Every candidate model failed cross-validation")
+
+    best = max(results, key=lambda result: result['r2_mean'])
+    model, _ = CV_CANDIDATES[best['model']]
+
+    # Refit the winner on all the data
+    best_model = _build_pipeline(feature_columns, clone(model).set_params(**best['params']))
+    best_model.fit(X, y)
+
+    results.sort(key=lambda result: result['r2_mean'], reverse=True)
+    return best_model, best['r2_mean'], {
+        'model_name': best['model'],
+        'model_params': best['params'],
+        'cv_folds': cv_folds,
+        'cv_r2_std': best['r2_std'],
+        'cv_results': results
+    }
+
+
+if __name__ == "__main__":
+    # python risk_training.py [--cv]
+    from risk_model_gen import train_new_model
+    scorer = train_new_model(mode="cv" if '--cv' in sys.argv else "holdout")
+    print(scorer.get_model_info())
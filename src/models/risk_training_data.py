@@ -0,0 +1,215 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from fmp_client import get_client
+from risk_model_gen import risk_model_gen
+
+# ====================================================
+# Universe-Scale Risk Training Data
+# ====================================================
+# Collects risk features for thousands of symbols in parallel and writes them
+# as numbered shards. A checkpoint file records every symbol already attempted,
+# so an interrupted run resumes where it stopped instead of starting over.
+
+TRAINING_SHARDS_DIR = "../model_data/risk_training_shards"
+CHECKPOINT_FILE = "checkpoint.json"
+
+# FMP constituent endpoints for the supported indexes
+INDEX_ENDPOINTS = {
+    "sp500": "sp500_constituent",
+    "nasdaq": "nasdaq_constituent",
+    "dowjones": "dowjones_constituent",
+}
+
+# Screener defaults: liquid, actively traded US listings
+SCREENER_DEFAULTS = {
+    "marketCapMoreThan": 300_000_000,
+    "volumeMoreThan": 100_000,
+    "isActivelyTrading": "true",
+    "country": "US",
+    "limit": 5000,
+}
+
+
+# ====================================================
+# Symbol Sources
+# ====================================================
+
+def symbols_from_file(path):
+    """One symbol per line (blank lines and # comments are skipped)"""
+    with open(path) as f:
+        return [line.split("#", 1)[0].strip().upper() for line in f
+                if line.split("#", 1)[0].strip()]
+
+
+def symbols_from_index(index):
+    """Current constituents of an index ("sp500", "nasdaq" or "dowjones")"""
+    if index not in INDEX_ENDPOINTS:
+        raise ValueError(f"Unknown index '{index}' (expected one of {', '.join(INDEX_ENDPOINTS)})")
+    constituents = get_client().get_json(INDEX_ENDPOINTS[index]) or []
+    return [company["symbol"] for company in constituents if company.get("symbol")]
+
+
+def symbols_from_screener(**filters):
+    """Symbols returned by the FMP stock screener (filters override SCREENER_DEFAULTS)"""
+    params = dict(SCREENER_DEFAULTS, **filters)
+    companies = get_client().get_json("stock-screener", params) or []
+    return [company["symbol"] for company in companies if company.get("symbol")]
+
+
+def resolve_symbols(source):
+    """
+    Symbols for a source spec
+
+    Args:
+        source: "file:<path>", "index:<sp500|nasdaq|dowjones>" or
+                "screener[:key=value,...]" (e.g. "screener:exchange=NASDAQ,limit=2000")
+    """
+    kind, _, arg = source.partition(":")
+    if kind == "file":
+        symbols = symbols_from_file(arg)
+    elif kind == "index":
+        symbols = symbols_from_index(arg)
+    elif kind == "screener":
+        filters = dict(item.split("=", 1) for item in arg.split(",") if item)
+        symbols = symbols_from_screener(**filters)
+    else:
+        raise ValueError(f"Unknown symbol source '{source}'")
+
+    # Keep the first occurrence of each symbol
+    return list(dict.fromkeys(symbols))
+
+
+# ====================================================
+# Sharded, Resumable Builder
+# ====================================================
+
+class TrainingDataBuilder:
+    def __init__(self, output_dir=TRAINING_SHARDS_DIR, shard_size=500, max_workers=16, scorer=None):
+        """
+        Builds risk training data for a large symbol universe
+
+        Args:
+            output_dir: Directory holding the shards and the checkpoint
+            shard_size: Symbols collected per shard (and per checkpoint)
+            max_workers: Concurrent feature fetches (all share the FMP rate limit)
+            scorer: risk_model_gen whose feature extraction is used
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.shard_size = shard_size
+        self.max_workers = max_workers
+        self.scorer = scorer if scorer is not None else risk_model_gen(str(self.output_dir))
+        self.checkpoint_path = self.output_dir / CHECKPOINT_FILE
+
+    def load_checkpoint(self):
+        if not self.checkpoint_path.exists():
+            return {"done": [], "failed": [], "shards": []}
+        with open(self.checkpoint_path) as f:
+            return json.load(f)
+
+    def _write_atomic(self, path, write):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _save_checkpoint(self, checkpoint):
+        def write(path):
+            with open(path, "w") as f:
+                json.dump(checkpoint, f)
+        self._write_atomic(self.checkpoint_path, write)
+
+    def build(self, symbols, retry=False):
+        """
+        Collect features for every symbol not already in the checkpoint
+
+        Each shard is written before the checkpoint records its symbols, so a
+        crash loses at most the shard in progress.
+
+        Args:
+            symbols: Symbols to collect
+            retry: Also collect symbols the checkpoint lists as failed
+        """
+        checkpoint = self.load_checkpoint()
+        attempted = set(checkpoint["done"])
+        if not retry:
+            attempted |= set(checkpoint["failed"])
+        pending = [symbol for symbol in symbols if symbol not in attempted]
+        print(f"{len(symbols) - len(pending)} symbols already collected, {len(pending)} to go")
+
+        start = time.time()
+        for offset in range(0, len(pending), self.shard_size):
+            chunk = pending[offset:offset + self.shard_size]
+            rows = list(self.scorer._collect_features(chunk, self.max_workers, ordered=False))
+
+            collected = {row["symbol"] for row in rows}
+            if rows:
+                shard_name = f"shard-{len(checkpoint['shards']):05d}.pkl"
+                frame = pd.DataFrame(rows)
+                self._write_atomic(self.output_dir / shard_name, lambda path: joblib.dump(frame, path))
+                checkpoint["shards"].append(shard_name)
+
+            # A retried symbol leaves "failed" only once its chunk is saved
+            attempted_chunk = set(chunk)
+            checkpoint["failed"] = [symbol for symbol in checkpoint["failed"] if symbol not in attempted_chunk]
+            checkpoint["done"].extend(symbol for symbol in chunk if symbol in collected)
+            checkpoint["failed"].extend(symbol for symbol in chunk if symbol not in collected)
+            self._save_checkpoint(checkpoint)
+
+            finished = offset + len(chunk)
+            rate = finished / max(time.time() - start, 1e-9)
+            print(f"Collected {finished}/{len(pending)} symbols "
+                  f"({len(checkpoint['done'])} usable, {rate:.1f} symbols/s)")
+        return checkpoint
+
+    def retry_failed(self):
+        """Give previously failed symbols another attempt (resumable like build)"""
+        return self.build(self.load_checkpoint()["failed"], retry=True)
+
+    def load_raw(self):
+        """All collected feature rows, before cleaning and labelling"""
+        shards = [joblib.load(self.output_dir / name) for name in self.load_checkpoint()["shards"]]
+        if not shards:
+            raise ValueError(f"No training shards found in {self.output_dir}")
+        return pd.concat(shards, ignore_index=True).drop_duplicates("symbol", keep="last")
+
+    def load_training_data(self):
+        """Cleaned, labelled training data ready for risk_model_gen.train_model"""
+        return self.scorer.prepare_training_data(self.load_raw())
+
+
+if __name__ == "__main__":
+    # Usage: python risk_training_data.py <source> [--output DIR] [--workers N] [--shard-size N]
+    #                                     [--retry-failed] [--train [--cv]]
+    #   e.g. python risk_training_data.py index:sp500 --train --cv
+    if len(sys.argv) < 2:
+        print("Usage: python risk_training_data.py <file:PATH|index:NAME|screener[:k=v,...]> [options]")
+        sys.exit(1)
+
+    args = sys.argv[2:]
+
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    builder = TrainingDataBuilder(
+        output_dir=option('--output', TRAINING_SHARDS_DIR),
+        shard_size=int(option('--shard-size', 500)),
+        max_workers=int(option('--workers', 16))
+    )
+    symbols = resolve_symbols(sys.argv[1])
+    print(f"Resolved {len(symbols)} symbols from {sys.argv[1]}")
+    builder.build(symbols)
+    if '--retry-failed' in args:
+        builder.retry_failed()
+
+    if '--train' in args:
+        scorer = risk_model_gen("../model_data")
+        scorer.train_model(training_data=builder.load_training_data(),
+                           mode="cv" if '--cv' in args else "holdout")
+        print(scorer.get_model_info())
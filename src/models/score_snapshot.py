@@ -0,0 +1,191 @@
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+# ====================================================
+# Versioned Score Snapshots
+# ====================================================
+# A batch job (snapshot_job.py) scores the tradeable universe with all three
+# models and writes each run as a new snapshot version. The API services keep
+# the latest version in memory and only compute scores live for symbols that
+# are missing from it.
+
+SNAPSHOT_PATH = "../model_data/score_snapshots.sqlite"
+
+# Older snapshot versions kept around for comparison / rollback
+KEEP_VERSIONS = 5
+
+# Snapshot column -> key used in the API responses
+SCORE_FIELDS = {
+    "growth_score": "growthScore",
+    "risk_score": "riskScore",
+    "risk_category": "riskCategory",
+    "value_score": "valueScore",
+    "pe_score": "peScore",
+    "peg_score": "pegScore",
+    "fcf_score": "fcfScore",
+    "roe_score": "roeScore",
+    "debt_score": "debtScore",
+    "eps_score": "epsScore",
+}
+
+GROWTH_KEYS = ["growthScore"]
+RISK_KEYS = ["riskScore", "riskCategory"]
+VALUE_KEYS = ["valueScore", "peScore", "pegScore", "fcfScore", "roeScore", "debtScore", "epsScore"]
+
+
+def utc_now():
+    """ISO-8601 UTC timestamp used for as_of fields"""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS snapshots (
+               version INTEGER PRIMARY KEY AUTOINCREMENT,
+               as_of TEXT NOT NULL,
+               symbols INTEGER NOT NULL
+           )"""
+    )
+    columns = ", ".join(f"{column} {'TEXT' if column == 'risk_category' else 'REAL'}"
+                        for column in SCORE_FIELDS)
+    conn.execute(
+        f"""CREATE TABLE IF NOT EXISTS scores (
+                version INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
+                {columns},
+                PRIMARY KEY (version, symbol)
+            )"""
+    )
+    return conn
+
+
+def write_snapshot(rows, path=SNAPSHOT_PATH, keep_versions=KEEP_VERSIONS):
+    """
+    Store one scoring run as a new snapshot version
+
+    Args:
+        rows: Dicts with a 'symbol' key plus any of the SCORE_FIELDS columns
+        path: SQLite file holding the snapshots
+        keep_versions: Number of most recent versions to keep
+
+    Returns:
+        (version, as_of) of the new snapshot
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    as_of = utc_now()
+    conn = _connect(path)
+    try:
+        with conn:
+            version = conn.execute(
+                "INSERT INTO snapshots (as_of, symbols) VALUES (?, ?)", (as_of, len(rows))
+            ).lastrowid
+            columns = ["version", "symbol"] + list(SCORE_FIELDS)
+            conn.executemany(
+                f"INSERT INTO scores ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [[version, row["symbol"].upper()] + [row.get(column) for column in SCORE_FIELDS]
+                 for row in rows],
+            )
+            # Drop versions beyond the retention window
+            conn.execute("DELETE FROM scores WHERE version <= ?", (version - keep_versions,))
+            conn.execute("DELETE FROM snapshots WHERE version <= ?", (version - keep_versions,))
+    finally:
+        conn.close()
+    print(f"Wrote score snapshot v{version} ({len(rows)} symbols) as of {as_of} to {path}")
+    return version, as_of
+
+
+class ScoreSnapshotIndex:
+    def __init__(self, path=SNAPSHOT_PATH):
+        """
+        In-memory index of the latest score snapshot, keyed by symbol
+
+        The index is rebuilt whenever the snapshot file changes, so a new batch
+        run is picked up without restarting the services.
+
+        Args:
+            path: SQLite file holding the snapshots
+        """
+        self.path = Path(path)
+        self.version = None
+        self.as_of = None
+        self._scores = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _file_mtime(self):
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self):
+        """Reload the latest snapshot if the file changed since the last load"""
+        mtime = self._file_mtime()
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            scores, version, as_of = {}, None, None
+            if mtime is not None:
+                conn = sqlite3.connect(self.path, timeout=30)
+                try:
+                    latest = conn.execute(
+                        "SELECT version, as_of FROM snapshots ORDER BY version DESC LIMIT 1"
+                    ).fetchone()
+                    if latest:
+                        version, as_of = latest
+                        rows = conn.execute(
+                            f"SELECT symbol, {', '.join(SCORE_FIELDS)} FROM scores WHERE version = ?",
+                            (version,),
+                        )
+                        for symbol, *values in rows:
+                            scores[symbol] = {SCORE_FIELDS[column]: value
+                                              for column, value in zip(SCORE_FIELDS, values)}
+                except sqlite3.Error as e:
+                    print(f"Could not load score snapshot from {self.path}: {e}")
+                finally:
+                    conn.close()
+            self._scores, self.version, self.as_of = scores, version, as_of
+            self._mtime = mtime
+            if version is not None:
+                print(f"Loaded score snapshot v{version} ({len(scores)} symbols) as of {as_of}")
+
+    def lookup(self, symbol, keys):
+        """
+        Snapshot scores for one symbol
+
+        Returns:
+            Dict with the requested keys plus 'as_of', or None if the symbol
+            (or any requested score) is missing from the snapshot
+        """
+        self._refresh()
+        scores = self._scores.get(symbol.upper())
+        if scores is None or any(scores.get(key) is None for key in keys):
+            return None
+        record = {'symbol': symbol}
+        record.update({key: scores[key] for key in keys})
+        record['as_of'] = self.as_of
+        return record
+
+    def partition(self, symbols, keys):
+        """Split symbols into snapshot records and the symbols that need live scoring"""
+        records, missing = [], []
+        for symbol in symbols:
+            record = self.lookup(symbol, keys)
+            if record is None:
+                missing.append(symbol)
+            else:
+                records.append(record)
+        return records, missing
+
+    def status(self):
+        self._refresh()
+        return {'version': self.version, 'as_of': self.as_of, 'symbols': len(self._scores)}
+
+
+# Shared by every service in the process
+score_snapshot = ScoreSnapshotIndex()
@@ -0,0 +1,234 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, jsonify, request
+from flask_cors import CORS
+
+from fmp_client import get_client
+from growth_potential_model_gen import load_growth_model, run_scoring_for_tickers
+from risk_model_gen import risk_service, model_warming_response
+from value_model_math import ValueScoreCalculator
+from serialization import serialize_response
+from score_snapshot import score_snapshot, utc_now, GROWTH_KEYS, RISK_KEYS
+from service_metrics import instrument_app
+
+# ====================================================
+# Shared FMP Fetch Plan
+# ====================================================
+# Union of the per-symbol payloads the growth, risk and value scorers read.
+# Fetching them once up front means every scorer below is served from the
+# shared client's cache instead of each service refetching the same data.
+SYMBOL_ENDPOINTS = [
+    "profile/{symbol}",
+    "ratios-ttm/{symbol}",
+    "income-statement/{symbol}",
+    "balance-sheet-statement/{symbol}",
+    "cash-flow-statement/{symbol}",
+    "historical-price-full/{symbol}",
+]
+
+# Peers the growth model averages industry revenue over
+GROWTH_PEER_COUNT = 5
+
+PREFETCH_WORKERS = 16
+
+# Scores the gateway returns for each symbol
+SCORE_KEYS = GROWTH_KEYS + RISK_KEYS + ["valueScore"]
+
+
+def prefetch_symbols(symbols, max_workers=PREFETCH_WORKERS):
+    """Fetch every payload the three scorers need for the given symbols"""
+    client = get_client()
+    endpoints = [template.format(symbol=symbol) for symbol in symbols for template in SYMBOL_ENDPOINTS]
+    client.prefetch(endpoints, max_workers=max_workers)
+
+    # Growth also compares revenue against industry peers, which depends on the profile
+    industries = set()
+    for symbol in symbols:
+        profile = client.get_json(f"profile/{symbol}")
+        if profile and profile[0].get("industry"):
+            industries.add(profile[0]["industry"])
+
+    # Params as a dict, so industries like "Oil & Gas E&P" are encoded and share
+    # the growth model's cache key
+    screeners = client.prefetch([("stock-screener", {"industry": industry}) for industry in industries],
+                                max_workers=max_workers)
+    peers = {company.get("symbol") for screener in screeners if screener
+             for company in screener[:GROWTH_PEER_COUNT]}
+    peers.discard(None)
+    client.prefetch([f"income-statement/{peer}" for peer in peers], max_workers=max_workers)
+
+
+# ====================================================
+# Combined Scoring
+# ====================================================
+
+def _growth_scores(symbols):
+    result = run_scoring_for_tickers(symbols)
+    if result is None or result.empty:
+        return {}
+    return dict(zip(result['Symbol'], result['predicted_growth_potential'].astype(float)))
+
+
+def _risk_scores(scorer, symbols):
+    results = scorer.predict_risk_scores(symbols)
+    if results.empty:
+        return {}
+    return {symbol: (float(score), category) for symbol, score, category in
+            zip(results['symbol'], results['risk_score'], results['risk_category'])}
+
+
+def _value_scores(symbols):
+    results = ValueScoreCalculator().analyze_stocks(symbols)
+    if results is None or results.empty:
+        return {}
+    return dict(zip(results['Symbol'], results['Value_Score'].astype(float)))
+
+
+MODEL_NAMES = ["growth", "risk", "value"]
+
+
+def _risk_unavailable_error():
+    status = risk_service.status()
+    if status['state'] == 'failed':
+        return f"model failed to load: {status['error']}"
+    return 'model warming up'
+
+
+def score_symbols(symbols, risk_scorer):
+    """
+    Growth, risk and value scores for each symbol from one shared fetch
+
+    A symbol some models could not score still gets a record: those models'
+    scores are None and 'errors' says why, per model (None when all three scored).
+    A risk_scorer of None (model still warming) leaves every risk score None.
+
+    Returns:
+        (scores, missing): one record per symbol at least one model scored,
+        and the symbols no model could score
+    """
+    prefetch_symbols(symbols)
+
+    # Every payload is cached now, so the three models can run side by side
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = {
+            "growth": executor.submit(_growth_scores, symbols),
+            "value": executor.submit(_value_scores, symbols),
+        }
+        results, failures = {}, {}
+        if risk_scorer is not None:
+            futures["risk"] = executor.submit(_risk_scores, risk_scorer, symbols)
+        else:
+            results["risk"], failures["risk"] = {}, _risk_unavailable_error()
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"Error getting {name} scores: {e}")
+                results[name], failures[name] = {}, str(e)
+
+    as_of = utc_now()
+    scores = []
+    missing = []
+    for symbol in symbols:
+        errors = {name: failures.get(name, 'No data found for symbol')
+                  for name in MODEL_NAMES if symbol not in results[name]}
+        if len(errors) == len(MODEL_NAMES):
+            missing.append(symbol)
+            continue
+        risk_score, risk_category = results["risk"].get(symbol, (None, None))
+        record = {
+            'symbol': symbol,
+            'growthScore': results["growth"].get(symbol),
+            'riskScore': risk_score,
+            'riskCategory': risk_category,
+            'valueScore': results["value"].get(symbol),
+            'as_of': as_of,
+            # Always present so every record (and the Arrow schema) has the same keys
+            'errors': errors or None
+        }
+        scores.append(record)
+    return scores, missing
+
+# ====================================================
+# Flask Web API Endpoints
+# ====================================================
+
+app = Flask(__name__)
+CORS(app)  # Enable CORS for all routes
+instrument_app(app)  # Per-route request metrics and /metrics
+
+@app.route('/api/scores/<symbol>')
+def get_scores(symbol):
+    """Get growth, risk and value scores for a single stock symbol"""
+    try:
+        snapshot = score_snapshot.lookup(symbol, SCORE_KEYS)
+        if snapshot is not None:
+            return jsonify(dict(snapshot, source='snapshot', status='success'))
+
+        print(f"Getting scores for {symbol}...")
+        # A warming risk model only nulls the risk score; growth and value still run
+        scorer = risk_service.get_scorer()
+        scores, _ = score_symbols([symbol], scorer)
+        if scores:
+            # Scores some models could not produce are null, with the reason under 'errors'
+            status = 'partial' if scores[0]['errors'] else 'success'
+            return jsonify(dict(scores[0], source='live', status=status))
+        elif scorer is None:
+            return model_warming_response()
+        else:
+            return jsonify({'error': 'No data found for symbol'}), 404
+    except Exception as e:
+        print(f"Error getting scores for {symbol}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scores/bulk', methods=['POST'])
+def get_bulk_scores():
+    """
+    Get growth, risk and value scores for multiple stock symbols (?format=json|msgpack|arrow)
+
+    Partially scored symbols are included with null scores and per-model 'errors'
+    (status 'partial'); 'missing' lists the symbols no model could score.
+    """
+    try:
+        data = request.get_json()
+        symbols = data.get('symbols', [])
+        if not symbols:
+            return jsonify({'error': 'No symbols provided'}), 400
+
+        scores, live_symbols = score_snapshot.partition(symbols, SCORE_KEYS)
+        print(f"Getting scores for {len(symbols)} symbols ({len(live_symbols)} live)...")
+        missing = []
+        scorer = None
+        if live_symbols:
+            scorer = risk_service.get_scorer()
+            live_scores, missing = score_symbols(live_symbols, scorer)
+            scores += live_scores
+
+        if scores:
+            status = 'partial' if any(score.get('errors') for score in scores) else 'success'
+            return serialize_response({'scores': scores, 'missing': missing, 'status': status})
+        elif live_symbols and scorer is None:
+            return model_warming_response()
+        else:
+            return jsonify({'error': 'No data found'}), 404
+    except Exception as e:
+        print(f"Error getting bulk scores: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scores/health')
+def health_check():
+    """Health check endpoint"""
+    return jsonify({'status': 'healthy', 'service': 'scoring_gateway', 'model': risk_service.status(),
+                    'snapshot': score_snapshot.status()})
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--server':
+        print("Starting Scoring Gateway API server on port 5004...")
+        load_growth_model()
+        # With the debug reloader, only the serving child process warms the risk model
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            risk_service.start()
+        app.run(host='0.0.0.0', port=5004, debug=True)
+    else:
+        print("Usage: python scoring_gateway.py --server")
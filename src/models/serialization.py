@@ -0,0 +1,107 @@
+import io
+import json
+from flask import Response, jsonify, request
+
+# Faster encoders are used when installed; plain json always works
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# ====================================================
+# Columnar Serialization for the Bulk Scoring Endpoints
+# ====================================================
+# Score frames are turned into records column-wise (no per-row Series objects)
+# and encoded in the format the client asks for:
+#   ?format=json (default), ?format=msgpack or ?format=arrow
+# or the matching Accept header.
+
+FORMAT_MIMETYPES = {
+    "json": "application/json",
+    "msgpack": "application/x-msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def score_records(frame, columns, **constants):
+    """
+    JSON-ready score dicts from a results DataFrame
+
+    Args:
+        frame: Results DataFrame
+        columns: Maps frame column -> response key (in output order)
+        constants: Extra keys with the same value on every record (e.g. as_of)
+    """
+    records = frame[list(columns)].rename(columns=columns)
+    for key, value in constants.items():
+        records[key] = value
+    # to_dict('records') already converts numpy scalars to native Python types
+    return records.to_dict("records")
+
+
+def requested_format():
+    """Response format asked for by the current request"""
+    fmt = request.args.get("format", "").lower()
+    if fmt:
+        return fmt
+    accept = request.headers.get("Accept", "")
+    for name, mimetype in FORMAT_MIMETYPES.items():
+        if mimetype in accept:
+            return name
+    return "json"
+
+
+def _encode_json(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload)
+
+
+def _encode_arrow(payload):
+    """Scores as an Arrow IPC stream; the other payload keys go in the schema metadata"""
+    table = pa.Table.from_pylist(payload.get("scores", []))
+    metadata = {key: json.dumps(value) for key, value in payload.items() if key != "scores"}
+    table = table.replace_schema_metadata(metadata)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def available_formats():
+    formats = ["json"]
+    if msgpack is not None:
+        formats.append("msgpack")
+    if pa is not None:
+        formats.append("arrow")
+    return formats
+
+
+def serialize_response(payload, fmt=None):
+    """
+    Encode a bulk response payload ({'scores': [...], ...}) in the requested format
+
+    Unsupported formats, or ones whose library is not installed, get a 406.
+    """
+    fmt = fmt or requested_format()
+    if fmt == "json":
+        body = _encode_json(payload)
+    elif fmt == "msgpack" and msgpack is not None:
+        body = msgpack.packb(payload, use_bin_type=True)
+    elif fmt == "arrow" and pa is not None:
+        body = _encode_arrow(payload)
+    else:
+        return jsonify({'error': f"Unsupported response format '{fmt}'",
+                        'formats': available_formats()}), 406
+    return Response(body, mimetype=FORMAT_MIMETYPES[fmt])
+
@@ -0,0 +1,204 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# ====================================================
+# Prometheus-style Metrics for the Scoring Services
+# ====================================================
+# A small in-process registry rendered in the Prometheus text format on
+# /metrics. Counters and histograms are keyed by label values; everything is
+# process-wide, so FMP calls made from worker threads are counted too. Flask
+# is only imported by instrument_app, so the offline pipeline can record FMP
+# metrics without it.
+#
+# Series:
+#   http_requests_total / http_request_duration_seconds    per Flask route
+#   fmp_requests_total / fmp_request_duration_seconds      per FMP endpoint
+#   fmp_retries_total                                      429/5xx/connection retries
+#   fmp_cache_lookups_total / fmp_cache_hit_ratio          client cache tiers
+#   model_load_seconds / model_predict_seconds             growth, risk and value scoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = [(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+               for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def totals(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.totals().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 2))
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} "
+                         f"{values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {values[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {values[-1]}")
+        return lines
+
+
+class Gauge:
+    """A value computed when the metrics are scraped"""
+
+    def __init__(self, name, documentation, read):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self):
+        value = self.read()
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge",
+                f"{self.name} {value}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled, by route, method and status",
+    ["route", "method", "status"]))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to build each HTTP response, by route and method",
+    ["route", "method"]))
+
+FMP_REQUESTS = registry.register(Counter(
+    "fmp_requests_total", "FMP API calls sent over the network, by endpoint and final status",
+    ["endpoint", "status"]))
+FMP_LATENCY = registry.register(Histogram(
+    "fmp_request_duration_seconds", "FMP API call latency including retries, by endpoint",
+    ["endpoint"]))
+FMP_RETRIES = registry.register(Counter(
+    "fmp_retries_total", "FMP API calls retried, by endpoint and the status that caused the retry",
+    ["endpoint", "status"]))
+FMP_CACHE_LOOKUPS = registry.register(Counter(
+    "fmp_cache_lookups_total", "FMP client lookups by result (memory_hit, disk_hit, coalesced, miss)",
+    ["result"]))
+
+
+def _cache_hit_ratio():
+    totals = FMP_CACHE_LOOKUPS.totals()
+    lookups = sum(totals.values())
+    if not lookups:
+        return None
+    return (lookups - totals.get(("miss",), 0)) / lookups
+
+
+registry.register(Gauge(
+    "fmp_cache_hit_ratio", "Share of FMP client lookups served without a network call", _cache_hit_ratio))
+
+MODEL_LOAD = registry.register(Histogram(
+    "model_load_seconds", "Model artifact load time, by model and format", ["model", "format"]))
+MODEL_PREDICT = registry.register(Histogram(
+    "model_predict_seconds", "Scoring time per predict call (value: the score formula), by model", ["model"]))
+
+
+def fmp_endpoint(path):
+    """Metric label for an FMP path: its first segment (the symbol is dropped)"""
+    return path.split("/", 1)[0]
+
+
+def instrument_app(app):
+    """
+    Record per-route request counts and latency for a Flask app and serve /metrics
+
+    Streaming responses are timed until the response starts, not until the last record is sent.
+    """
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("metrics_start", None)
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        if start is not None:
+            HTTP_LATENCY.observe(time.perf_counter() - start, route=route, method=request.method)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    return app
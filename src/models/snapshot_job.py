@@ -0,0 +1,94 @@
+import sys
+import time
+
+from growth_potential_model_gen import run_scoring_for_tickers
+from risk_model_gen import risk_model_gen
+from risk_training_data import symbols_from_file
+from value_model_math import ValueScoreCalculator
+from scoring_gateway import prefetch_symbols
+from score_snapshot import SNAPSHOT_PATH, write_snapshot
+
+# ====================================================
+# Tradeable Universe Scored by the Batch Job
+# ====================================================
+# Mirrors POPULAR_STOCKS in src/services/rosterApi.ts
+UNIVERSE = [
+    'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'NVDA', 'META', 'NFLX',
+    'AMD', 'INTC', 'CRM', 'ORCL', 'ADBE', 'PYPL', 'UBER', 'SPOT',
+    'JPM', 'BAC', 'WFC', 'GS', 'MS', 'C', 'V', 'MA',
+    'JNJ', 'PFE', 'UNH', 'ABBV', 'MRK', 'TMO', 'DHR', 'ABT',
+    'KO', 'PEP', 'WMT', 'HD', 'MCD', 'NKE', 'SBUX', 'TGT'
+]
+
+
+def score_universe(symbols, model_dir="../model_data"):
+    """Score every symbol with the growth, risk and value models"""
+    # One shared fetch, so each model below reads from the client cache
+    prefetch_symbols(symbols)
+
+    rows = {symbol: {'symbol': symbol} for symbol in symbols}
+
+    growth = run_scoring_for_tickers(symbols)
+    if growth is not None:
+        for symbol, score in zip(growth['Symbol'], growth['predicted_growth_potential']):
+            rows[symbol]['growth_score'] = float(score)
+
+    # A missing or unreadable risk model leaves the risk columns null, like a
+    # model that could not score a symbol, instead of losing the other scores
+    try:
+        scorer = risk_model_gen(model_dir)
+        scorer.load_model()
+        risk = scorer.predict_risk_scores(symbols)
+    except Exception as e:
+        print(f"Error getting risk scores: {e}")
+        risk = None
+    if risk is not None and not risk.empty:
+        for symbol, score, category in zip(risk['symbol'], risk['risk_score'], risk['risk_category']):
+            rows[symbol]['risk_score'] = float(score)
+            rows[symbol]['risk_category'] = category
+
+    value = ValueScoreCalculator().analyze_stocks(symbols)
+    if value is not None:
+        value_columns = {
+            'value_score': 'Value_Score', 'pe_score': 'PE_Score', 'peg_score': 'PEG_Score',
+            'fcf_score': 'FCF_Score', 'roe_score': 'ROE_Score', 'debt_score': 'Debt_Score',
+            'eps_score': 'EPS_Score'
+        }
+        for column, source in value_columns.items():
+            for symbol, score in zip(value['Symbol'], value[source]):
+                rows[symbol][column] = float(score)
+
+    # Keep symbols at least one model could score
+    return [row for row in rows.values() if len(row) > 1]
+
+
+def run_snapshot_job(symbols=UNIVERSE, path=SNAPSHOT_PATH, model_dir="../model_data"):
+    """Score the universe and write it as a new snapshot version"""
+    start = time.time()
+    rows = score_universe(symbols, model_dir)
+    if not rows:
+        print("No scores were computed; snapshot not written.")
+        return None
+    version, as_of = write_snapshot(rows, path)
+    print(f"Scored {len(rows)}/{len(symbols)} symbols in {time.time() - start:.1f}s")
+    return version
+
+
+if __name__ == "__main__":
+    # Usage: python snapshot_job.py [--symbols FILE] [--every HOURS]
+    symbols = UNIVERSE
+    every = None
+    args = sys.argv[1:]
+    if '--symbols' in args:
+        symbols = symbols_from_file(args[args.index('--symbols') + 1])
+    if '--every' in args:
+        every = float(args[args.index('--every') + 1])
+
+    while True:
+        try:
+            run_snapshot_job(symbols)
+        except Exception as e:
+            print(f"Snapshot job failed: {e}")
+        if every is None:
+            break
+        time.sleep(every * 3600)
@@ -0,0 +1,69 @@
+import json
+from flask import Response, request, stream_with_context
+
+# ====================================================
+# Streaming Responses for the Bulk Scoring Endpoints
+# ====================================================
+# Bulk endpoints can emit each symbol's score as soon as it is ready instead of
+# blocking until the whole request finishes. Two wire formats are supported:
+#   ?stream=1 / ?stream=ndjson  -> newline-delimited JSON (application/x-ndjson)
+#   ?stream=sse or Accept: text/event-stream -> server-sent events
+# Either way the stream ends with a single summary record.
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+SSE_MIMETYPE = "text/event-stream"
+
+
+def requested_stream_format():
+    """Streaming format asked for by the current request ('ndjson', 'sse' or None)"""
+    stream = request.args.get("stream", "").lower()
+    if stream == "sse" or (not stream and SSE_MIMETYPE in request.headers.get("Accept", "")):
+        return "sse"
+    if stream in ("1", "true", "ndjson"):
+        return "ndjson"
+    return None
+
+
+def _ndjson_event(record, event):
+    return json.dumps(record) + "\n"
+
+
+def _sse_event(record, event):
+    return f"event: {event}\ndata: {json.dumps(record)}\n\n"
+
+
+def stream_scores(batches, to_records, requested, stream_format="ndjson", ready_records=()):
+    """
+    Stream score records followed by a summary record
+
+    Args:
+        batches: Iterable of result batches (e.g. DataFrames from an iter_*_scores generator)
+        to_records: Turns one batch into a list of JSON-ready score dicts
+        requested: Number of symbols requested, reported in the summary
+        stream_format: 'ndjson' or 'sse'
+        ready_records: Already available score dicts (e.g. from the snapshot), sent first
+    """
+    encode = _sse_event if stream_format == "sse" else _ndjson_event
+    mimetype = SSE_MIMETYPE if stream_format == "sse" else NDJSON_MIMETYPE
+
+    def generate():
+        count = 0
+        try:
+            for record in ready_records:
+                count += 1
+                yield encode(record, "score")
+            for batch in batches:
+                for record in to_records(batch):
+                    count += 1
+                    yield encode(record, "score")
+            summary = {'status': 'success', 'count': count, 'requested': requested}
+        except Exception as e:
+            print(f"Error while streaming scores: {e}")
+            summary = {'status': 'error', 'error': str(e), 'count': count, 'requested': requested}
+        yield encode(summary, "summary")
+
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    # Keep proxies from buffering the stream
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -1,15 +1,17 @@
 import pandas as pd
 import numpy as np
-import requests
-import time
 import warnings
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 warnings.filterwarnings('ignore')
 
-# Import your API key
-from API_KEY import API_KEY
+from fmp_client import get_client
+from streaming import requested_stream_format, stream_scores
+from serialization import score_records, serialize_response
+from score_snapshot import score_snapshot, utc_now, VALUE_KEYS
+from service_metrics import MODEL_PREDICT, instrument_app
 
 class ValueScoreCalculator:
     """
@@ -26,8 +28,7 @@ class ValueScoreCalculator:
     """
     
     def __init__(self):
-        self.api_key = API_KEY
-        self.base_url = "https://financialmodelingprep.com/api/v3"
+        self.fmp = get_client()
         
         # Rebalanced scoring weights to favor quality compounders
         self.weights = {
@@ -62,32 +63,49 @@ class ValueScoreCalculator:
             'poor_eps_growth': -10,     # EPS growth <= -10% gets zero points
         }
     
+    # Every FMP endpoint the value score needs, each fetched exactly once per symbol
+    FETCH_PLAN = {
+        'ratios': 'ratios-ttm/{symbol}',
+        'income': 'income-statement/{symbol}',
+        'cash_flow': 'cash-flow-statement/{symbol}',
+        'profile': 'profile/{symbol}'
+    }
+    
+    def fetch_payloads(self, symbol):
+        """Fetch every endpoint in FETCH_PLAN concurrently"""
+        endpoints = [template.format(symbol=symbol) for template in self.FETCH_PLAN.values()]
+        payloads = self.fmp.prefetch(endpoints, max_workers=len(endpoints))
+        return dict(zip(self.FETCH_PLAN, payloads))
+    
     def fetch_stock_data(self, symbol):
         """Fetch all required financial data for a stock symbol"""
         print(f"Fetching data for {symbol}...")
         
+        try:
+            payloads = self.fetch_payloads(symbol)
+        except Exception as e:
+            print(f"Error fetching data for {symbol}: {e}")
+            return None
+        
+        return self.extract_stock_data(symbol, payloads)
+    
+    def extract_stock_data(self, symbol, payloads):
+        """Build the stock data dict from already-fetched FETCH_PLAN payloads"""
         data = {'symbol': symbol}
         
         try:
-            # Get financial ratios (PE, D/E, ROE)
-            ratios = self._get_financial_ratios(symbol)
-            data.update(ratios)
-            
-            # Get PEG ratio
-            peg = self._get_peg_ratio(symbol)
-            data.update(peg)
+            # Financial ratios (PE, D/E, ROE) and PEG ratio
+            data.update(self._extract_financial_ratios(payloads.get('ratios')))
+            data.update(self._extract_peg_ratio(payloads.get('ratios')))
             
-            # Get EPS growth
-            eps_growth = self._get_eps_growth(symbol)
-            data.update(eps_growth)
+            # EPS growth
+            data.update(self._extract_eps_growth(payloads.get('income')))
             
-            # Get cash flow data for FCF yield
-            fcf_data = self._get_fcf_yield(symbol)
-            data.update(fcf_data)
+            # FCF yield from the cash flow statement and market cap
+            data.update(self._extract_fcf_yield(symbol, payloads.get('cash_flow'), payloads.get('profile')))
             
-            # Get company profile
-            profile = self._get_company_profile(symbol)
-            data.update(profile)
+            # Company profile
+            data.update(self._extract_company_profile(symbol, payloads.get('profile')))
             
         except Exception as e:
             print(f"Error fetching data for {symbol}: {e}")
@@ -95,15 +113,8 @@ class ValueScoreCalculator:
             
         return data
     
-    def _get_financial_ratios(self, symbol):
+    def _extract_financial_ratios(self, data):
         """Get key financial ratios including PE, D/E, ROE"""
-        url = f"{self.base_url}/ratios-ttm/{symbol}?apikey={self.api_key}"
-        response = requests.get(url)
-        
-        if response.status_code != 200:
-            return {}
-            
-        data = response.json()
         if not data:
             return {}
             
@@ -122,15 +133,8 @@ class ValueScoreCalculator:
             'operating_margin': operating_margin_raw * 100 if operating_margin_raw is not None else None
         }
     
-    def _get_peg_ratio(self, symbol):
+    def _extract_peg_ratio(self, data):
         """Get PEG ratio"""
-        url = f"{self.base_url}/ratios-ttm/{symbol}?apikey={self.api_key}"
-        response = requests.get(url)
-        
-        if response.status_code != 200:
-            return {}
-            
-        data = response.json()
         if not data:
             return {}
             
@@ -139,15 +143,11 @@ class ValueScoreCalculator:
             'peg_ratio': self._clean_numeric(ratios.get('pegRatioTTM'))
         }
     
-    def _get_eps_growth(self, symbol):
+    def _extract_eps_growth(self, data):
         """Calculate EPS growth from income statements"""
-        url = f"{self.base_url}/income-statement/{symbol}?limit=3&apikey={self.api_key}"
-        response = requests.get(url)
-        
-        if response.status_code != 200:
+        if data is None:
             return {'eps_growth': None}
             
-        data = response.json()
         if len(data) < 2:
             return {'eps_growth': None}
         
@@ -164,23 +164,9 @@ class ValueScoreCalculator:
             
         return {'eps_growth': None}
     
-    def _get_fcf_yield(self, symbol):
+    def _extract_fcf_yield(self, symbol, cf_data, profile_data):
         """Calculate Free Cash Flow Yield (FCF / Market Cap)"""
         try:
-            # Get cash flow statement
-            cf_url = f"{self.base_url}/cash-flow-statement/{symbol}?limit=1&apikey={self.api_key}"
-            cf_response = requests.get(cf_url)
-            
-            # Get company profile for market cap
-            profile_url = f"{self.base_url}/profile/{symbol}?apikey={self.api_key}"
-            profile_response = requests.get(profile_url)
-            
-            if cf_response.status_code != 200 or profile_response.status_code != 200:
-                return {'fcf_yield': None}
-            
-            cf_data = cf_response.json()
-            profile_data = profile_response.json()
-            
             if not cf_data or not profile_data:
                 return {'fcf_yield': None}
             
@@ -197,15 +183,8 @@ class ValueScoreCalculator:
         
         return {'fcf_yield': None}
     
-    def _get_company_profile(self, symbol):
+    def _extract_company_profile(self, symbol, data):
         """Get company profile for context"""
-        url = f"{self.base_url}/profile/{symbol}?apikey={self.api_key}"
-        response = requests.get(url)
-        
-        if response.status_code != 200:
-            return {}
-            
-        data = response.json()
         if not data:
             return {}
             
@@ -381,9 +360,106 @@ class ValueScoreCalculator:
             'eps_score': eps_score
         }
     
+    # Input columns used by the batch scorer, in scoring order
+    SCORE_INPUTS = ['pe_ratio', 'peg_ratio', 'fcf_yield', 'roe', 'debt_equity', 'eps_growth']
+    
+    @staticmethod
+    def _interp_lower_better(values, excellent, poor):
+        """Vectorized linear interpolation, 100 at excellent down to 0 at poor"""
+        return np.clip(100 - ((values - excellent) / (poor - excellent)) * 100, 0, 100)
+    
+    @staticmethod
+    def _interp_higher_better(values, poor, excellent):
+        """Vectorized linear interpolation, 0 at poor up to 100 at excellent"""
+        return np.clip(((values - poor) / (excellent - poor)) * 100, 0, 100)
+    
+    def calculate_value_scores(self, stock_data):
+        """
+        Batch version of calculate_value_score for many stocks at once.
+        
+        Every sub-score and the composite are computed in one vectorized pass
+        with the same branch order and arithmetic as the scalar _score_* methods,
+        so the results match them exactly.
+        
+        Args:
+            stock_data: DataFrame (or dict of arrays) with pe_ratio, peg_ratio,
+                        fcf_yield, roe, debt_equity and eps_growth; NaN/None = missing
+        
+        Returns:
+            DataFrame with composite_score and the six sub-scores, one row per stock
+        """
+        frame = pd.DataFrame(stock_data).reindex(columns=self.SCORE_INPUTS)
+        inputs = {col: pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=float)
+                  for col in self.SCORE_INPUTS}
+        b = self.benchmarks
+        
+        with np.errstate(invalid='ignore'):
+            pe = inputs['pe_ratio']
+            pe_score = np.select(
+                [np.isnan(pe) | (pe <= 0) | (pe > 300), pe <= b['excellent_pe'], pe >= b['poor_pe']],
+                [0, 100, 0],
+                self._interp_lower_better(pe, b['excellent_pe'], b['poor_pe'])
+            )
+            
+            peg = inputs['peg_ratio']
+            peg_score = np.select(
+                [np.isnan(peg), peg < 0, peg > 50, peg <= b['excellent_peg'], peg >= b['poor_peg']],
+                [50, 20, 0, 100, 0],
+                self._interp_lower_better(peg, b['excellent_peg'], b['poor_peg'])
+            )
+            
+            fcf = inputs['fcf_yield']
+            fcf_score = np.select(
+                [np.isnan(fcf), fcf < 0, fcf >= b['excellent_fcf_yield'], fcf <= b['poor_fcf_yield']],
+                [50, 10, 100, 0],
+                self._interp_higher_better(fcf, b['poor_fcf_yield'], b['excellent_fcf_yield'])
+            )
+            
+            roe = inputs['roe']
+            roe_score = np.select(
+                [np.isnan(roe), roe < 0, roe >= b['excellent_roe'], roe <= b['poor_roe']],
+                [50, 5, 100, 0],
+                self._interp_higher_better(roe, b['poor_roe'], b['excellent_roe'])
+            )
+            
+            debt = inputs['debt_equity']
+            debt_score = np.select(
+                [np.isnan(debt), debt < 0, debt <= b['excellent_debt'], debt >= b['poor_debt']],
+                [50, 100, 100, 0],
+                self._interp_lower_better(debt, b['excellent_debt'], b['poor_debt'])
+            )
+            
+            # Cap extreme values to prevent anomalies
+            eps = np.clip(inputs['eps_growth'], -100, 100)
+            eps_score = np.select(
+                [np.isnan(eps), eps >= b['excellent_eps_growth'], eps <= b['poor_eps_growth']],
+                [50, 100, 0],
+                self._interp_higher_better(eps, b['poor_eps_growth'], b['excellent_eps_growth'])
+            )
+        
+        # Calculate weighted composite score (same summation order as the scalar path)
+        composite_score = (
+            pe_score * self.weights['pe_ratio'] +
+            peg_score * self.weights['peg_ratio'] +
+            fcf_score * self.weights['fcf_yield'] +
+            roe_score * self.weights['roe_quality'] +
+            debt_score * self.weights['debt_equity'] +
+            eps_score * self.weights['eps_growth']
+        )
+        
+        return pd.DataFrame({
+            'composite_score': np.clip(composite_score, 1, 100),
+            'pe_score': pe_score,
+            'peg_score': peg_score,
+            'fcf_score': fcf_score,
+            'roe_score': roe_score,
+            'debt_score': debt_score,
+            'eps_score': eps_score
+        }, index=frame.index)
+    
     def analyze_stocks(self, symbols):
         """Analyze a list of stock symbols and return balanced scores"""
-        results = []
+        stock_rows = []
         
         for i, symbol in enumerate(symbols):
             print(f"Progress: {i+1}/{len(symbols)} - Analyzing {symbol}")
@@ -396,46 +472,67 @@ class ValueScoreCalculator:
                     print(f"  Warning: Could not fetch data for {symbol}")
                     continue
                 
-                # Calculate value score
-                scores = self.calculate_value_score(stock_data)
-                
-                # Compile results
-                result = {
-                    'Symbol': symbol,
-                    'Company': stock_data.get('company_name', symbol),
-                    'Value_Score': round(scores['composite_score'], 1),
-                    'PE_Ratio': stock_data.get('pe_ratio'),
-                    'PEG_Ratio': stock_data.get('peg_ratio'),
-                    'FCF_Yield': stock_data.get('fcf_yield'),
-                    'ROE': stock_data.get('roe'),
-                    'Debt_Equity': stock_data.get('debt_equity'),
-                    'EPS_Growth': round(stock_data.get('eps_growth'), 1) if stock_data.get('eps_growth') else None,
-                    'EPS_Growth_Raw': stock_data.get('eps_growth'),
-                    'Sector': stock_data.get('sector'),
-                    'Market_Cap': stock_data.get('market_cap'),
-                    'Price': stock_data.get('price'),
-                    'PE_Score': round(scores['pe_score'], 1),
-                    'PEG_Score': round(scores['peg_score'], 1),
-                    'FCF_Score': round(scores['fcf_score'], 1),
-                    'ROE_Score': round(scores['roe_score'], 1),
-                    'Debt_Score': round(scores['debt_score'], 1),
-                    'EPS_Score': round(scores['eps_score'], 1)
-                }
-                
-                results.append(result)
-                
-                # Rate limiting
-                time.sleep(0.25)
+                stock_rows.append(stock_data)
                 
             except Exception as e:
                 print(f"Error analyzing {symbol}: {e}")
                 continue
         
-        if results:
-            df = pd.DataFrame(results)
-            return df.sort_values('Value_Score', ascending=False)
-        else:
+        if not stock_rows:
             return None
+        
+        return self._score_stock_rows(stock_rows).sort_values('Value_Score', ascending=False)
+    
+    def iter_value_scores(self, symbols, batch_size=8, max_workers=8):
+        """Yield value scores in micro-batches as symbols' data arrives"""
+        batch = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.fetch_stock_data, symbol) for symbol in symbols]
+            for future in as_completed(futures):
+                stock_data = future.result()
+                if stock_data is None:
+                    continue
+                batch.append(stock_data)
+                if len(batch) >= batch_size:
+                    yield self._score_stock_rows(batch)
+                    batch = []
+        if batch:
+            yield self._score_stock_rows(batch)
+    
+    def _score_stock_rows(self, stock_rows):
+        """Score fetched stock data dicts in one vectorized pass"""
+        stocks = pd.DataFrame(stock_rows).reindex(
+            columns=['symbol', 'company_name', 'sector', 'market_cap', 'price'] + self.SCORE_INPUTS
+        )
+        with MODEL_PREDICT.time(model="value"):
+            scores = self.calculate_value_scores(stocks)
+        
+        def round_1(values):
+            # Python's round() keeps results identical to the per-stock path
+            return [round(v, 1) for v in values]
+        
+        df = pd.DataFrame({
+            'Symbol': stocks['symbol'],
+            'Company': stocks['company_name'].fillna(stocks['symbol']),
+            'Value_Score': round_1(scores['composite_score']),
+            'PE_Ratio': stocks['pe_ratio'],
+            'PEG_Ratio': stocks['peg_ratio'],
+            'FCF_Yield': stocks['fcf_yield'],
+            'ROE': stocks['roe'],
+            'Debt_Equity': stocks['debt_equity'],
+            'EPS_Growth': [round(v, 1) if pd.notna(v) and v else None for v in stocks['eps_growth']],
+            'EPS_Growth_Raw': stocks['eps_growth'],
+            'Sector': stocks['sector'],
+            'Market_Cap': stocks['market_cap'],
+            'Price': stocks['price'],
+            'PE_Score': round_1(scores['pe_score']),
+            'PEG_Score': round_1(scores['peg_score']),
+            'FCF_Score': round_1(scores['fcf_score']),
+            'ROE_Score': round_1(scores['roe_score']),
+            'Debt_Score': round_1(scores['debt_score']),
+            'EPS_Score': round_1(scores['eps_score'])
+        })
+        return df
     
     def print_analysis_summary(self, results_df):
         """Print a formatted summary of the balanced analysis"""
@@ -455,7 +552,7 @@ class ValueScoreCalculator:
         print(f"\n{'Symbol':<8} {'Score':<6} {'PE':<6} {'PEG':<6} {'FCF%':<6} {'ROE%':<6} {'D/E':<6} {'EPS%':<6} {'Sector':<20} {'Company':<25}")
         print("-" * 130)
         
-        for _, row in results_df.iterrows():
+        for row in results_df.to_dict('records'):
             pe = f"{row['PE_Ratio']:.1f}" if row['PE_Ratio'] else "N/A"
             peg = f"{row['PEG_Ratio']:.1f}" if row['PEG_Ratio'] else "N/A"
             fcf = f"{row['FCF_Yield']:.1f}" if row['FCF_Yield'] else "N/A"
@@ -481,7 +578,7 @@ class ValueScoreCalculator:
         # Top picks
         print(f"\nTOP 5 INVESTMENT OPPORTUNITIES:")
         print("-" * 50)
-        for i, (_, row) in enumerate(results_df.head(5).iterrows()):
+        for i, row in enumerate(results_df.head(5).to_dict('records')):
             print(f"{i+1}. {row['Symbol']} - Score: {row['Value_Score']:.1f} ({row['Sector']})")
         
         # Investment categories
@@ -558,11 +655,16 @@ def main():
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+instrument_app(app)  # Per-route request metrics and /metrics
 
 @app.route('/api/value/<symbol>')
 def get_value_score(symbol):
-    """Get value score for a single stock symbol"""
+    """Get value score for a single stock symbol (from the snapshot when available)"""
     try:
+        snapshot = score_snapshot.lookup(symbol, VALUE_KEYS)
+        if snapshot is not None:
+            return jsonify(dict(snapshot, source='snapshot', status='success'))
+        
         print(f"Getting value score for {symbol}...")
         calculator = ValueScoreCalculator()
         stock_data = calculator.fetch_stock_data(symbol)
@@ -578,6 +680,8 @@ def get_value_score(symbol):
                 'roeScore': float(scores['roe_score']),
                 'debtScore': float(scores['debt_score']),
                 'epsScore': float(scores['eps_score']),
+                'as_of': utc_now(),
+                'source': 'live',
                 'status': 'success'
             })
         else:
@@ -586,33 +690,49 @@ def get_value_score(symbol):
         print(f"Error getting value score for {symbol}: {e}")
         return jsonify({'error': str(e)}), 500
 
+def _value_score_records(results):
+    return score_records(results, {
+        'Symbol': 'symbol',
+        'Value_Score': 'valueScore',
+        'PE_Score': 'peScore',
+        'PEG_Score': 'pegScore',
+        'FCF_Score': 'fcfScore',
+        'ROE_Score': 'roeScore',
+        'Debt_Score': 'debtScore',
+        'EPS_Score': 'epsScore'
+    }, as_of=utc_now())
+
 @app.route('/api/value/bulk', methods=['POST'])
 def get_bulk_value_scores():
-    """Get value scores for multiple stock symbols"""
+    """
+    Get value scores for multiple stock symbols
+    
+    Symbols in the score snapshot are served from memory; only the rest are
+    scored live. With ?stream=ndjson (or ?stream=sse) scores are sent as they
+    are computed, followed by a final summary record. ?format=msgpack|arrow
+    selects a binary encoding for the non-streaming response.
+    """
     try:
         data = request.get_json()
         symbols = data.get('symbols', [])
         if not symbols:
             return jsonify({'error': 'No symbols provided'}), 400
         
-        print(f"Getting value scores for {len(symbols)} symbols...")
+        scores, missing = score_snapshot.partition(symbols, VALUE_KEYS)
+        print(f"Getting value scores for {len(symbols)} symbols ({len(missing)} live)...")
         calculator = ValueScoreCalculator()
-        results = calculator.analyze_stocks(symbols)
-        
-        if results is not None and not results.empty:
-            scores = []
-            for _, row in results.iterrows():
-                scores.append({
-                    'symbol': row['Symbol'],
-                    'valueScore': float(row['Value_Score']),
-                    'peScore': float(row['PE_Score']),
-                    'pegScore': float(row['PEG_Score']),
-                    'fcfScore': float(row['FCF_Score']),
-                    'roeScore': float(row['ROE_Score']),
-                    'debtScore': float(row['Debt_Score']),
-                    'epsScore': float(row['EPS_Score'])
-                })
-            return jsonify({'scores': scores, 'status': 'success'})
+        stream_format = requested_stream_format()
+        if stream_format:
+            return stream_scores(calculator.iter_value_scores(missing), _value_score_records, len(symbols),
+                                 stream_format, ready_records=scores)
+        
+        if missing:
+            results = calculator.analyze_stocks(missing)
+            if results is not None and not results.empty:
+                scores += _value_score_records(results)
+        
+        if scores:
+            return serialize_response({'scores': scores, 'status': 'success'})
         else:
             return jsonify({'error': 'No data found'}), 404
     except Exception as e:
@@ -622,7 +742,7 @@ def get_bulk_value_scores():
 @app.route('/api/value/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'value_model'})
+    return jsonify({'status': 'healthy', 'service': 'value_model', 'snapshot': score_snapshot.status()})
 
 if __name__ == "__main__":
     # Check if running as web server or training script
@@ -2,8 +2,7 @@ import { supabase } from '@/integrations/supabase/client';
 
 // ML Model API endpoints
 const GROWTH_API_URL = 'http://localhost:5001';
-const RISK_API_URL = 'http://localhost:5002';
-const VALUE_API_URL = 'http://localhost:5003';
+const SCORES_API_URL = 'http://localhost:5004';
 
 // Popular stocks to populate
 const POPULAR_STOCKS = [
@@ -14,110 +13,154 @@ const POPULAR_STOCKS = [
   'KO', 'PEP', 'WMT', 'HD', 'MCD', 'NKE', 'SBUX', 'TGT'
 ];
 
+// Most symbols per batched profile/quote proxy request
+const STOCK_DATA_BATCH_SIZE = 100;
+
+type StockData = {
+  symbol: string;
+  company: string;
+  sector: string;
+  price: number;
+  marketCap: number;
+  volume: number;
+  change: number;
+  changePercent: number;
+  lastUpdated: string;
+};
+
 /**
- * Fetch stock data from Financial Modeling Prep API
+ * Build stock data from an FMP profile and quote
  */
-async function fetchStockData(symbol: string) {
-  try {
-    console.log(`📊 Fetching ${symbol} data from Financial Modeling Prep API...`);
-    
-    // Use proxy endpoints to avoid CORS issues
-    const [profileResponse, quoteResponse] = await Promise.all([
-      fetch(`${GROWTH_API_URL}/api/fmp/profile/${symbol}`),
-      fetch(`${GROWTH_API_URL}/api/fmp/quote/${symbol}`)
-    ]);
+function toStockData(symbol: string, profile: any, quote: any): StockData {
+  return {
+    symbol: symbol.toUpperCase(),
+    company: profile.companyName || profile.name || 'Unknown Company',
+    sector: profile.sector || 'Unknown',
+    price: quote.price || 0,
+    marketCap: quote.marketCap || 0,
+    volume: quote.volume || 0,
+    change: quote.change || 0,
+    changePercent: quote.changesPercentage || 0,
+    lastUpdated: new Date().toISOString()
+  };
+}
 
-    // Check if API calls were successful
-    if (!profileResponse.ok || !quoteResponse.ok) {
-      console.log(`⚠️ API calls failed (${profileResponse.status}, ${quoteResponse.status}), using mock data for ${symbol}`);
-      throw new Error('API calls failed');
+/**
+ * Mock stock data for when the API has nothing for a symbol
+ */
+function mockStockData(symbol: string): StockData {
+  // Return mock data for AAPL
+  const mockData = {
+    'AAPL': {
+      symbol: 'AAPL',
+      company: 'Apple Inc.',
+      sector: 'Technology',
+      price: 175.43,
+      marketCap: 2800000000000,
+      volume: 45000000,
+      change: 2.3,
+      changePercent: 1.33,
+      lastUpdated: new Date().toISOString()
     }
+  };
+  
+  return mockData[symbol.toUpperCase()] || {
+    symbol: symbol.toUpperCase(),
+    company: `${symbol.toUpperCase()} Company`,
+    sector: 'Technology',
+    price: 100,
+    marketCap: 1000000000,
+    volume: 1000000,
+    change: 1.0,
+    changePercent: 1.0,
+    lastUpdated: new Date().toISOString()
+  };
+}
 
-    const [profileData, quoteData] = await Promise.all([
-      profileResponse.json(),
-      quoteResponse.json()
-    ]);
+/**
+ * Fetch stock data for many symbols from Financial Modeling Prep API
+ *
+ * The proxy takes comma-separated symbols, so each batch costs one profile
+ * and one quote request instead of two per stock.
+ */
+async function fetchStockDataBatch(symbols: string[]): Promise<Map<string, StockData>> {
+  const stocks = new Map<string, StockData>();
 
-    if (!profileData || profileData.length === 0 || !quoteData || quoteData.length === 0) {
-      console.log(`⚠️ API returned empty data for ${symbol}, using mock data`);
-      throw new Error(`No data found for ${symbol}`);
-    }
+  for (let i = 0; i < symbols.length; i += STOCK_DATA_BATCH_SIZE) {
+    const batch = symbols.slice(i, i + STOCK_DATA_BATCH_SIZE);
+    const symbolList = batch.map(symbol => encodeURIComponent(symbol)).join(',');
+    try {
+      console.log(`📊 Fetching ${batch.join(', ')} data from Financial Modeling Prep API...`);
+      
+      // Use proxy endpoints to avoid CORS issues
+      const [profileResponse, quoteResponse] = await Promise.all([
+        fetch(`${GROWTH_API_URL}/api/fmp/profile/${symbolList}`),
+        fetch(`${GROWTH_API_URL}/api/fmp/quote/${symbolList}`)
+      ]);
 
-    const profile = profileData[0];
-    const quote = quoteData[0];
+      // Check if API calls were successful
+      if (!profileResponse.ok || !quoteResponse.ok) {
+        console.log(`⚠️ API calls failed (${profileResponse.status}, ${quoteResponse.status}), using mock data`);
+        throw new Error('API calls failed');
+      }
 
-    console.log('✅ Real API data fetched successfully');
-    return {
-      symbol: symbol.toUpperCase(),
-      company: profile.companyName || profile.name || 'Unknown Company',
-      sector: profile.sector || 'Unknown',
-      price: quote.price || 0,
-      marketCap: quote.marketCap || 0,
-      volume: quote.volume || 0,
-      change: quote.change || 0,
-      changePercent: quote.changesPercentage || 0,
-      lastUpdated: new Date().toISOString()
-    };
-  } catch (error) {
-    console.log(`⚠️ Using mock data for ${symbol} due to API error:`, error);
-    
-    // Return mock data for AAPL
-    const mockData = {
-      'AAPL': {
-        symbol: 'AAPL',
-        company: 'Apple Inc.',
-        sector: 'Technology',
-        price: 175.43,
-        marketCap: 2800000000000,
-        volume: 45000000,
-        change: 2.3,
-        changePercent: 1.33,
-        lastUpdated: new Date().toISOString()
+      const [profileData, quoteData] = await Promise.all([
+        profileResponse.json(),
+        quoteResponse.json()
+      ]);
+
+      const profiles = new Map<string, any>((profileData || []).map((profile: any) => [profile.symbol?.toUpperCase(), profile]));
+      const quotes = new Map<string, any>((quoteData || []).map((quote: any) => [quote.symbol?.toUpperCase(), quote]));
+      for (const symbol of batch) {
+        const profile = profiles.get(symbol.toUpperCase());
+        const quote = quotes.get(symbol.toUpperCase());
+        if (profile && quote) {
+          stocks.set(symbol.toUpperCase(), toStockData(symbol, profile, quote));
+        }
       }
-    };
-    
-    return mockData[symbol.toUpperCase()] || {
-      symbol: symbol.toUpperCase(),
-      company: `${symbol.toUpperCase()} Company`,
-      sector: 'Technology',
-      price: 100,
-      marketCap: 1000000000,
-      volume: 1000000,
-      change: 1.0,
-      changePercent: 1.0,
-      lastUpdated: new Date().toISOString()
-    };
+      console.log(`✅ Real API data fetched for ${stocks.size} stocks`);
+    } catch (error) {
+      console.log(`⚠️ Using mock data for ${batch.join(', ')} due to API error:`, error);
+    }
   }
+
+  for (const symbol of symbols) {
+    if (!stocks.has(symbol.toUpperCase())) {
+      console.log(`⚠️ API returned no data for ${symbol}, using mock data`);
+      stocks.set(symbol.toUpperCase(), mockStockData(symbol));
+    }
+  }
+  return stocks;
+}
+
+/**
+ * Fetch stock data from Financial Modeling Prep API
+ */
+async function fetchStockData(symbol: string): Promise<StockData> {
+  const stocks = await fetchStockDataBatch([symbol]);
+  return stocks.get(symbol.toUpperCase())!;
 }
 
 /**
- * Get ML scores from Flask servers
+ * Get ML scores from the scoring gateway
  */
 async function getMLScores(symbol: string) {
   try {
     console.log(`🤖 Getting ML scores for ${symbol}...`);
     
-    const [growthResponse, riskResponse, valueResponse] = await Promise.all([
-      fetch(`${GROWTH_API_URL}/api/growth/${symbol}`),
-      fetch(`${RISK_API_URL}/api/risk/${symbol}`),
-      fetch(`${VALUE_API_URL}/api/value/${symbol}`)
-    ]);
+    // One round trip: the scoring gateway fetches shared FMP data once for all three models
+    const response = await fetch(`${SCORES_API_URL}/api/scores/${symbol}`);
+    const scores = await response.json();
 
-    const [growthData, riskData, valueData] = await Promise.all([
-      growthResponse.json(),
-      riskResponse.json(),
-      valueResponse.json()
-    ]);
-
-    if (growthData.error || riskData.error || valueData.error) {
-      throw new Error(`ML API error: ${growthData.error || riskData.error || valueData.error}`);
+    if (scores.error) {
+      throw new Error(`ML API error: ${scores.error}`);
     }
 
     return {
-      growthScore: growthData.growthScore || 50,
-      riskScore: riskData.riskScore || 50,
-      valueScore: valueData.valueScore || 50,
-      riskCategory: riskData.riskCategory || 'Medium Risk'
+      growthScore: scores.growthScore || 50,
+      riskScore: scores.riskScore || 50,
+      valueScore: scores.valueScore || 50,
+      riskCategory: scores.riskCategory || 'Medium Risk'
     };
   } catch (error) {
     console.error(`❌ Error getting ML scores for ${symbol}:`, error);
@@ -159,13 +202,13 @@ async function storeStockData(stockData: any) {
 /**
  * Main function to process a stock symbol
  */
-export async function processStock(symbol: string) {
+export async function processStock(symbol: string, prefetchedData?: StockData) {
   try {
     console.log(`\n🚀 Processing ${symbol}...`);
     console.log('='.repeat(50));
     
-    // Step 1: Fetch stock data from API
-    const stockData = await fetchStockData(symbol);
+    // Step 1: Fetch stock data from API (unless it came with a batch)
+    const stockData = prefetchedData ?? await fetchStockData(symbol);
     console.log('✅ Stock data fetched:', {
       symbol: stockData.symbol,
       company: stockData.company,
@@ -173,7 +216,7 @@ export async function processStock(symbol: string) {
       price: stockData.price
     });
     
-    // Step 2: Get ML scores from Flask servers
+    // Step 2: Get ML scores from the scoring gateway
     const mlScores = await getMLScores(symbol);
     console.log('✅ ML scores received:', mlScores);
     
@@ -242,6 +285,9 @@ export async function populateStocksDatabase(stockSymbols: string[] = POPULAR_ST
     total: stockSymbols.length
   };
   
+  // Profiles and quotes for every stock up front, in a few batched requests
+  const stockData = await fetchStockDataBatch(stockSymbols);
+  
   // Process stocks in batches to avoid overwhelming the APIs
   for (let i = 0; i < stockSymbols.length; i += batchSize) {
     const batch = stockSymbols.slice(i, i + batchSize);
@@ -249,7 +295,7 @@ export async function populateStocksDatabase(stockSymbols: string[] = POPULAR_ST
     
     const batchPromises = batch.map(async (symbol) => {
       try {
-        await processStock(symbol);
+        await processStock(symbol, stockData.get(symbol.toUpperCase()));
         results.successful.push(symbol);
         return { symbol, success: true };
       } catch (error) {
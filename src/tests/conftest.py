@@ -0,0 +1,81 @@
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+# The services import each other as top-level modules from src/models;
+# the feature collection scripts do the same from src/data_collection
+MODELS_DIR = Path(__file__).resolve().parent.parent / "models"
+DATA_COLLECTION_DIR = Path(__file__).resolve().parent.parent / "data_collection"
+sys.path.insert(0, str(MODELS_DIR))
+sys.path.insert(1, str(DATA_COLLECTION_DIR))
+
+import fmp_client as fmp_client_module  # noqa: E402
+from fmp_client import FMPClient  # noqa: E402
+
+
+class FakeFMPSession:
+    """
+    Stands in for the client's pooled session: answers from a handler and
+    records every request sent
+
+    Args:
+        handler: handler(path, params) -> JSON payload (None answers 404)
+        delay: Seconds each request takes, so concurrent callers overlap
+    """
+
+    def __init__(self, handler, delay=0.0):
+        self.handler = handler
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        path = url.split("/api/v3/", 1)[1]
+        params = {k: v for k, v in (params or {}).items() if k != "apikey"}
+        with self._lock:
+            self.calls.append((path, params))
+        time.sleep(self.delay)
+        data = self.handler(path, params)
+        response = requests.Response()
+        response.status_code = 200 if data is not None else 404
+        response._content = json.dumps(data).encode("utf-8")
+        return response
+
+
+def symbol_payloads(path, params):
+    """Per-symbol quote/profile items, answering FMP's comma-separated form too"""
+    endpoint, _, symbols = path.partition("/")
+    if endpoint in ("quote", "profile"):
+        return [{"symbol": symbol, "price": float(len(symbol))} for symbol in symbols.split(",")
+                if not symbol.startswith("UNKNOWN")]
+    if endpoint == "stock-screener":
+        return [{"symbol": "PEER1"}, {"symbol": "PEER2"}]
+    return {"path": path, "params": params}
+
+
+@pytest.fixture
+def fmp_client():
+    """An FMPClient with no rate limit whose network calls go to a FakeFMPSession"""
+    def make(handler=symbol_payloads, delay=0.0, **kwargs):
+        client = FMPClient(api_key="test", base_url="http://fmp.test/api/v3", calls_per_minute=None,
+                           **kwargs)
+        client.session = FakeFMPSession(handler, delay)
+        return client
+    return make
+
+
+@pytest.fixture
+def shared_fmp_client(fmp_client):
+    """Installs a fake-backed client as the process-wide client used by fmp_get"""
+    previous = fmp_client_module._client
+    def make(handler=symbol_payloads, delay=0.0, **kwargs):
+        client = fmp_client(handler, delay, **kwargs)
+        fmp_client_module.set_client(client)
+        return client
+    yield make
+    fmp_client_module.set_client(previous)
@@ -0,0 +1,146 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+joblib = pytest.importorskip("joblib")
+
+from sklearn.compose import ColumnTransformer  # noqa: E402
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor  # noqa: E402
+from sklearn.linear_model import Ridge  # noqa: E402
+from sklearn.pipeline import Pipeline  # noqa: E402
+from sklearn.preprocessing import MinMaxScaler, RobustScaler  # noqa: E402
+
+from compact_model import artifact_mtime, compact_path, export_compact, is_current, load_compact  # noqa: E402
+from model_registry import ModelRegistry  # noqa: E402
+
+MODEL_DATA_DIR = Path(__file__).resolve().parent.parent / "model_data"
+
+FEATURES = ['price_volatility_3m', 'beta', 'debt_to_equity', 'current_ratio', 'max_drawdown_1y']
+
+
+def _build_pipeline(feature_columns, model):
+    """Same shape as risk_training._build_pipeline, without importing the training module"""
+    preprocessor = ColumnTransformer(transformers=[('scaler', RobustScaler(), feature_columns)])
+    return Pipeline([('preprocessor', preprocessor), ('regressor', model)])
+
+
+def _training_data(n=400, seed=0, missing=False):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, len(FEATURES))) * [20, 0.5, 1, 1, 10] + [30, 1, 1, 1.5, 25],
+                     columns=FEATURES)
+    y = 2 * X['price_volatility_3m'] + 10 * X['beta'] - 3 * X['current_ratio'] + rng.normal(size=n)
+    if missing:
+        X = X.mask(rng.random(X.shape) < 0.05)
+    return X, y
+
+
+def _estimators():
+    """(estimator, train with missing values) for every estimator kind the export supports"""
+    estimators = [
+        pytest.param(RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0), False, id="random_forest"),
+        pytest.param(HistGradientBoostingRegressor(max_iter=50, random_state=0), True, id="hist_gradient_boosting"),
+        pytest.param(Ridge(alpha=1.0), False, id="ridge"),
+    ]
+    try:
+        import xgboost as xgb
+    except ImportError:
+        return estimators
+    return estimators + [pytest.param(xgb.XGBRegressor(n_estimators=50, max_depth=4, random_state=0), True,
+                                      id="xgboost")]
+
+
+@pytest.mark.parametrize("estimator,missing", _estimators())
+def test_compact_predictions_match_the_pipeline(tmp_path, estimator, missing):
+    X, y = _training_data(missing=missing)
+    pipeline = _build_pipeline(FEATURES, estimator).fit(X, y)
+    export_compact(pipeline, tmp_path / "model.compact", metadata={'feature_columns': FEATURES})
+
+    compact = load_compact(tmp_path / "model.compact")
+    X_new, _ = _training_data(n=200, seed=1, missing=missing)
+    # Column order comes from the manifest, not the caller
+    shuffled = X_new[FEATURES[::-1]]
+    np.testing.assert_allclose(compact.predict(shuffled), pipeline.predict(X_new), rtol=1e-6, atol=1e-4)
+    assert compact.metadata['feature_columns'] == FEATURES
+
+
+@pytest.mark.parametrize("pickle_name", ["risk_model.pkl", "growth_potential_model.pkl"])
+def test_saved_models_export_with_matching_predictions(tmp_path, pickle_name):
+    pickle_path = MODEL_DATA_DIR / pickle_name
+    if not pickle_path.exists():
+        pytest.skip(f"{pickle_name} is not checked out")
+    saved = joblib.load(pickle_path)
+    model = saved['model']
+    export_compact(model, tmp_path / "model.compact", scalers=saved.get('scalers'))
+    compact = load_compact(tmp_path / "model.compact")
+
+    columns = saved.get('feature_columns') or list(model.feature_names_in_)
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(500, len(columns))) * 50, columns=columns)
+    np.testing.assert_allclose(compact.predict(X), model.predict(X), rtol=1e-6, atol=1e-4)
+
+
+def test_minmax_scalers_match_sklearn(tmp_path):
+    X, y = _training_data()
+    scalers = {feature: MinMaxScaler().fit(X[[feature]].to_numpy()) for feature in FEATURES}
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y)
+    export_compact(model, tmp_path / "growth.compact", scalers=scalers)
+
+    compact = load_compact(tmp_path / "growth.compact")
+    values = X[['beta']].to_numpy()
+    np.testing.assert_allclose(compact.scalers['beta'].transform(values), scalers['beta'].transform(values))
+
+
+def test_export_is_current_until_the_pickle_changes(tmp_path):
+    X, y = _training_data()
+    pickle_path = tmp_path / "risk_model.pkl"
+    model = _build_pipeline(FEATURES, Ridge()).fit(X, y)
+    joblib.dump({'model': model}, pickle_path)
+    export_compact(model, compact_path(pickle_path), source=pickle_path)
+    assert is_current(pickle_path)
+
+    joblib.dump({'model': _build_pipeline(FEATURES, Ridge(alpha=5.0)).fit(X, y)}, pickle_path)
+    assert not is_current(pickle_path)
+
+
+def test_registry_loads_a_compact_only_deploy(tmp_path):
+    X, y = _training_data()
+    pickle_path = tmp_path / "risk_model.pkl"
+    export_compact(_build_pipeline(FEATURES, Ridge()).fit(X, y), compact_path(pickle_path))
+    assert not pickle_path.exists()
+    assert is_current(pickle_path)
+    manifest_mtime = os.stat(compact_path(pickle_path) / "manifest.json").st_mtime_ns
+    assert artifact_mtime(pickle_path) == (None, manifest_mtime)
+
+    registry = ModelRegistry()
+    model = registry.get(pickle_path, loader=lambda path: load_compact(compact_path(path)))
+    assert registry.get(pickle_path, loader=None) is model
+    assert model.predict(X).shape == (len(X),)
+
+
+def test_registry_switches_to_a_compact_export_made_after_loading(tmp_path):
+    X, y = _training_data()
+    pickle_path = tmp_path / "risk_model.pkl"
+    model = _build_pipeline(FEATURES, Ridge()).fit(X, y)
+    joblib.dump({'model': model}, pickle_path)
+
+    def load(path):
+        return load_compact(compact_path(path)) if is_current(path) else joblib.load(path)['model']
+
+    registry = ModelRegistry()
+    assert isinstance(registry.get(pickle_path, loader=load), Pipeline)
+
+    # Exported after the pickle was loaded; the pickle itself is unchanged
+    export_compact(model, compact_path(pickle_path), source=pickle_path)
+    compact = registry.get(pickle_path, loader=load)
+    assert not isinstance(compact, Pipeline)
+    np.testing.assert_allclose(compact.predict(X), model.predict(X), rtol=1e-6, atol=1e-4)
+
+
+def test_registry_raises_without_any_artifact(tmp_path):
+    assert artifact_mtime(tmp_path / "missing.pkl") is None
+    with pytest.raises(FileNotFoundError):
+        ModelRegistry().get(tmp_path / "missing.pkl", loader=load_compact)
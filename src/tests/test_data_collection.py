@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+pytest.importorskip("yfinance")
+
+import data_collection  # noqa: E402
+from feature_profiler import UNATTRIBUTED  # noqa: E402
+from statement_store import RawStatementStore  # noqa: E402
+
+
+def _company_payloads(profile):
+    """Statements for any symbol, with the given profile fields"""
+    def handler(path, params):
+        endpoint, _, symbol = path.partition("/")
+        if endpoint == "income-statement":
+            return [{"revenue": 100.0}, {"revenue": 80.0}]
+        if endpoint == "profile":
+            return [{"symbol": symbol, "mktCap": 1e9, **profile}]
+        if endpoint == "historical-price-full":
+            return {"symbol": symbol, "historical": []}
+        if endpoint == "ratios-ttm":
+            return [{"priceEarningsRatioTTM": 20.0}]
+        if endpoint == "stock-screener":
+            return [{"symbol": "PEER1"}, {"symbol": "PEER2"}]
+        return []
+    return handler
+
+
+def test_market_share_params_prefer_industry_then_sector():
+    assert data_collection.get_market_share_search_params("Banks—Diversified", "Financial Services") == {
+        "industry": "Banks—Diversified"}
+    assert data_collection.get_market_share_search_params(None, "Energy") == {"sector": "Energy"}
+    assert data_collection.get_market_share_search_params("Software—Application", None) == {"sector": "Technology"}
+    assert data_collection.get_market_share_search_params(None, None) is None
+    assert data_collection.get_market_share_search_params("", "") is None
+
+
+def test_market_share_is_skipped_without_industry_or_sector(shared_fmp_client):
+    client = shared_fmp_client(handler=_company_payloads({"industry": None, "sector": None}))
+    assert data_collection.get_market_share_for_year("SPAC", 0) is None
+    assert not [path for path, _ in client.session.calls if path == "stock-screener"]
+
+
+def test_market_share_uses_the_sector_screener(shared_fmp_client):
+    client = shared_fmp_client(handler=_company_payloads({"industry": None, "sector": "Energy"}))
+    assert data_collection.get_market_share_for_year("XOM", 0) == pytest.approx(50.0)
+    assert ("stock-screener", {"sector": "Energy"}) in client.session.calls
+
+
+def test_download_skips_the_unfiltered_screener(shared_fmp_client, tmp_path):
+    client = shared_fmp_client(handler=_company_payloads({"industry": None, "sector": None}))
+    data_collection.download_symbol_statements("SPAC", RawStatementStore(tmp_path / "raw.sqlite"), client)
+    assert not [path for path, _ in client.session.calls if path == "stock-screener"]
+
+
+def test_profiled_collection_charges_every_request_to_a_feature(shared_fmp_client, tmp_path):
+    client = shared_fmp_client(handler=_company_payloads({"industry": "Widgets", "sector": "Industrials"}))
+    report_path = tmp_path / "costs.json"
+    data_collection.features_to_csv(["AAA", "BBB"], max_workers=2, output_path=tmp_path / "features.csv",
+                                    manifest_path=tmp_path / "manifest.json", profile=True,
+                                    report_path=report_path)
+
+    report = json.loads(report_path.read_text())
+    requests_by_feature = {row["feature"]: row["requests"] for row in report["features"]}
+    assert report["requests"] == len(client.session.calls)
+    assert requests_by_feature.get(UNATTRIBUTED, 0) == 0
+    assert "(prefetch)" not in requests_by_feature
+    assert requests_by_feature["Market Cap"] == 2
+
+
+def test_refresh_after_a_full_build_only_checks_filings(shared_fmp_client, tmp_path):
+    company = _company_payloads({"industry": "Widgets", "sector": "Industrials"})
+
+    def handler(path, params):
+        if path.startswith("income-statement/"):
+            return [{"fillingDate": "2026-02-01", "revenue": 100.0}, {"fillingDate": "2025-02-01", "revenue": 80.0}]
+        return company(path, params)
+
+    paths = {"output_path": tmp_path / "features.csv", "manifest_path": tmp_path / "manifest.json"}
+    shared_fmp_client(handler=handler)
+    data_collection.features_to_csv(["AAA", "BBB"], max_workers=2, **paths)
+    manifest = json.loads(paths["manifest_path"].read_text())
+    assert {symbol: entry["filing_date"] for symbol, entry in manifest.items()} == {
+        "AAA": "2026-02-01", "BBB": "2026-02-01"}
+
+    client = shared_fmp_client(handler=handler)
+    data_collection.refresh_features_csv(["AAA", "BBB"], max_workers=2, **paths)
+    assert sorted(client.session.calls) == [("income-statement/AAA", {"limit": 1}),
+                                            ("income-statement/BBB", {"limit": 1})]
+
+
+def test_each_collection_run_rebuilds_industry_peers(shared_fmp_client):
+    company = _company_payloads({"industry": "Widgets", "sector": "Industrials"})
+    shared_fmp_client(handler=company)
+    data_collection.collect_features(["AAA"], max_workers=1)
+    assert data_collection.industry_index.get_peers("Widgets") == ["PEER1", "PEER2"]
+
+    # The screener's top companies change between runs
+    shared_fmp_client(handler=lambda path, params: [{"symbol": "PEER3"}] if path == "stock-screener"
+                      else company(path, params))
+    data_collection.collect_features(["AAA"], max_workers=1)
+    assert data_collection.industry_index.get_peers("Widgets") == ["PEER3"]
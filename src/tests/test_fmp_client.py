@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fmp_client import FMPClient
+
+
+def test_cache_key_sorts_params_and_drops_the_api_key():
+    path, query = FMPClient._split_endpoint("income-statement/AAPL?period=annual&apikey=secret",
+                                            {"limit": 5, "skip": None})
+    assert path == "income-statement/AAPL"
+    assert FMPClient.cache_key(path, query) == "income-statement/AAPL?limit=5&period=annual"
+    assert FMPClient.cache_key("profile/AAPL", {}) == "profile/AAPL"
+
+
+def test_inline_and_dict_params_share_a_cache_entry(fmp_client):
+    client = fmp_client()
+    first = client.get_json("income-statement/AAPL?limit=5")
+    second = client.get_json("income-statement/AAPL", {"limit": 5})
+    assert first == second
+    assert client.session.calls == [("income-statement/AAPL", {"limit": "5"})]
+    assert client.stats["memory_hits"] == 1
+
+
+def test_failed_requests_are_not_cached(fmp_client):
+    client = fmp_client(handler=lambda path, params: None)
+    assert client.get_json("profile/AAPL") is None
+    assert client.get_json("profile/AAPL") is None
+    assert len(client.session.calls) == 2
+
+
+def test_concurrent_identical_lookups_share_one_request(fmp_client):
+    client = fmp_client(delay=0.2)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: client.get_json("ratios-ttm/AAPL"), range(8)))
+    assert len(client.session.calls) == 1
+    assert all(result == results[0] for result in results)
+    assert client._in_flight == {}
+
+
+def test_disk_tier_serves_a_fresh_client(fmp_client, tmp_path):
+    fmp_client(cache_dir=tmp_path).get_json("profile/AAPL")
+    client = fmp_client(cache_dir=tmp_path)
+    assert client.get_json("profile/AAPL") == [{"symbol": "AAPL", "price": 4.0}]
+    assert client.session.calls == []
+    assert client.stats["disk_hits"] == 1
+
+
+def test_invalidate_drops_memory_and_disk_entries(fmp_client, tmp_path):
+    client = fmp_client(cache_dir=tmp_path)
+    client.get_json("income-statement/KO")
+    client.invalidate("income-statement/KO")
+    client.get_json("income-statement/KO")
+    assert len(client.session.calls) == 2
+
+
+def test_prefetch_params_keep_ampersands_and_warm_the_dict_lookup(fmp_client):
+    client = fmp_client()
+    industry = "Oil & Gas E&P"
+    client.prefetch([("stock-screener", {"industry": industry}), "profile/XOM"])
+    assert ("stock-screener", {"industry": industry}) in client.session.calls
+
+    # The growth model's fmp_get("stock-screener", industry=...) is now a cache hit
+    client.get_json("stock-screener", {"industry": industry})
+    assert len(client.session.calls) == 2
+
+
+def test_get_many_batches_uncached_symbols_and_caches_each_one(fmp_client):
+    client = fmp_client()
+    client.get_json("quote/AAPL")
+    quotes = client.get_many("quote", ["AAPL", "MSFT", "NVDA", "MSFT", "UNKNOWN1"], chunk_size=2)
+
+    assert list(quotes) == ["AAPL", "MSFT", "NVDA", "UNKNOWN1"]
+    assert quotes["NVDA"] == [{"symbol": "NVDA", "price": 4.0}]
+    assert quotes["UNKNOWN1"] == []
+    assert client.session.calls == [("quote/AAPL", {}), ("quote/MSFT,NVDA", {}), ("quote/UNKNOWN1", {})]
+
+    # Each symbol is cached under its single-symbol key
+    assert client.get_json("quote/MSFT") == quotes["MSFT"]
+    assert client.get_many("quote", ["NVDA", "UNKNOWN1"]) == {"NVDA": quotes["NVDA"], "UNKNOWN1": []}
+    assert len(client.session.calls) == 3
+
+
+def test_get_many_failed_batch_returns_none_and_caches_nothing(fmp_client):
+    client = fmp_client(handler=lambda path, params: None)
+    assert client.get_many("profile", ["AAPL", "MSFT"]) == {"AAPL": None, "MSFT": None}
+    client.get_many("profile", ["AAPL", "MSFT"])
+    assert len(client.session.calls) == 2
+    assert client._in_flight == {}
+
+
+def test_overlapping_concurrent_batches_fetch_each_symbol_once(fmp_client):
+    client = fmp_client(delay=0.2)
+    batches = [["AAPL", "MSFT", "NVDA"], ["MSFT", "NVDA", "KO"], ["AAPL", "KO"], ["NVDA"]] * 2
+    with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+        results = list(executor.map(lambda symbols: client.get_many("quote", symbols), batches))
+
+    fetched = [symbol for path, _ in client.session.calls for symbol in path.split("/", 1)[1].split(",")]
+    assert sorted(fetched) == ["AAPL", "KO", "MSFT", "NVDA"]
+    for symbols, quotes in zip(batches, results):
+        assert [quotes[symbol][0]["symbol"] for symbol in symbols] == symbols
+    assert client._in_flight == {}
+
+
+def test_replay_joins_per_symbol_recordings_for_batch_requests():
+    FixtureReplay = pytest.importorskip("fmp_replay").FixtureReplay
+
+    recorded = {"profile/AAPL": [{"symbol": "AAPL"}], "profile/MSFT": [{"symbol": "MSFT"}]}
+    status, payload, _ = FixtureReplay(recorded).respond("profile/AAPL,UNKNOWN,MSFT", {"apikey": "x"})
+    assert (status, payload) == (200, [{"symbol": "AAPL"}, {"symbol": "MSFT"}])
+    assert FixtureReplay(recorded).respond("profile/UNKNOWN,OTHER", {})[0] == 404
+
+    status, payload, _ = FixtureReplay(recorded, alias=True).respond("profile/AAPL,NEW", {})
+    assert status == 200
+    assert [item["symbol"] for item in payload] == ["AAPL", "NEW"]
+
+
+def test_cache_bypass_neither_reads_nor_writes_the_caches(fmp_client, tmp_path):
+    client = fmp_client(cache_dir=tmp_path)
+    client.get_json("income-statement/KO", {"limit": 1})
+    client.get_json("income-statement/KO", {"limit": 1}, use_cache=False)
+    assert len(client.session.calls) == 2
+
+    client = fmp_client(cache_dir=tmp_path / "bypass")
+    assert client.get_json("income-statement/KO", {"limit": 1}, use_cache=False) is not None
+    assert list((tmp_path / "bypass").iterdir()) == []
+    assert client.memory_cache.get(FMPClient.cache_key("income-statement/KO", {"limit": "1"})) is None
+
+
+def test_stats_count_every_concurrent_lookup(fmp_client):
+    client = fmp_client()
+    symbols = [f"SYM{i}" for i in range(50)]
+    client.prefetch([f"quote/{symbol}" for symbol in symbols], max_workers=16)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(lambda i: client.get_json(f"quote/{symbols[i % 50]}"), range(2000)))
+    assert client.stats["requests"] == len(client.session.calls) == 50
+    assert client.stats["memory_hits"] == 2000
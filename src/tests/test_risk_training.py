@@ -0,0 +1,26 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+pytest.importorskip("sklearn")
+resource = pytest.importorskip("resource")
+
+from risk_training import peak_memory_mb  # noqa: E402
+
+
+def _allocate(megabytes):
+    block = bytearray(megabytes * 1024 * 1024)
+    return len(block)
+
+
+def test_peak_memory_reports_the_process_and_largest_worker_separately():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        list(executor.map(_allocate, [64, 64]))
+    own, worker = peak_memory_mb()
+
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    assert own == pytest.approx(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, rel=0.05)
+    # Both workers peaked at about the same size; a sum would report twice that
+    assert worker == pytest.approx(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+    assert worker >= 64
@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip("sklearn")
+
+from risk_training_data import TrainingDataBuilder  # noqa: E402
+
+
+class FakeScorer:
+    """Collects one row per symbol, skipping failing ("BAD*") symbols and crashing on crash_on"""
+
+    def __init__(self, crash_on=None, failing="BAD"):
+        self.crash_on = crash_on
+        self.failing = failing
+        self.requested = []
+
+    def _collect_features(self, symbols, max_workers, ordered=True):
+        self.requested.append(list(symbols))
+        if self.crash_on in symbols:
+            raise KeyboardInterrupt
+        return [{"symbol": symbol, "beta": 1.0} for symbol in symbols
+                if not (self.failing and symbol.startswith(self.failing))]
+
+
+SYMBOLS = ["AAPL", "MSFT", "BAD1", "KO", "XOM", "JPM", "NVDA"]
+
+
+def test_interrupted_build_resumes_after_the_last_saved_shard(tmp_path):
+    with pytest.raises(KeyboardInterrupt):
+        TrainingDataBuilder(tmp_path, shard_size=3, scorer=FakeScorer(crash_on="JPM")).build(SYMBOLS)
+    assert TrainingDataBuilder(tmp_path, scorer=FakeScorer()).load_checkpoint() == {
+        "done": ["AAPL", "MSFT"], "failed": ["BAD1"], "shards": ["shard-00000.pkl"]}
+
+    scorer = FakeScorer()
+    builder = TrainingDataBuilder(tmp_path, shard_size=3, scorer=scorer)
+    checkpoint = builder.build(SYMBOLS)
+    assert scorer.requested == [["KO", "XOM", "JPM"], ["NVDA"]]
+    assert checkpoint["failed"] == ["BAD1"]
+    assert sorted(builder.load_raw()["symbol"]) == sorted(set(SYMBOLS) - {"BAD1"})
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_retry_failed_only_refetches_failed_symbols(tmp_path):
+    TrainingDataBuilder(tmp_path, scorer=FakeScorer()).build(SYMBOLS)
+    scorer = FakeScorer()
+    checkpoint = TrainingDataBuilder(tmp_path, scorer=scorer).retry_failed()
+    assert scorer.requested == [["BAD1"]]
+    assert checkpoint["failed"] == ["BAD1"]
+    assert len(checkpoint["shards"]) == 1
+
+    # An interrupted retry keeps the symbols it had not reached in "failed"
+    TrainingDataBuilder(tmp_path, scorer=FakeScorer()).build(["BAD2", "BAD3"])
+    with pytest.raises(KeyboardInterrupt):
+        TrainingDataBuilder(tmp_path, shard_size=1,
+                            scorer=FakeScorer(crash_on="BAD2", failing=None)).retry_failed()
+    checkpoint = TrainingDataBuilder(tmp_path, scorer=FakeScorer()).load_checkpoint()
+    assert "BAD1" in checkpoint["done"]
+    assert checkpoint["failed"] == ["BAD2", "BAD3"]
+
+    scorer = FakeScorer(failing=None)
+    checkpoint = TrainingDataBuilder(tmp_path, scorer=scorer).retry_failed()
+    assert scorer.requested == [["BAD2", "BAD3"]]
+    assert checkpoint["failed"] == []
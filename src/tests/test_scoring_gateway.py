@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+import scoring_gateway  # noqa: E402
+
+
+class FakeRiskScorer:
+    def predict_risk_scores(self, symbols):
+        return pd.DataFrame({'symbol': symbols, 'risk_score': [40.0] * len(symbols),
+                             'risk_category': ['Medium'] * len(symbols)})
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """Gateway with no snapshot, no network and growth/value scoring every symbol but UNKNOWN"""
+    monkeypatch.setattr(scoring_gateway, "prefetch_symbols", lambda symbols: None)
+    monkeypatch.setattr(scoring_gateway.score_snapshot, "lookup", lambda symbol, keys: None)
+    monkeypatch.setattr(scoring_gateway.score_snapshot, "partition", lambda symbols, keys: ([], list(symbols)))
+    monkeypatch.setattr(scoring_gateway, "_growth_scores",
+                        lambda symbols: {s: 70.0 for s in symbols if s != "UNKNOWN"})
+    monkeypatch.setattr(scoring_gateway, "_value_scores",
+                        lambda symbols: {s: 55.0 for s in symbols if s != "UNKNOWN"})
+    monkeypatch.setattr(scoring_gateway.risk_service, "status", lambda: {'state': 'loading', 'error': None})
+
+    def with_risk(scorer):
+        monkeypatch.setattr(scoring_gateway.risk_service, "get_scorer", lambda: scorer)
+        return scoring_gateway.app.test_client()
+    return with_risk
+
+
+def test_warming_risk_model_still_serves_growth_and_value(gateway):
+    response = gateway(None).get('/api/scores/AAPL')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['status'] == 'partial'
+    assert (body['growthScore'], body['valueScore'], body['riskScore']) == (70.0, 55.0, None)
+    assert body['errors'] == {'risk': 'model warming up'}
+
+
+def test_warming_risk_model_returns_503_only_when_nothing_scores(gateway):
+    response = gateway(None).get('/api/scores/UNKNOWN')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+
+
+def test_bulk_scores_are_partial_while_the_risk_model_warms(gateway):
+    response = gateway(None).post('/api/scores/bulk', json={'symbols': ['AAPL', 'UNKNOWN']})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['status'] == 'partial'
+    assert body['missing'] == ['UNKNOWN']
+    assert [(s['symbol'], s['riskScore'], s['errors']) for s in body['scores']] == [
+        ('AAPL', None, {'risk': 'model warming up'})]
+
+    assert gateway(None).post('/api/scores/bulk', json={'symbols': ['UNKNOWN']}).status_code == 503
+
+
+def test_warm_risk_model_scores_all_three(gateway):
+    body = gateway(FakeRiskScorer()).get('/api/scores/AAPL').get_json()
+    assert body['status'] == 'success'
+    assert (body['riskScore'], body['riskCategory'], body['errors']) == (40.0, 'Medium', None)
+
+
+def test_failed_risk_model_is_not_reported_as_warming(gateway, monkeypatch):
+    monkeypatch.setattr(scoring_gateway.risk_service, "status",
+                        lambda: {'state': 'failed', 'error': 'no training data'})
+    client = gateway(None)
+
+    response = client.get('/api/scores/AAPL')
+    assert response.get_json()['errors'] == {'risk': 'model failed to load: no training data'}
+
+    response = client.get('/api/scores/UNKNOWN')
+    assert response.status_code == 503
+    assert 'Retry-After' not in response.headers
+    body = response.get_json()
+    assert body['status'] == 'failed'
+    assert 'no training data' in body['error']
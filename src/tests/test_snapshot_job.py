@@ -0,0 +1,31 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+import snapshot_job  # noqa: E402
+
+
+@pytest.fixture
+def scorers(monkeypatch):
+    """Growth and value score every symbol; nothing touches the network"""
+    monkeypatch.setattr(snapshot_job, "prefetch_symbols", lambda symbols: None)
+    monkeypatch.setattr(snapshot_job, "run_scoring_for_tickers", lambda symbols: pd.DataFrame(
+        {'Symbol': symbols, 'predicted_growth_potential': [70.0] * len(symbols)}))
+    value_columns = ['Value_Score', 'PE_Score', 'PEG_Score', 'FCF_Score', 'ROE_Score', 'Debt_Score', 'EPS_Score']
+    monkeypatch.setattr(snapshot_job.ValueScoreCalculator, "analyze_stocks", lambda self, symbols: pd.DataFrame(
+        dict({'Symbol': symbols}, **{column: [50.0] * len(symbols) for column in value_columns})))
+
+
+def test_missing_risk_model_still_writes_growth_and_value(scorers, tmp_path):
+    path = tmp_path / "snapshots.sqlite"
+    version = snapshot_job.run_snapshot_job(["AAPL", "MSFT"], path=path, model_dir=tmp_path / "no_models")
+    assert version is not None
+
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT symbol, growth_score, value_score, risk_score, risk_category FROM scores "
+                            "WHERE version = ? ORDER BY symbol", (version,)).fetchall()
+    assert rows == [("AAPL", 70.0, 50.0, None, None), ("MSFT", 70.0, 50.0, None, None)]
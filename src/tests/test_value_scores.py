@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from value_model_math import ValueScoreCalculator
+
+SCORE_COLUMNS = ['composite_score', 'pe_score', 'peg_score', 'fcf_score', 'roe_score', 'debt_score', 'eps_score']
+
+
+@pytest.fixture(scope="module")
+def calculator():
+    return ValueScoreCalculator()
+
+
+def _boundary_rows(calculator):
+    """Every benchmark threshold, the special-case cut-offs and values either side of them"""
+    b = calculator.benchmarks
+    edges = {
+        'pe_ratio': [0, 300, b['excellent_pe'], b['poor_pe']],
+        'peg_ratio': [0, 50, b['excellent_peg'], b['poor_peg']],
+        'fcf_yield': [0, b['excellent_fcf_yield'], b['poor_fcf_yield']],
+        'roe': [0, b['excellent_roe'], b['poor_roe']],
+        'debt_equity': [0, b['excellent_debt'], b['poor_debt']],
+        'eps_growth': [-100, 100, b['excellent_eps_growth'], b['poor_eps_growth']],
+    }
+    rows = []
+    for column, values in edges.items():
+        for value in values:
+            for nudged in (value, np.nextafter(value, -np.inf), np.nextafter(value, np.inf)):
+                rows.append({column: float(nudged)})
+    return pd.DataFrame(rows, columns=calculator.SCORE_INPUTS)
+
+
+def _random_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'pe_ratio': rng.uniform(-50, 400, n),
+        'peg_ratio': rng.uniform(-5, 60, n),
+        'fcf_yield': rng.uniform(-10, 20, n),
+        'roe': rng.uniform(-30, 60, n),
+        'debt_equity': rng.uniform(-2, 6, n),
+        'eps_growth': rng.uniform(-300, 300, n),
+    })
+    # Missing values in every column
+    return frame.mask(rng.random(frame.shape) < 0.1)
+
+
+def _scalar_scores(calculator, frame):
+    records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+    return pd.DataFrame([calculator.calculate_value_score(record) for record in records])[SCORE_COLUMNS]
+
+
+@pytest.mark.parametrize("rows", ["boundary", "random"])
+def test_vectorized_scores_match_the_scalar_scorer_exactly(calculator, rows):
+    frame = _boundary_rows(calculator) if rows == "boundary" else _random_rows(5000)
+    expected = _scalar_scores(calculator, frame)
+    actual = calculator.calculate_value_scores(frame).reset_index(drop=True)[SCORE_COLUMNS]
+    np.testing.assert_array_equal(actual.to_numpy(dtype=float), expected.to_numpy(dtype=float))
+
+
+def test_all_missing_inputs_score_neutral_except_pe(calculator):
+    scores = calculator.calculate_value_scores(pd.DataFrame({'pe_ratio': [None]}))
+    assert scores.loc[0, 'pe_score'] == 0
+    assert scores.loc[0, ['peg_score', 'fcf_score', 'roe_score', 'debt_score', 'eps_score']].tolist() == [50] * 5